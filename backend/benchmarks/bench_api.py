@@ -0,0 +1,141 @@
+"""HTTP-level benchmarks for the API, run in-process against local stand-ins."""
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from benchmarks.fakes import FakeDatabase, make_stub_gemini
+from benchmarks.stats import summarize
+
+CHAT_MESSAGES = [
+    "Which places should I visit in Ranchi?",
+    "What food is Jharkhand famous for?",
+    "Tell me about Sarhul festival",
+    "Hotels near Betla National Park",
+]
+
+# Registered before the scenarios run, with no declared dates, so it takes bookings on any date
+BOOKING_VENDOR = {
+    "id": "bench-guide",
+    "name": "Bench Guide",
+    "type": "guide",
+    "location": "Ranchi",
+    "phone": "+91-9000000000",
+    "services": ["Local Sightseeing"],
+    "nearby_spots": ["Hundru Falls"],
+}
+# Every booking request takes a new date, warm-up included, so each one reserves a fresh slot
+_booking_days = itertools.count()
+
+
+def load_app(llm_delay: float, storage: str = 'fake'):
+    """Import the app with Gemini stubbed and the database in memory (``fake``) or the embedded store (``local``)"""
+    # An empty MONGO_URL keeps the import from opening a real Motor client;
+    # the embedded store goes to a scratch directory
+    os.environ['MONGO_URL'] = ''
+    os.environ['LOCAL_DATA_DIR'] = tempfile.mkdtemp(prefix='bench-')
+    # The load generator is a single client; keep the chat rate limits out of the way
+    os.environ.setdefault('CHAT_RATE_LIMIT_IP_BURST', '1e12')
+    os.environ.setdefault('CHAT_RATE_LIMIT_SESSION_BURST', '1e12')
+    import server_integrated
+
+    server_integrated.open_database(FakeDatabase() if storage == 'fake' else None)
+    server_integrated.get_gemini_response = make_stub_gemini(delay=llm_delay)
+    return server_integrated
+
+
+def _booking_payload(index: int) -> Dict[str, Any]:
+    return {
+        "tourist_name": f"Bench Tourist {index}",
+        "tourist_phone": "+91-9000000000",
+        "vendor_id": BOOKING_VENDOR["id"],
+        "vendor_type": "guide",
+        "service_type": "Local Sightseeing",
+        "booking_date": (date(2030, 1, 1) + timedelta(days=next(_booking_days))).isoformat(),
+    }
+
+
+def _vendor_payload(index: int) -> Dict[str, Any]:
+    return {
+        "name": f"Bench Vendor {index}",
+        "type": random.choice(["hotel", "guide", "artisan"]),
+        "location": random.choice(["Ranchi", "Jamshedpur", "Deoghar"]),
+        "phone": "+91-9000000000",
+        "services": ["Local Sightseeing"],
+        "nearby_spots": ["Hundru Falls"],
+    }
+
+
+def build_scenarios() -> Dict[str, Callable[[httpx.AsyncClient, int], Any]]:
+    """Map scenario names to coroutines issuing one request each"""
+    return {
+        "GET /api/attractions": lambda c, i: c.get("/api/attractions"),
+        "GET /api/attractions?city": lambda c, i: c.get("/api/attractions", params={"city": "Ranchi"}),
+        "GET /api/hotels": lambda c, i: c.get("/api/hotels"),
+        "GET /api/vendors": lambda c, i: c.get("/api/vendors"),
+        "POST /api/vendors": lambda c, i: c.post("/api/vendors", json=_vendor_payload(i)),
+        "POST /api/bookings": lambda c, i: c.post("/api/bookings", json=_booking_payload(i)),
+        "GET /api/bookings": lambda c, i: c.get("/api/bookings", params={"vendor_id": "vendor1"}),
+        "POST /api/chat": lambda c, i: c.post(
+            "/api/chat", json={"user_message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)]}),
+    }
+
+
+async def _run_scenario(client, request_func, requests: int, concurrency: int):
+    latencies: List[float] = []
+    errors = 0
+    rejected = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors, rejected
+        for index in counter:
+            start = time.perf_counter()
+            response = await request_func(client, index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+            elif response.status_code >= 400:
+                rejected += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies)
+    result.update({
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rejected": rejected,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+    })
+    return result
+
+
+async def run_api_benchmarks(requests: int = 500, concurrency: int = 16,
+                             llm_delay: float = 0.0, only: List[str] = None,
+                             storage: str = 'fake') -> Dict[str, Any]:
+    """Run every API scenario and return latency percentiles and throughput"""
+    random.seed(0)
+    server = load_app(llm_delay, storage)
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # ASGITransport doesn't send lifespan events; seed and index as startup would
+        await server.prepare_vendor_indexes()
+        await server.create_storage_indexes()
+        response = await client.post("/api/vendors", json=BOOKING_VENDOR)
+        response.raise_for_status()
+        for name, request_func in build_scenarios().items():
+            if only and not any(selected in name for selected in only):
+                continue
+            # Warm up caches and lazy imports so they don't skew the percentiles
+            await _run_scenario(client, request_func, min(20, requests), 1)
+            results[name] = await _run_scenario(client, request_func, requests, concurrency)
+    return results
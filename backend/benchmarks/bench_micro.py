@@ -0,0 +1,51 @@
+"""Micro-benchmarks for the route calculation helpers."""
+import random
+import time
+from typing import Any, Callable, Dict
+
+from data.attractions_data import get_all_attractions
+from utils.route_calculator import (
+    calculate_distance, calculate_route, find_nearby_attractions, generate_waypoints,
+    optimize_attraction_order
+)
+from benchmarks.stats import summarize
+
+RANCHI = {'lat': 23.3441, 'lng': 85.3096}
+DHANBAD = {'lat': 23.7957, 'lng': 86.4304}
+
+
+def _time_calls(func: Callable[[], Any], iterations: int, repeat: int = 5) -> Dict[str, Any]:
+    """Time ``iterations`` calls per round and report per-call latency percentiles"""
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        per_call.append((time.perf_counter() - start) / iterations)
+    result = summarize(per_call)
+    result["iterations"] = iterations * repeat
+    result["ops_per_sec"] = round(1 / min(per_call), 2)
+    return result
+
+
+def run_micro_benchmarks(scale: int = 1) -> Dict[str, Any]:
+    """Run the distance, nearby-search and ordering micro-benchmarks"""
+    rng = random.Random(0)
+    attractions = get_all_attractions()
+    points = [(rng.uniform(22, 25.5), rng.uniform(83.5, 88)) for _ in range(1000)]
+    waypoints = generate_waypoints(RANCHI, DHANBAD)
+
+    def distances():
+        for lat, lng in points:
+            calculate_distance(RANCHI['lat'], RANCHI['lng'], lat, lng)
+
+    return {
+        "calculate_distance_x1000": _time_calls(distances, 20 * scale),
+        "calculate_route": _time_calls(lambda: calculate_route(RANCHI, DHANBAD), 200 * scale),
+        "find_nearby_attractions": _time_calls(
+            lambda: find_nearby_attractions(waypoints, 25, None), 100 * scale),
+        "find_nearby_attractions_interests": _time_calls(
+            lambda: find_nearby_attractions(waypoints, 25, ["Adventure"]), 100 * scale),
+        "optimize_attraction_order": _time_calls(
+            lambda: optimize_attraction_order(attractions, RANCHI), 100 * scale),
+    }
@@ -0,0 +1,73 @@
+"""Per-item cost of serializing large list responses.
+
+Each case times a 10k-item list two ways: the old endpoint code (a model per
+record, then FastAPI's response_model validation and serialization) and the
+``ListSerializer`` path the endpoints use now. Both include rendering the
+response body.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from benchmarks.bench_api import load_app
+from benchmarks.bench_micro import _time_calls
+
+ITEMS = 10_000
+
+
+def _records(server) -> Dict[str, List[Dict[str, Any]]]:
+    """Database-shaped vendors and bookings, and catalog attractions, ``ITEMS`` of each"""
+    created_at = datetime.now(timezone.utc).isoformat()
+    vendor = dict(server.MOCK_VENDORS[0], created_at=created_at, seq=1, changed_at=0.0, rating={
+        "count": 3, "sum": 13, "average": 4.33, "histogram": {"4": 2, "5": 1}, "sentiment": {"positive": 3}})
+    booking = {
+        "tourist_name": "Bench Tourist", "tourist_phone": "+91-9000000000", "vendor_id": "vendor1",
+        "vendor_type": "guide", "service_type": "Local Sightseeing", "booking_date": "2025-09-22",
+        "message": "", "status": "pending", "created_at": created_at, "seq": 1, "changed_at": 0.0,
+    }
+    attractions = server.get_all_attractions()
+    return {
+        "vendors": [dict(vendor, id=f"vendor-{i}") for i in range(ITEMS)],
+        "bookings": [dict(booking, id=f"booking-{i}") for i in range(ITEMS)],
+        "attractions": [attractions[i % len(attractions)] for i in range(ITEMS)],
+    }
+
+
+def run_serialization_benchmarks(scale: int = 1) -> Dict[str, Any]:
+    server = load_app(0.0)
+    records = _records(server)
+    loop = asyncio.new_event_loop()
+    cases = {
+        "vendors": (server.VendorRegistration, server.VENDOR_LIST, True),
+        "bookings": (server.Booking, server.BOOKING_LIST, True),
+        "attractions": (server.Attraction, server.ATTRACTION_LIST, False),
+    }
+    results = {}
+    try:
+        for name, (model, serializer, stored) in cases.items():
+            items = records[name]
+            field = create_response_field(name="response", type_=List[model])
+
+            def legacy():
+                if stored:
+                    # What the endpoints did before: parse timestamps, build models, let FastAPI validate again
+                    documents = [dict(d, created_at=datetime.fromisoformat(d["created_at"])) for d in items]
+                else:
+                    documents = items
+                content = loop.run_until_complete(
+                    serialize_response(field=field, response_content=[model(**d) for d in documents]))
+                return server.NegotiatedJSONResponse(content)
+
+            def fast():
+                return serializer.stored(items) if stored else serializer.trusted(items)
+
+            for variant, func in (("legacy", legacy), ("serializer", fast)):
+                result = _time_calls(func, scale, repeat=5)
+                result["per_item_us"] = round(result["p50_ms"] * 1000 / ITEMS, 3)
+                results[f"{name}_{variant}_x10k"] = result
+    finally:
+        loop.close()
+    return results
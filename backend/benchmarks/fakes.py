@@ -0,0 +1,139 @@
+"""Local stand-ins for MongoDB (Motor) and Gemini used by the benchmarks.
+
+``FakeDatabase`` implements the subset of the Motor API the backend uses,
+keeping documents in memory. ``stub_gemini_response`` replaces the LLM call
+with a fixed, optionally delayed answer.
+"""
+import copy
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.local_store import apply_update, get_path, matches, upsert_seed
+
+
+class FakeInsertResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class FakeUpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self._documents = documents
+
+    def sort(self, key, direction=1):
+        self._documents.sort(key=lambda d: (get_path(d, key) is None, get_path(d, key)),
+                             reverse=direction < 0)
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self._documents = self._documents[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None):
+        return self._documents if length is None else self._documents[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self._documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """In-memory collection with the async Motor methods the backend calls"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: List[Dict[str, Any]] = []
+
+    async def insert_one(self, document):
+        document.setdefault('_id', f"{self.name}-{len(self.documents) + 1}")
+        self.documents.append(copy.deepcopy(document))
+        return FakeInsertResult(document['_id'])
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([copy.deepcopy(d) for d in self.documents if matches(d, query)])
+
+    async def find_one(self, query=None, projection=None):
+        for document in self.documents:
+            if matches(document, query):
+                return copy.deepcopy(document)
+        return None
+
+    async def count_documents(self, query=None):
+        return sum(1 for d in self.documents if matches(d, query))
+
+    async def update_one(self, query, update, upsert=False):
+        for document in self.documents:
+            if matches(document, query):
+                apply_update(document, update)
+                return FakeUpdateResult(1, 1)
+        if upsert:
+            document = upsert_seed(query)
+            apply_update(document, update, inserting=True)
+            await self.insert_one(document)
+            return FakeUpdateResult(0, 0, document['_id'])
+        return FakeUpdateResult(0, 0)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=False):
+        for document in self.documents:
+            if matches(document, query):
+                before = copy.deepcopy(document)
+                apply_update(document, update)
+                return copy.deepcopy(document) if return_document else before
+        if upsert:
+            await self.update_one(query, update, upsert=True)
+            return copy.deepcopy(self.documents[-1]) if return_document else None
+        return None
+
+    async def delete_many(self, query):
+        before = len(self.documents)
+        self.documents = [d for d in self.documents if not matches(d, query)]
+        return FakeUpdateResult(before - len(self.documents), before - len(self.documents))
+
+    async def create_index(self, keys, **kwargs):
+        return str(keys)
+
+
+class FakeDatabase:
+    """Attribute access returns a lazily created ``FakeCollection``"""
+
+    def __init__(self):
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    async def command(self, name: str):
+        """Only ``ping`` is supported, for ``/ready``"""
+        if name != 'ping':
+            raise NotImplementedError(f"Unsupported command {name}")
+        return {'ok': 1.0}
+
+
+def make_stub_gemini(delay: float = 0.0, text: str = "Jharkhand is famous for its waterfalls."):
+    """Build a drop-in replacement for ``get_gemini_response``"""
+    def stub_gemini_response(system_message: str, user_message: str):
+        if delay:
+            time.sleep(delay)
+        return text
+    return stub_gemini_response
@@ -0,0 +1,108 @@
+"""Run the benchmark suite and record results to JSON.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.run
+    python -m benchmarks.run --requests 1000 --concurrency 32 --output results.json
+    python -m benchmarks.run --storage local
+    python -m benchmarks.run --skip-api --skip-micro
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+
+With ``--compare`` the run exits with status 1 when any p99 latency grew
+by more than ``--threshold`` (default 25%) over the baseline file.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.bench_api import run_api_benchmarks
+from benchmarks.bench_micro import run_micro_benchmarks
+from benchmarks.bench_serialization import run_serialization_benchmarks
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+SUITES = ('api', 'micro', 'serialization')
+
+
+def find_regressions(baseline, current, threshold):
+    """List p99 latencies that grew by more than ``threshold`` over the baseline"""
+    regressions = []
+    for suite in SUITES:
+        for name, result in current.get(suite, {}).items():
+            previous = baseline.get(suite, {}).get(name)
+            if not previous or not previous.get('p99_ms'):
+                continue
+            growth = (result['p99_ms'] - previous['p99_ms']) / previous['p99_ms']
+            if growth > threshold:
+                regressions.append(
+                    f"{suite}/{name}: p99 {previous['p99_ms']}ms -> {result['p99_ms']}ms (+{growth:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='requests per API scenario')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients per API scenario')
+    parser.add_argument('--llm-delay', type=float, default=0.0, help='seconds the stub LLM sleeps per call')
+    parser.add_argument('--scale', type=int, default=1, help='multiplier for micro-benchmark iterations')
+    parser.add_argument('--storage', choices=('fake', 'local'), default='fake',
+                        help='in-memory fake database or the embedded SQLite store')
+    parser.add_argument('--only', nargs='*', help='run only API scenarios containing these strings')
+    parser.add_argument('--skip-api', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-serialization', action='store_true')
+    parser.add_argument('--output', type=Path, help='JSON file to write (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', type=Path, help='baseline JSON to check for p99 regressions')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative p99 growth')
+    args = parser.parse_args(argv)
+
+    # Per-request access logs would dominate the timings
+    logging.disable(logging.INFO)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_delay": args.llm_delay,
+            "scale": args.scale,
+            "storage": args.storage,
+        },
+    }
+    if not args.skip_api:
+        report["api"] = asyncio.run(
+            run_api_benchmarks(args.requests, args.concurrency, args.llm_delay, args.only, args.storage))
+    if not args.skip_micro:
+        report["micro"] = run_micro_benchmarks(args.scale)
+    if not args.skip_serialization:
+        report["serialization"] = run_serialization_benchmarks(args.scale)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.write_text(json.dumps(report, indent=2))
+
+    for suite in SUITES:
+        for name, result in report.get(suite, {}).items():
+            per_item = f" per_item={result['per_item_us']:>7}us" if 'per_item_us' in result else ''
+            print(f"{suite:5} {name:40} p50={result['p50_ms']:>9}ms p99={result['p99_ms']:>9}ms{per_item}")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        regressions = find_regressions(json.loads(args.compare.read_text()), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
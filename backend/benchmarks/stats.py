@@ -0,0 +1,27 @@
+"""Latency summary helpers shared by the benchmark modules."""
+import statistics
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies (seconds) as milliseconds with p50/p90/p99"""
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    to_ms = lambda v: round(v * 1000, 4)
+    return {
+        "count": len(values),
+        "mean_ms": to_ms(statistics.fmean(values)),
+        "p50_ms": to_ms(percentile(values, 0.50)),
+        "p90_ms": to_ms(percentile(values, 0.90)),
+        "p99_ms": to_ms(percentile(values, 0.99)),
+        "max_ms": to_ms(values[-1]),
+    }
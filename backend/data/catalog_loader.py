@@ -0,0 +1,286 @@
+"""Versioned catalog loading with validation and hot reload.
+
+The attraction, hotel and emergency responder catalogs live in JSON files
+under ``data/catalog``.
+Each load validates the files, builds every lookup index into an immutable
+``Catalog`` snapshot and then swaps it in with a single reference
+assignment, so in-flight requests keep reading the snapshot they started with.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = Path(os.environ.get('CATALOG_DIR', Path(__file__).parent / 'catalog'))
+CATALOG_RELOAD_INTERVAL = float(os.environ.get('CATALOG_RELOAD_INTERVAL', 5))
+SUPPORTED_SCHEMA_VERSIONS = {1}
+
+# A "1 Day" attraction takes a full day of sightseeing
+HOURS_PER_DAY = 8.0
+MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december')
+
+ATTRACTION_FIELDS = {
+    "id": str,
+    "name": str,
+    "city": str,
+    "coordinates": dict,
+    "type": str,
+    "interest_tags": list,
+    "description": str,
+    "best_time": str,
+    "duration": str,
+    "image": str,
+}
+
+HOTEL_FIELDS = {
+    "id": str,
+    "name": str,
+    "city": str,
+    "coordinates": dict,
+    "rooms": int,
+    "contact": str,
+    "amenities": list,
+    "price_range": str,
+}
+
+RESPONDER_FIELDS = {
+    "id": str,
+    "name": str,
+    "kind": str,
+    "city": str,
+    "coordinates": dict,
+    "contact": str,
+}
+RESPONDER_KINDS = ("police", "hospital")
+CATALOG_FILES = ('attractions.json', 'hotels.json', 'responders.json')
+
+
+class CatalogError(ValueError):
+    """Raised when a catalog file is missing, malformed or fails validation"""
+
+
+def _reject_duplicate_keys(pairs):
+    """JSON object hook that fails on repeated keys instead of keeping the last one"""
+    result = {}
+    for key, value in pairs:
+        if key in result:
+            raise CatalogError(f"duplicate key '{key}'")
+        result[key] = value
+    return result
+
+
+def _read_catalog_file(path: Path, records_key: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f, object_pairs_hook=_reject_duplicate_keys)
+    except FileNotFoundError:
+        raise CatalogError(f"{path.name}: file not found")
+    except json.JSONDecodeError as e:
+        raise CatalogError(f"{path.name}: invalid JSON ({e})")
+    except CatalogError as e:
+        raise CatalogError(f"{path.name}: {e}")
+
+    if not isinstance(document, dict):
+        raise CatalogError(f"{path.name}: top level must be an object")
+    if document.get('schema_version') not in SUPPORTED_SCHEMA_VERSIONS:
+        raise CatalogError(f"{path.name}: unsupported schema_version {document.get('schema_version')!r}")
+    if not isinstance(document.get('version'), str):
+        raise CatalogError(f"{path.name}: 'version' must be a string")
+    if not isinstance(document.get(records_key), list):
+        raise CatalogError(f"{path.name}: '{records_key}' must be a list")
+    return document
+
+
+def _validate_records(records: List[Dict[str, Any]], fields: Dict[str, type], source: str):
+    seen_ids = set()
+    for index, record in enumerate(records):
+        where = f"{source}[{index}]"
+        if not isinstance(record, dict):
+            raise CatalogError(f"{where}: record must be an object")
+        for field, expected in fields.items():
+            value = record.get(field)
+            # bool is an int subclass, so reject it explicitly for numeric fields
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                raise CatalogError(f"{where}: field '{field}' must be {expected.__name__}")
+        coords = record['coordinates']
+        lat, lng = coords.get('lat'), coords.get('lng')
+        if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+            raise CatalogError(f"{where}: coordinates need numeric 'lat' and 'lng'")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise CatalogError(f"{where}: coordinates out of range")
+        if record['id'] in seen_ids:
+            raise CatalogError(f"{where}: duplicate id '{record['id']}'")
+        seen_ids.add(record['id'])
+
+
+def parse_duration(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(min, max) hours of a duration such as "2-3 hours" or "1 Day"; None if unparseable"""
+    numbers = [float(n) for n in re.findall(r'\d+(?:\.\d+)?', text or '')]
+    if not numbers:
+        return None
+    scale = HOURS_PER_DAY if 'day' in text.lower() else 1.0
+    return (min(numbers) * scale, max(numbers) * scale)
+
+
+def parse_best_time(text: Optional[str]) -> Optional[FrozenSet[int]]:
+    """Months (1-12) of a season such as "October to March"; None means year round"""
+    named = [MONTHS.index(word) + 1 for word in re.findall(r'[a-z]+', (text or '').lower()) if word in MONTHS]
+    if len(named) == 1:
+        return frozenset(named)
+    if len(named) != 2:
+        return None
+    first, last = named
+    # Seasons may wrap around the new year
+    return frozenset((first - 1 + offset) % 12 + 1 for offset in range((last - first) % 12 + 1))
+
+
+def _group_by(records, key_func):
+    groups = {}
+    for record in records:
+        for key in key_func(record):
+            groups.setdefault(key, []).append(record)
+    return groups
+
+
+class Catalog:
+    """Immutable snapshot of the attraction, hotel and responder catalogs with prebuilt indexes"""
+
+    def __init__(self, attractions: List[Dict[str, Any]], hotels: List[Dict[str, Any]], version: str,
+                 responders: Optional[List[Dict[str, Any]]] = None):
+        self.version = version
+        responders = responders or []
+        # Changes whenever the data does, even if a file's declared version wasn't bumped
+        canonical = json.dumps([attractions, hotels, responders], sort_keys=True, separators=(',', ':'),
+                               ensure_ascii=False)
+        self.content_hash = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        self.attractions = attractions
+        self.hotels = hotels
+        self.attractions_by_id = {a['id']: a for a in attractions}
+        self.attractions_by_city = _group_by(attractions, lambda a: [a['city']])
+        self.attractions_by_interest = _group_by(attractions, lambda a: a.get('interest_tags', []))
+        self.hotels_by_id = {h['id']: h for h in hotels}
+        # Hotels are indexed by their own 'city' field so a record can never be misfiled
+        self.hotels_by_city = _group_by(hotels, lambda h: [h['city']])
+        self.responders = responders
+        self.responders_by_kind = _group_by(responders, lambda r: [r['kind']])
+        # Free-text fields parsed once here rather than on every planning request
+        self.durations_by_id = {a['id']: parse_duration(a['duration']) for a in attractions}
+        self.season_by_id = {a['id']: parse_best_time(a['best_time']) for a in attractions}
+
+    def duration_of(self, attraction: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """Parsed duration of an attraction, reusing the load-time parse unless the record overrides it"""
+        catalog_record = self.attractions_by_id.get(attraction.get('id'))
+        if catalog_record is not None and attraction.get('duration', catalog_record['duration']) == catalog_record['duration']:
+            return self.durations_by_id[catalog_record['id']]
+        return parse_duration(attraction.get('duration'))
+
+
+def load_catalog(directory: Path = CATALOG_DIR) -> Catalog:
+    """Read, validate and index the catalog files in ``directory``"""
+    directory = Path(directory)
+    attractions_doc = _read_catalog_file(directory / 'attractions.json', 'attractions')
+    hotels_doc = _read_catalog_file(directory / 'hotels.json', 'hotels')
+    responders_doc = _read_catalog_file(directory / 'responders.json', 'responders')
+    _validate_records(attractions_doc['attractions'], ATTRACTION_FIELDS, 'attractions.json')
+    _validate_records(hotels_doc['hotels'], HOTEL_FIELDS, 'hotels.json')
+    _validate_records(responders_doc['responders'], RESPONDER_FIELDS, 'responders.json')
+    for index, responder in enumerate(responders_doc['responders']):
+        if responder['kind'] not in RESPONDER_KINDS:
+            raise CatalogError(f"responders.json[{index}]: kind must be one of {', '.join(RESPONDER_KINDS)}")
+    version = (f"attractions@{attractions_doc['version']}+hotels@{hotels_doc['version']}"
+               f"+responders@{responders_doc['version']}")
+    return Catalog(attractions_doc['attractions'], hotels_doc['hotels'], version, responders_doc['responders'])
+
+
+class CatalogStore:
+    """Holds the active catalog snapshot and reloads it when the files change"""
+
+    def __init__(self, directory: Path = CATALOG_DIR, interval: float = CATALOG_RELOAD_INTERVAL):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._catalog: Optional[Catalog] = None
+        self._mtimes = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_mtimes(self):
+        mtimes = []
+        for name in CATALOG_FILES:
+            try:
+                mtimes.append(os.stat(self.directory / name).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def current(self) -> Catalog:
+        """Return the active snapshot, loading it on first use"""
+        catalog = self._catalog
+        if catalog is None:
+            self.reload()
+            catalog = self._catalog
+        return catalog
+
+    def reload(self) -> bool:
+        """Load the files and swap the snapshot in; returns False if they were rejected"""
+        with self._lock:
+            mtimes = self._file_mtimes()
+            try:
+                catalog = load_catalog(self.directory)
+            except CatalogError as e:
+                if self._catalog is None:
+                    raise
+                logger.error("Catalog reload rejected, keeping %s: %s", self._catalog.version, e)
+                self._mtimes = mtimes
+                return False
+            self._catalog = catalog
+            self._mtimes = mtimes
+        logger.info("Catalog %s loaded (%d attractions, %d hotels, %d responders)",
+                    catalog.version, len(catalog.attractions), len(catalog.hotels), len(catalog.responders))
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            if self._file_mtimes() != self._mtimes:
+                try:
+                    self.reload()
+                except Exception:
+                    logger.exception("Catalog reload failed")
+
+    def start_watching(self):
+        """Poll the catalog files from a daemon thread and hot-swap on change"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='catalog-watcher', daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        # The child keeps the parent's snapshot (shared copy-on-write) but none
+        # of its threads, so start over with fresh synchronization primitives
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+
+catalog_store = CatalogStore()
+os.register_at_fork(after_in_child=catalog_store._after_fork)
+
+
+def get_catalog() -> Catalog:
+    """Get the active catalog snapshot"""
+    return catalog_store.current()
@@ -0,0 +1,30 @@
+"""Gunicorn settings for running the API on every core.
+
+    gunicorn -c gunicorn.conf.py server_integrated:app
+
+The app is imported once in the master (``preload_app``) and the catalog is
+loaded before workers fork, so its snapshot and indexes are shared
+copy-on-write. Database clients, the catalog watcher and the other
+per-process caches are created in each worker on startup.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# Exported so the app knows it shares its caches with sibling workers
+workers = int(os.environ.setdefault('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+accesslog = '-'
+
+
+def when_ready(server):
+    import server_integrated
+
+    server_integrated.preload_shared_state()
+    # Keep the collector from touching (and so copying) the pages shared with workers
+    gc.freeze()
@@ -1,14 +1,18 @@
 import google.generativeai as genai
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Dict, Any, Optional
 import uuid
+import time
+import asyncio
+from concurrent.futures import TimeoutError as RenderTimeout
 from datetime import datetime, timezone
 import json
 import base64
@@ -21,27 +25,193 @@ import seaborn as sns
 # Import attractions data
 from data.attractions_data import get_all_attractions, get_attractions_by_city, get_attractions_by_interest, get_attraction_by_id
 from data.hotels_data import get_all_hotels, get_hotels_by_city, get_hotel_by_id
+from data.catalog_loader import catalog_store
+from utils.route_calculator import calculate_distance
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.rate_limit import InMemoryRateLimitStore, MongoRateLimitStore, RateLimiter
+from utils.singleflight import SingleFlight
+from utils.retrieval import ChatKnowledgeBase
+from utils.intent import CANNED, canned_answer, classify_intent, route_for
+from utils.chat_sessions import SessionStore
+from utils.geo_index import GridIndex
+from utils.vendor_geo import enrich_vendor
+from utils.vendor_ratings import LocalRatingAggregates, RATING_VALUES, SENTIMENTS, record_rating
+from utils.local_store import LocalDatabase
+from utils.cache_sync import CacheGenerations
+from utils.change_feed import ChangeFeed, next_cursor
+from utils.work_queue import URGENT, PriorityWorkQueue
+from utils.scheduler import Scheduler
+from utils.alerts import AlertDispatcher, nearest_responders, responder_grids
+from utils.analytics import refresh_summary, stored_summary
+from utils.archive import create_ttl_indexes, expiry, run_retention
+from utils.corridor import attraction_grid
+from utils.mongo_pool import PoolMonitor, mongo_client_options, read_preference
+from utils.booking_engine import BookingEngine, LocalAvailabilityStore, MongoAvailabilityStore
+from utils.response_encoding import CompressionMiddleware, ContentNegotiationMiddleware, NegotiatedJSONResponse
+from utils.serialization import ListSerializer
+from utils.itinerary_export import ExportError, export_itinerary as render_export, shutdown_pool as shutdown_export_pool
+from utils.tour_state import EditError, ItineraryPlan
+from utils.trip_planner import PlanningError, plan_trip
+from utils.route_matrix import MatrixError, route_matrix
+from utils.metrics import (
+    HTTP_ERRORS, HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, counter, histogram, render_metrics, track_span
+)
+
+# Configure logging before anything below starts emitting records
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
+# Files written by the app itself when running without MongoDB
+LOCAL_DATA_DIR = Path(os.environ.get('LOCAL_DATA_DIR', ROOT_DIR / 'local_data'))
+# Compressed archives of old chat history, feedback and SOS alerts
+ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR', LOCAL_DATA_DIR / 'archive'))
 
-# MongoDB connection with fallback
-try:
-    mongo_url = os.environ.get('MONGO_URL')
-    if mongo_url:
-        print(f"[DEBUG] Attempting MongoDB connection to: {mongo_url[:30]}...")
-        client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=10000)
-        db = client[os.environ.get('DB_NAME', 'jharkhand_tourism')]
-        print("[INFO] MongoDB client initialized successfully")
-    else:
-        raise Exception("MONGO_URL not found in environment variables")
-except Exception as e:
-    client = None
-    db = None
-    print(f"Warning: MongoDB connection failed: {str(e)}, using mock data")
+# Storage handles, bound on startup by open_database(): MongoDB when configured,
+# otherwise the embedded store, which has the same async API
+mongo_url = os.environ.get('MONGO_URL')
+client = None
+pool_monitor = None
+db = None
+# The same database with MONGO_READ_PREFERENCE applied, for read-heavy endpoints
+db_reads = None
+# Geo queries and shared rate limits need MongoDB itself
+USING_MONGO = False
+# Worker processes serving the app (gunicorn.conf.py sets this); per-worker
+# caches are kept consistent through cache generations in the database
+WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+def open_database(database=None):
+    """Bind db, db_reads and the stores built on them; tests and benchmarks may pass a database"""
+    global client, pool_monitor, db, db_reads, USING_MONGO
+    if database is None and mongo_url:
+        try:
+            logger.debug("Attempting MongoDB connection to: %s...", mongo_url[:30])
+            options = mongo_client_options()
+            pool_monitor = PoolMonitor(options['maxPoolSize'])
+            client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_monitor], **options)
+            database = client[os.environ.get('DB_NAME', 'jharkhand_tourism')]
+            logger.info("MongoDB client initialized successfully")
+        except Exception as e:
+            client = None
+            logger.warning("MongoDB connection failed: %s, using the local store", e)
+    if database is None:
+        try:
+            database = LocalDatabase(os.environ.get('LOCAL_DB_PATH', LOCAL_DATA_DIR / 'local.db'))
+            logger.info("Using the local store at %s", database.path)
+        except Exception as e:
+            logger.warning("Local store unavailable: %s, using mock data", e)
+    db = database
+    USING_MONGO = client is not None
+    db_reads = db.with_options(read_preference=read_preference()) if USING_MONGO else db
+    bind_storage()
+
+def close_database():
+    global client, db, db_reads
+    if client is not None:
+        client.close()
+    elif isinstance(db, LocalDatabase):
+        db.close()
+    client = db = db_reads = None
+
+async def ping_database(timeout: float = 2.0) -> Optional[str]:
+    """None if the database answers a ping within ``timeout``, else the error type"""
+    try:
+        with track_span("mongo", "ping"):
+            await asyncio.wait_for(db.command("ping"), timeout)
+    except Exception as e:
+        return type(e).__name__
+    return None
+
+def preload_shared_state():
+    """Build read-only state before the server forks workers, so they share it copy-on-write"""
+    catalog_store.current()
 
 # Create the main app without a prefix
-app = FastAPI(title="Jharkhand Tourism Platform")
+app = FastAPI(title="Jharkhand Tourism Platform", default_response_class=NegotiatedJSONResponse)
+
+@app.on_event("startup")
+async def connect_database():
+    open_database()
+    if db is not None:
+        error = await ping_database(timeout=float(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)) / 1000)
+        if error:
+            # Keep starting; requests fail fast and /ready reports it until the database answers
+            logger.warning("Database not reachable at startup: %s", error)
+
+@app.on_event("shutdown")
+async def disconnect_database():
+    close_database()
+
+# SOS dispatch and other async jobs run here, urgent jobs ahead of background work
+work_queue = PriorityWorkQueue(workers=int(os.environ.get('WORK_QUEUE_WORKERS', 4)))
+# Periodic jobs, run on the work queue at background priority
+scheduler = Scheduler(work_queue)
+
+@app.on_event("startup")
+async def start_work_queue():
+    work_queue.start()
+
+@app.on_event("shutdown")
+async def stop_work_queue():
+    # Queued SOS alerts are only persisted when dispatched; let them finish before exiting
+    await work_queue.stop(drain_seconds=float(os.environ.get('WORK_QUEUE_DRAIN_SECONDS', 10)))
+    await alert_dispatcher.close()
+
+@app.on_event("startup")
+async def start_catalog_watcher():
+    # Initial load happens here; later file changes are re-indexed off-thread
+    catalog_store.start_watching()
+
+@app.on_event("shutdown")
+async def stop_catalog_watcher():
+    catalog_store.stop_watching()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    method = request.method
+    HTTP_IN_FLIGHT.inc(method=method)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep series bounded
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=method, route=route_path)
+        HTTP_REQUESTS.inc(method=method, route=route_path, status=str(status))
+        if status >= 500:
+            HTTP_ERRORS.inc(method=method, route=route_path)
+        HTTP_IN_FLIGHT.dec(method=method)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready", include_in_schema=False)
+async def readiness():
+    """Ready when the database answers a ping and its connection pool isn't exhausted"""
+    report = {"backend": "mongo" if USING_MONGO else "local" if db is not None else "none"}
+    ready = True
+    if db is not None:
+        error = await ping_database()
+        report["reachable"] = error is None
+        if error:
+            report["error"] = error
+            ready = False
+    if USING_MONGO:
+        report["pool"] = pool_monitor.snapshot()
+        if pool_monitor.saturated():
+            ready = False
+    return JSONResponse({"status": "ready" if ready else "not_ready", "database": report},
+                        status_code=200 if ready else 503)
 
 # Add root endpoint for health checks
 @app.get("/")
@@ -55,15 +225,87 @@ api_router = APIRouter(prefix="/api")
 # Gemini GenAI setup
 def get_gemini_response(system_message: str, user_message: str):
     api_key = os.environ.get('GEMINI_API_KEY')
-    print(f"[DEBUG] Using GEMINI_API_KEY: {api_key}")
     genai.configure(api_key=api_key)
     model = genai.GenerativeModel('gemini-2.5-flash')
     prompt = f"{system_message}\nUser: {user_message}"
-    response = model.generate_content(prompt)
-    print(f"[DEBUG] Gemini API response: {response}")
+    with track_span("gemini", "generate_content"):
+        response = model.generate_content(prompt)
+    logger.debug("Gemini API response: %s", response)
     return response.text if hasattr(response, 'text') else str(response)
 
+# Fail fast to the contextual fallback while Gemini is slow or down
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=int(os.environ.get('GEMINI_FAILURE_THRESHOLD', 5)),
+    recovery_timeout=float(os.environ.get('GEMINI_RECOVERY_SECONDS', 30)),
+    call_timeout=float(os.environ.get('GEMINI_TIMEOUT_SECONDS', 8)),
+)
+
+# Concurrent identical chat prompts share one Gemini call
+chat_flights = SingleFlight("chat")
+
+# Token buckets per client IP and per chat session; use the Mongo store to
+# share one budget across instances (RATE_LIMIT_BACKEND, bound in bind_storage)
+rate_limit_store = InMemoryRateLimitStore()
+chat_ip_limiter = RateLimiter(
+    "chat_ip",
+    rate=float(os.environ.get('CHAT_RATE_LIMIT_IP_PER_MINUTE', 60)) / 60,
+    capacity=float(os.environ.get('CHAT_RATE_LIMIT_IP_BURST', 30)),
+    store=rate_limit_store,
+)
+chat_session_limiter = RateLimiter(
+    "chat_session",
+    rate=float(os.environ.get('CHAT_RATE_LIMIT_SESSION_PER_MINUTE', 20)) / 60,
+    capacity=float(os.environ.get('CHAT_RATE_LIMIT_SESSION_BURST', 10)),
+    store=rate_limit_store,
+)
+
+# Reverse proxies in front of the app; each appends the address it was reached from to X-Forwarded-For
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+def client_ip(request: Request) -> str:
+    """The client address as seen by the outermost trusted proxy; the entries left of it are client-supplied"""
+    if TRUSTED_PROXY_COUNT:
+        hops = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_COUNT:
+            return hops[-TRUSTED_PROXY_COUNT]
+    return request.client.host if request.client else "unknown"
+
+async def check_rate_limit(limiter: RateLimiter, key: str):
+    decision = await limiter.check(key)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many chat requests, please slow down",
+            headers={"Retry-After": str(max(1, round(decision.retry_after)))},
+        )
+
+async def enforce_chat_rate_limit(request: Request):
+    # Per session is checked in the endpoint, once the body's session id is known
+    await check_rate_limit(chat_ip_limiter, client_ip(request))
+
 # Pydantic Models
+class VendorRating(BaseModel):
+    count: int = 0
+    sum: int = 0
+    average: Optional[float] = None
+    histogram: Dict[str, int] = Field(default_factory=dict)  # "1".."5" -> count
+    sentiment: Dict[str, int] = Field(default_factory=dict)  # positive/neutral/negative -> count
+
+    @field_validator("histogram")
+    @classmethod
+    def fill_histogram(cls, value):
+        return {bucket: value.get(bucket, 0) for bucket in RATING_VALUES}
+
+    @field_validator("sentiment")
+    @classmethod
+    def fill_sentiment(cls, value):
+        return {label: value.get(label, 0) for label in SENTIMENTS}
+
+class Coordinates(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+
 class VendorRegistration(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -74,8 +316,17 @@ class VendorRegistration(BaseModel):
     nearby_spots: List[str]
     pricing: Dict[str, Any] = Field(default_factory=dict)
     availability: List[str] = Field(default_factory=list)
+    daily_capacity: int = Field(default=1, ge=1)  # bookings accepted per available date
+    coordinates: Optional[Coordinates] = None  # resolved from nearby_spots/location if omitted
+    # "exact", "spots", "geocoded" or "city"; city-level vendors are left out of radius searches
+    location_precision: Optional[str] = None
+    nearby_spot_ids: List[str] = Field(default_factory=list)  # attraction ids resolved from nearby_spots
+    rating: Optional[VendorRating] = None  # maintained from feedback, ignored on registration
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class NearbyVendor(VendorRegistration):
+    distance_km: Optional[float] = None
+
 class Booking(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     tourist_name: str
@@ -95,6 +346,7 @@ class Feedback(BaseModel):
     rating: int = Field(ge=1, le=5)
     comment: str
     location: Optional[str] = None
+    sentiment: Optional[str] = None  # set by the server from the comment
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ChatMessage(BaseModel):
@@ -102,6 +354,7 @@ class ChatMessage(BaseModel):
     user_message: str
     language: str = "english"  # "english" or "hindi"
     user_type: str = "tourist"  # "tourist", "vendor", "guide", "admin"
+    session_id: Optional[str] = None  # falls back to the X-Session-Id header
 
 class TouristSpot(BaseModel):
     id: str
@@ -137,6 +390,35 @@ class Hotel(BaseModel):
     amenities: List[str]
     price_range: str
 
+class Itinerary(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: Optional[str] = None
+    title: str = "My Jharkhand Trip"
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    current_location: Optional[Any] = None
+    interests: List[str] = []
+    # A list of days, or a mapping of day label to stops as /optimize plans them
+    days: Any = Field(default_factory=list)
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class TripPlanRequest(BaseModel):
+    attractions: List[Any]  # attraction dicts or catalog ids
+    start_location: Optional[Dict[str, Any]] = None
+    start_date: Optional[str] = None
+    days: Optional[int] = None
+    day_start: Optional[Any] = None  # hour or "HH:MM"
+    day_end: Optional[Any] = None
+
+# List responses are serialized once, without validating the same records twice
+ATTRACTION_LIST = ListSerializer(Attraction)
+TOURIST_SPOT_LIST = ListSerializer(TouristSpot)
+HOTEL_LIST = ListSerializer(Hotel)
+VENDOR_LIST = ListSerializer(VendorRegistration)
+BOOKING_LIST = ListSerializer(Booking)
+FEEDBACK_LIST = ListSerializer(Feedback)
+
 # Helper function for sentiment analysis
 def analyze_sentiment(text: str) -> Dict[str, Any]:
     """Simple sentiment analysis using keywords"""
@@ -185,6 +467,221 @@ MOCK_VENDORS = [
     }
 ]
 
+async def find_vendor(vendor_id: str) -> Optional[Dict[str, Any]]:
+    """Raw vendor document from the database, falling back to mock data"""
+    if db is not None:
+        try:
+            with track_span("mongo", "vendors.find_one"):
+                vendor = await db.vendors.find_one({"id": vendor_id}, {"_id": 0})
+            if vendor:
+                return vendor
+        except Exception as e:
+            logger.error("Vendor lookup failed: %s", e)
+    for vendor in MOCK_VENDORS:
+        if vendor['id'] == vendor_id:
+            return vendor
+    return None
+
+# Per-vendor date -> capacity slots; reservations are atomic so a slot can't be overbooked
+booking_engine = None
+cache_generations = None
+change_feed = None
+alert_dispatcher = AlertDispatcher()
+
+def bind_storage():
+    """Build the stores that live in the database once it is bound"""
+    global booking_engine, cache_generations, change_feed
+    alert_dispatcher.collection = db.emergency_alerts if db is not None else None
+    scheduler.locks = db.job_locks if db is not None else None
+    if db is not None:
+        # Works the same against the local store's collections
+        availability_store = MongoAvailabilityStore(db.vendor_availability)
+    else:
+        LOCAL_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        availability_store = LocalAvailabilityStore(LOCAL_DATA_DIR / 'booking_journal.jsonl')
+    booking_engine = BookingEngine(availability_store, find_vendor)
+    if db is not None:
+        cache_generations = CacheGenerations(
+            db.cache_generations, interval=float(os.environ.get('CACHE_SYNC_INTERVAL_SECONDS', 2)))
+        change_feed = ChangeFeed(db.change_counters, db.sync_tombstones,
+                                 settle_seconds=float(os.environ.get('SYNC_SETTLE_SECONDS', 10)))
+    if os.environ.get('RATE_LIMIT_BACKEND', 'memory') == 'mongo' and USING_MONGO:
+        chat_ip_limiter.store = chat_session_limiter.store = MongoRateLimitStore(db.rate_limits)
+
+async def seed_local_vendors():
+    """Give a fresh local store the mock vendors, so they can be booked and rated like any other"""
+    if USING_MONGO or db is None:
+        return
+    try:
+        if await db.vendors.count_documents({}):
+            return
+        created_at = datetime.now(timezone.utc).isoformat()
+        for vendor in MOCK_VENDORS:
+            # Upsert, since several workers may be seeding the same fresh store
+            await db.vendors.update_one(
+                {"id": vendor['id']}, {"$setOnInsert": dict(vendor, created_at=created_at)}, upsert=True)
+    except Exception as e:
+        logger.error("Failed to seed the local store: %s", e)
+
+async def backfill_vendor_availability():
+    vendors = MOCK_VENDORS
+    if db is not None:
+        try:
+            await booking_engine.store.create_indexes()
+            with track_span("mongo", "vendors.find"):
+                vendors = await db.vendors.find({}, {"_id": 0, "id": 1, "availability": 1, "daily_capacity": 1}).to_list(None)
+        except Exception as e:
+            logger.error("Vendor availability backfill failed: %s", e)
+            return
+    for vendor in vendors:
+        await booking_engine.register_vendor(vendor)
+
+# Vendor locations: a 2dsphere index on `geo` with MongoDB, a local grid index otherwise
+vendor_geo_index = GridIndex()
+
+def index_vendor_location(vendor: Dict[str, Any]):
+    # Vendors placed only at their city's centre have no geo point
+    if vendor.get('geo'):
+        lng, lat = vendor['geo']['coordinates']
+        vendor_geo_index.insert(vendor['id'], lat, lng, vendor)
+
+async def backfill_vendor_geo():
+    if db is None:
+        for vendor in MOCK_VENDORS:
+            # Enrich a copy so the shared mock records stay untouched
+            index_vendor_location(await asyncio.to_thread(enrich_vendor, dict(vendor)))
+        return
+    try:
+        with track_span("mongo", "vendors.create_index"):
+            await db.vendors.create_index([("geo", "2dsphere")])
+        with track_span("mongo", "vendors.find"):
+            # Also vendors located before precisions were recorded, which may only be at a city centre
+            missing = await db.vendors.find({"location_precision": {"$exists": False}}, {"_id": 0}).to_list(None)
+        for vendor in missing:
+            vendor = await asyncio.to_thread(enrich_vendor, vendor)
+            with track_span("mongo", "vendors.update_one"):
+                await db.vendors.update_one({"id": vendor['id']}, {"$set": {
+                    **{key: vendor[key] for key in ('nearby_spot_ids', 'coordinates', 'location_precision', 'geo')
+                       if key in vendor},
+                    **await change_feed.stamp(),
+                }})
+        if not USING_MONGO:
+            await load_vendor_grid()
+    except Exception as e:
+        logger.error("Vendor geo backfill failed: %s", e)
+
+async def load_vendor_grid():
+    # The local store has no geo index; radius queries use the grid
+    with track_span("mongo", "vendors.find"):
+        located = await db.vendors.find({"geo": {"$ne": None}}, {"_id": 0}).to_list(None)
+    for vendor in located:
+        index_vendor_location(vendor)
+
+async def sync_vendor_caches():
+    """Refresh this worker's vendor caches when another worker registered a vendor"""
+    global chat_vendors_loaded_at
+    if cache_generations is None or not await cache_generations.stale("vendors"):
+        return
+    chat_vendors_loaded_at = 0.0
+    if not USING_MONGO:
+        try:
+            await load_vendor_grid()
+        except Exception as e:
+            logger.error("Failed to reload vendor locations: %s", e)
+
+async def vendors_near(lat: float, lng: float, radius_km: float, vendor_type: Optional[str] = None):
+    """(distance_km, vendor) pairs within the radius, nearest first"""
+    if not USING_MONGO:
+        await sync_vendor_caches()
+        hits = vendor_geo_index.query_radius(lat, lng, radius_km)
+        if db is not None and hits:
+            # The grid only places vendors; read current documents so ratings are fresh
+            with track_span("mongo", "vendors.find"):
+                stored = await db_reads.vendors.find({"id": {"$in": [key for _, key, _ in hits]}}, {"_id": 0}).to_list(None)
+            stored = {vendor['id']: vendor for vendor in stored}
+            hits = [(distance, key, stored.get(key, vendor)) for distance, key, vendor in hits]
+        return [(distance, vendor) for distance, _, vendor in hits
+                if not vendor_type or vendor['type'] == vendor_type]
+    query = {"geo": {"$nearSphere": {
+        "$geometry": {"type": "Point", "coordinates": [lng, lat]},
+        "$maxDistance": radius_km * 1000,
+    }}}
+    if vendor_type:
+        query['type'] = vendor_type
+    with track_span("mongo", "vendors.find_near"):
+        vendors = await db_reads.vendors.find(query, {"_id": 0}).to_list(1000)
+    return [(calculate_distance(lat, lng, v['coordinates']['lat'], v['coordinates']['lng']), v) for v in vendors]
+
+def resolve_attraction(ref: str) -> Optional[Dict[str, Any]]:
+    """Find an attraction by id or (case-insensitive) name"""
+    attraction = get_attraction_by_id(ref)
+    if attraction is None:
+        attraction = next((a for a in get_all_attractions() if a['name'].lower() == ref.strip().lower()), None)
+    return attraction
+
+def nearby_vendor_model(vendor: Dict[str, Any], distance: Optional[float] = None) -> NearbyVendor:
+    vendor = dict(with_rating(vendor))
+    if isinstance(vendor.get('created_at'), str):
+        vendor['created_at'] = datetime.fromisoformat(vendor['created_at'])
+    vendor.setdefault('created_at', datetime.now(timezone.utc))
+    return NearbyVendor(**vendor, distance_km=round(distance, 2) if distance is not None else None)
+
+@app.on_event("startup")
+async def prepare_vendor_indexes():
+    await seed_local_vendors()
+    # Backfill in the background; reservations create missing slots on demand meanwhile
+    asyncio.create_task(backfill_vendor_availability())
+    asyncio.create_task(backfill_vendor_geo())
+    if db is not None:
+        asyncio.create_task(create_storage_indexes())
+        asyncio.create_task(backfill_change_seq())
+
+# Secondary indexes per collection, for the lookups and sorts the endpoints run
+STORAGE_INDEXES = {
+    "vendors": [[("id", 1)], [("type", 1)], [("rating.average", -1)], [("seq", 1)]],
+    "bookings": [[("vendor_id", 1)], [("seq", 1)]],
+    "feedback": [[("vendor_id", 1)], [("seq", 1)]],
+    "chat_history": [[("session_id", 1), ("created_at", -1)]],
+    "itineraries": [[("id", 1)]],
+}
+
+async def create_storage_indexes():
+    for collection, indexes in STORAGE_INDEXES.items():
+        for keys in indexes:
+            try:
+                with track_span("mongo", f"{collection}.create_index"):
+                    await db[collection].create_index(keys)
+            except Exception as e:
+                logger.error("Failed to create index %s on %s: %s", keys, collection, e)
+    # One failing set shouldn't leave the others uncreated
+    for name, create in (
+        ("cache generation", cache_generations.create_indexes),
+        ("change feed", change_feed.create_indexes),
+        ("scheduler", scheduler.create_indexes),
+        ("TTL", lambda: create_ttl_indexes(db)),
+        ("rate limit", chat_session_limiter.store.create_indexes),
+    ):
+        try:
+            await create()
+        except Exception as e:
+            logger.error("Failed to create %s indexes: %s", name, e)
+
+# Collections clients can sync; writes to them are stamped with a change sequence
+SYNC_COLLECTIONS = ("vendors", "bookings", "feedback")
+
+async def backfill_change_seq():
+    """Stamp documents written before change sequences existed"""
+    for collection in SYNC_COLLECTIONS:
+        try:
+            with track_span("mongo", f"{collection}.find"):
+                unstamped = await db[collection].find({"seq": {"$exists": False}}, {"_id": 0, "id": 1}).to_list(None)
+            for document in unstamped:
+                with track_span("mongo", f"{collection}.update_one"):
+                    await db[collection].update_one(
+                        {"id": document['id'], "seq": {"$exists": False}}, {"$set": await change_feed.stamp()})
+        except Exception as e:
+            logger.error("Change sequence backfill of %s failed: %s", collection, e)
+
 # Routes
 @api_router.get("/")
 async def root():
@@ -202,8 +699,8 @@ async def get_attractions(city: Optional[str] = None, interest: Optional[str] =
         attractions = get_attractions_by_interest(interest)
     else:
         attractions = get_all_attractions()
-    
-    return [Attraction(**attraction) for attraction in attractions]
+    # Catalog records are validated when the catalog loads
+    return ATTRACTION_LIST.trusted(attractions)
 
 @api_router.get("/attractions/{attraction_id}", response_model=Attraction)
 async def get_attraction(attraction_id: str):
@@ -217,23 +714,7 @@ async def get_attraction(attraction_id: str):
 @api_router.get("/spots", response_model=List[TouristSpot])
 async def get_tourist_spots():
     """Get tourist spots (legacy endpoint)"""
-    attractions = get_all_attractions()
-    spots = []
-    for attraction in attractions:
-        spot = TouristSpot(
-            id=attraction["id"],
-            name=attraction["name"],
-            description=attraction["description"],
-            coordinates=attraction["coordinates"],
-            type=attraction["type"],
-            city=attraction["city"],
-            interest_tags=attraction.get("interest_tags", []),
-            best_time=attraction.get("best_time"),
-            duration=attraction.get("duration"),
-            image=attraction.get("image")
-        )
-        spots.append(spot)
-    return spots
+    return TOURIST_SPOT_LIST.trusted(get_all_attractions())
 
 @api_router.get("/hotels", response_model=List[Hotel])
 async def get_hotels(city: Optional[str] = None):
@@ -242,7 +723,7 @@ async def get_hotels(city: Optional[str] = None):
         hotels = get_hotels_by_city(city)
     else:
         hotels = get_all_hotels()
-    return [Hotel(**hotel) for hotel in hotels]
+    return HOTEL_LIST.trusted(hotels)
 
 @api_router.get("/hotels/{hotel_id}", response_model=Hotel)
 async def get_hotel(hotel_id: str):
@@ -255,31 +736,57 @@ async def get_hotel(hotel_id: str):
 # Vendor Management
 @api_router.post("/vendors", response_model=VendorRegistration)
 async def register_vendor(vendor: VendorRegistration):
-    vendor_dict = vendor.dict()
+    vendor.rating = None
+    vendor_dict = await asyncio.to_thread(enrich_vendor, vendor.dict())
+    # Leave rating absent so the first feedback can $inc into it
+    vendor_dict.pop('rating', None)
+    vendor.coordinates = Coordinates(**vendor_dict['coordinates']) if vendor_dict.get('coordinates') else None
+    vendor.location_precision = vendor_dict.get('location_precision')
+    vendor.nearby_spot_ids = vendor_dict['nearby_spot_ids']
     vendor_dict['created_at'] = vendor_dict['created_at'].isoformat()
+    index_vendor_location(vendor_dict)
     if db is not None:
         try:
-            await db.vendors.insert_one(vendor_dict)
-        except:
-            pass  # Continue even if database save fails
+            vendor_dict.update(await change_feed.stamp())
+            with track_span("mongo", "vendors.insert_one"):
+                await db.vendors.insert_one(vendor_dict)
+            chat_knowledge.add_vendor(vendor_dict)
+            await cache_generations.bump("vendors")
+        except Exception as e:
+            logger.error("Failed to save vendor: %s", e)  # Continue even if database save fails
+    await booking_engine.register_vendor(vendor_dict)
+    return vendor
+
+# Ratings for vendors that only exist in process; stored vendors carry theirs in the document
+mock_vendor_ratings = LocalRatingAggregates()
+
+def with_rating(vendor: Dict[str, Any]) -> Dict[str, Any]:
+    if vendor.get('rating') is None and mock_vendor_ratings.get(vendor['id']) is not None:
+        vendor = dict(vendor, rating=mock_vendor_ratings.get(vendor['id']))
     return vendor
 
+def mock_vendor_records() -> List[Dict[str, Any]]:
+    """Response-ready copies of the mock vendors; the shared records are never modified"""
+    now = datetime.now(timezone.utc)
+    return [dict(with_rating(v), created_at=v.get('created_at', now)) for v in MOCK_VENDORS]
+
+def sort_by_rating(vendors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(vendors, key=lambda v: (v.get('rating') or {}).get('average') or 0, reverse=True)
+
 @api_router.get("/vendors", response_model=List[VendorRegistration])
-async def get_vendors(vendor_type: Optional[str] = None, location: Optional[str] = None):
+async def get_vendors(vendor_type: Optional[str] = None, location: Optional[str] = None,
+                      sort: Optional[str] = Query(None, pattern="^rating$")):
+    """List vendors; sort=rating orders by average rating, best first"""
     if db is None:
-        # Use mock data when MongoDB is unavailable
-        vendors = MOCK_VENDORS.copy()
+        # Use mock data when no store is available
+        vendors = mock_vendor_records()
         if vendor_type:
             vendors = [v for v in vendors if v['type'] == vendor_type]
         if location:
             vendors = [v for v in vendors if location.lower() in v['location'].lower()]
-        
-        # Add missing fields for VendorRegistration
-        for vendor in vendors:
-            if 'created_at' not in vendor:
-                vendor['created_at'] = datetime.now(timezone.utc)
-        
-        return [VendorRegistration(**vendor) for vendor in vendors]
+        if sort == "rating":
+            vendors = sort_by_rating(vendors)
+        return VENDOR_LIST.stored(vendors)
     
     try:
         filter_query = {}
@@ -288,36 +795,74 @@ async def get_vendors(vendor_type: Optional[str] = None, location: Optional[str]
         if location:
             filter_query['location'] = {"$regex": location, "$options": "i"}
         
-        vendors = await db.vendors.find(filter_query).to_list(1000)
-        for vendor in vendors:
-            if isinstance(vendor.get('created_at'), str):
-                vendor['created_at'] = datetime.fromisoformat(vendor['created_at'])
-        return [VendorRegistration(**vendor) for vendor in vendors]
+        cursor = db_reads.vendors.find(filter_query)
+        if sort == "rating":
+            cursor = cursor.sort("rating.average", -1)
+        with track_span("mongo", "vendors.find"):
+            vendors = await cursor.to_list(1000)
+        return VENDOR_LIST.stored(vendors)
     except Exception as e:
         # Fallback to mock data on database error
-        vendors = MOCK_VENDORS.copy()
-        for vendor in vendors:
-            if 'created_at' not in vendor:
-                vendor['created_at'] = datetime.now(timezone.utc)
-        return [VendorRegistration(**vendor) for vendor in vendors]
+        return VENDOR_LIST.stored(mock_vendor_records())
+
+@api_router.get("/vendors/near", response_model=List[NearbyVendor])
+async def get_vendors_near(
+    attraction: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: float = Query(10, gt=0, le=200),
+    vendor_type: Optional[str] = None,
+):
+    """Guides, hotels and artisans within radius_km of an attraction (id or name) or a point"""
+    if attraction:
+        spot = resolve_attraction(attraction)
+        if spot is None:
+            raise HTTPException(status_code=404, detail="Attraction not found")
+        lat, lng = spot['coordinates']['lat'], spot['coordinates']['lng']
+    elif lat is None or lng is None:
+        raise HTTPException(status_code=400, detail="Provide an attraction or lat and lng")
+    return [nearby_vendor_model(v, d) for d, v in await vendors_near(lat, lng, radius_km, vendor_type)]
+
+@api_router.get("/vendors/available", response_model=List[NearbyVendor])
+async def get_available_vendors(
+    date: str,
+    spot: Optional[str] = None,
+    vendor_type: Optional[str] = None,
+    radius_km: float = Query(25, gt=0, le=200),
+):
+    """Vendors with free capacity on a date, optionally within radius_km of a spot (attraction id or name)"""
+    available_ids = set(await booking_engine.available_vendor_ids(date))
+    if spot:
+        attraction = resolve_attraction(spot)
+        if attraction is None:
+            raise HTTPException(status_code=404, detail="Attraction not found")
+        coords = attraction['coordinates']
+        near = await vendors_near(coords['lat'], coords['lng'], radius_km, vendor_type)
+        return [nearby_vendor_model(v, d) for d, v in near if v['id'] in available_ids]
+
+    vendors = []
+    for vendor_id in available_ids:
+        vendor = await find_vendor(vendor_id)
+        if vendor is not None and (not vendor_type or vendor['type'] == vendor_type):
+            vendors.append(nearby_vendor_model(vendor))
+    return vendors
 
 @api_router.get("/vendors/{vendor_id}")
 async def get_vendor(vendor_id: str):
     if db is not None:
         try:
-            vendor = await db.vendors.find_one({"id": vendor_id})
+            with track_span("mongo", "vendors.find_one"):
+                vendor = await db_reads.vendors.find_one({"id": vendor_id})
             if vendor:
                 if isinstance(vendor.get('created_at'), str):
                     vendor['created_at'] = datetime.fromisoformat(vendor['created_at'])
                 return VendorRegistration(**vendor)
-        except:
-            pass
+        except Exception as e:
+            logger.error("Vendor lookup failed: %s", e)
     
     # Fallback to mock data
-    for vendor in MOCK_VENDORS:
+    for vendor in mock_vendor_records():
         if vendor['id'] == vendor_id:
-            if 'created_at' not in vendor:
-                vendor['created_at'] = datetime.now(timezone.utc)
             return VendorRegistration(**vendor)
     
     raise HTTPException(status_code=404, detail="Vendor not found")
@@ -325,13 +870,25 @@ async def get_vendor(vendor_id: str):
 # Booking Management
 @api_router.post("/bookings", response_model=Booking)
 async def create_booking(booking: Booking):
+    try:
+        reserved = await booking_engine.reserve(booking.vendor_id, booking.booking_date)
+    except Exception as e:
+        logger.error("Failed to reserve booking slot: %s", e)
+        raise HTTPException(status_code=503, detail="Booking could not be saved, please retry")
+    if not reserved:
+        raise HTTPException(status_code=409, detail="Vendor is not available on this date")
     booking_dict = booking.dict()
     booking_dict['created_at'] = booking_dict['created_at'].isoformat()
     if db is not None:
         try:
-            await db.bookings.insert_one(booking_dict)
-        except:
-            pass  # Continue even if database save fails
+            booking_dict.update(await change_feed.stamp())
+            with track_span("mongo", "bookings.insert_one"):
+                await db.bookings.insert_one(booking_dict)
+        except Exception as e:
+            # Give the slot back so a failed write doesn't consume capacity
+            logger.error("Failed to save booking: %s", e)
+            await booking_engine.release(booking.vendor_id, booking.booking_date)
+            raise HTTPException(status_code=503, detail="Booking could not be saved, please retry")
     return booking
 
 @api_router.get("/bookings", response_model=List[Booking])
@@ -346,26 +903,43 @@ async def get_bookings(vendor_id: Optional[str] = None, status: Optional[str] =
         if status:
             filter_query['status'] = status
         
-        bookings = await db.bookings.find(filter_query).to_list(1000)
-        for booking in bookings:
-            if isinstance(booking.get('created_at'), str):
-                booking['created_at'] = datetime.fromisoformat(booking['created_at'])
-        return [Booking(**booking) for booking in bookings]
-    except:
-        return []  # Return empty list on error
+        with track_span("mongo", "bookings.find"):
+            bookings = await db_reads.bookings.find(filter_query).to_list(1000)
+        return BOOKING_LIST.stored(bookings)
+    except Exception as e:
+        logger.error("Failed to load bookings: %s", e)
+        raise HTTPException(status_code=503, detail="Bookings are temporarily unavailable")
 
 # Feedback Management
 @api_router.post("/feedback", response_model=Feedback)
 async def submit_feedback(feedback: Feedback):
+    feedback.sentiment = analyze_sentiment(feedback.comment)["sentiment"]
     feedback_dict = feedback.dict()
     feedback_dict['created_at'] = feedback_dict['created_at'].isoformat()
+    feedback_dict.update(expiry("feedback"))
     if db is not None:
         try:
-            await db.feedback.insert_one(feedback_dict)
-        except:
-            pass  # Continue even if database save fails
+            feedback_dict.update(await change_feed.stamp())
+            with track_span("mongo", "feedback.insert_one"):
+                await db.feedback.insert_one(feedback_dict)
+        except Exception as e:
+            logger.error("Failed to save feedback: %s", e)  # Continue even if database save fails
+    if feedback.vendor_id:
+        await update_vendor_rating(feedback.vendor_id, feedback.rating, feedback.sentiment)
     return feedback
 
+async def update_vendor_rating(vendor_id: str, rating: int, sentiment: str):
+    """Fold one feedback rating into the vendor's aggregate"""
+    if db is not None:
+        try:
+            if await record_rating(db.vendors, vendor_id, rating, sentiment, await change_feed.stamp()) is not None:
+                return
+        except Exception as e:
+            logger.error("Failed to update vendor rating: %s", e)
+            return
+    if any(v['id'] == vendor_id for v in MOCK_VENDORS):
+        mock_vendor_ratings.record(vendor_id, rating, sentiment)
+
 @api_router.get("/feedback", response_model=List[Feedback])
 async def get_feedback(vendor_id: Optional[str] = None):
     if db is None:
@@ -376,24 +950,203 @@ async def get_feedback(vendor_id: Optional[str] = None):
         if vendor_id:
             filter_query['vendor_id'] = vendor_id
         
-        feedback_list = await db.feedback.find(filter_query).to_list(1000)
-        for feedback in feedback_list:
-            if isinstance(feedback.get('created_at'), str):
-                feedback['created_at'] = datetime.fromisoformat(feedback['created_at'])
-        return [Feedback(**feedback) for feedback in feedback_list]
-    except:
-        return []  # Return empty list on error
+        with track_span("mongo", "feedback.find"):
+            feedback_list = await db_reads.feedback.find(filter_query).to_list(1000)
+        return FEEDBACK_LIST.stored(feedback_list)
+    except Exception as e:
+        logger.error("Failed to load feedback: %s", e)
+        raise HTTPException(status_code=503, detail="Feedback is temporarily unavailable")
+
+@api_router.get("/sync")
+async def sync(since: int = Query(0, ge=0), catalog_version: Optional[str] = None,
+               collections: Optional[str] = None, vendor_id: Optional[str] = None,
+               limit: int = Query(500, ge=1, le=1000)):
+    """Records changed since the client's cursor, and the catalog if its version changed
+
+    Pass the returned ``cursor`` as ``since`` next time (0 for a full sync),
+    and ``catalog_version`` as returned. Apply records by id; one may be
+    sent again. Remove the ids listed under ``deleted``. Repeat while
+    ``has_more`` is true.
+    """
+    names = [n for n in (collections.split(",") if collections else SYNC_COLLECTIONS) if n in SYNC_COLLECTIONS]
+    changes, deleted, results = {}, {}, []
+    if db is None:
+        # Only the mock vendors exist, and they never change
+        for name in names:
+            changes[name] = mock_vendor_records() if name == "vendors" and since == 0 else []
+            deleted[name] = []
+    else:
+        try:
+            for name in names:
+                query = {"vendor_id": vendor_id} if vendor_id and name != "vendors" else {}
+                # The primary, so a lagging secondary can never move a cursor past a change
+                documents, bound, more = await change_feed.changes(db[name], query, since, limit)
+                changes[name] = documents
+                results.append((documents, bound, more))
+                deleted[name] = []
+                if since > 0:
+                    # A full sync only returns what exists, so it needs no tombstones
+                    tombstones, bound, more = await change_feed.changes(
+                        change_feed.tombstones, {"collection": name, **query}, since, limit)
+                    deleted[name] = [tombstone["id"] for tombstone in tombstones]
+                    results.append((tombstones, bound, more))
+        except Exception as e:
+            logger.error("Sync failed: %s", e)
+            raise HTTPException(status_code=503, detail="Sync is temporarily unavailable")
+    catalog = catalog_store.current()
+    catalog_changes = {"version": catalog.content_hash, "changed": catalog_version != catalog.content_hash}
+    if catalog_changes["changed"]:
+        catalog_changes["attractions"] = catalog.attractions
+        catalog_changes["hotels"] = catalog.hotels
+    return {
+        "cursor": next_cursor(since, results),
+        "has_more": any(more for _, _, more in results),
+        "changes": changes,
+        "deleted": deleted,
+        "catalog": catalog_changes,
+    }
+
+# Itineraries, kept in memory when there is no database
+mock_itineraries: Dict[str, Dict[str, Any]] = {}
+
+async def load_itinerary(itinerary_id: str, primary: bool = False) -> Dict[str, Any]:
+    """The stored itinerary, or 404; ``primary`` for reads that are written back"""
+    if db is None:
+        itinerary = mock_itineraries.get(itinerary_id)
+    else:
+        try:
+            with track_span("mongo", "itineraries.find_one"):
+                itinerary = await (db if primary else db_reads).itineraries.find_one({"id": itinerary_id}, {"_id": 0})
+        except Exception as e:
+            logger.error("Failed to load itinerary %s: %s", itinerary_id, e)
+            raise HTTPException(status_code=503, detail="Itineraries are temporarily unavailable")
+    if itinerary is None:
+        raise HTTPException(status_code=404, detail="Itinerary not found")
+    return itinerary
+
+async def save_itinerary(itinerary: Dict[str, Any]):
+    if db is None:
+        mock_itineraries[itinerary["id"]] = itinerary
+        return
+    try:
+        with track_span("mongo", "itineraries.update_one"):
+            await db.itineraries.update_one({"id": itinerary["id"]}, {"$set": itinerary}, upsert=True)
+    except Exception as e:
+        logger.error("Failed to save itinerary %s: %s", itinerary["id"], e)
+        raise HTTPException(status_code=503, detail="Itineraries are temporarily unavailable")
+
+@api_router.post("/itineraries", response_model=Itinerary, status_code=201)
+async def create_itinerary(itinerary: Itinerary):
+    now = datetime.now(timezone.utc).isoformat()
+    itinerary_dict = {**itinerary.dict(), "id": str(uuid.uuid4()), "created_at": now, "updated_at": now}
+    await save_itinerary(itinerary_dict)
+    return itinerary_dict
+
+@api_router.get("/itineraries/{itinerary_id}", response_model=Itinerary)
+async def get_itinerary(itinerary_id: str):
+    return await load_itinerary(itinerary_id)
+
+@api_router.put("/itineraries/{itinerary_id}", response_model=Itinerary)
+async def update_itinerary(itinerary_id: str, changes: Dict[str, Any]):
+    itinerary = await load_itinerary(itinerary_id, primary=True)
+    fields = set(Itinerary.model_fields) - {"id", "created_at", "updated_at"}
+    itinerary.update({key: value for key, value in changes.items() if key in fields})
+    itinerary["updated_at"] = datetime.now(timezone.utc).isoformat()
+    await save_itinerary(itinerary)
+    return itinerary
+
+# Tour state per itinerary, tagged with the updated_at it was built from
+itinerary_plans: Dict[str, Any] = {}
+ITINERARY_EDIT_SECONDS = histogram('itinerary_edit_seconds', 'Incremental itinerary edit time', ('op',))
+
+def itinerary_plan(itinerary: Dict[str, Any]) -> ItineraryPlan:
+    """Tour state for an itinerary, rebuilt only when it changed some other way than by an edit here"""
+    cached = itinerary_plans.get(itinerary["id"])
+    if cached and cached[0] == itinerary["updated_at"]:
+        return cached[1]
+    plan = ItineraryPlan.from_itinerary(itinerary)
+    itinerary_plans[itinerary["id"]] = (itinerary["updated_at"], plan)
+    return plan
+
+@api_router.post("/itineraries/{itinerary_id}/edits")
+async def edit_itinerary(itinerary_id: str, edit: Dict[str, Any]):
+    """Add, move or remove one attraction and re-optimize only the days it touches"""
+    itinerary = await load_itinerary(itinerary_id, primary=True)
+    started = time.perf_counter()
+    plan = itinerary_plan(itinerary)
+    try:
+        changed = plan.apply(edit)
+    except EditError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    itinerary["days"] = plan.to_days()
+    itinerary["updated_at"] = datetime.now(timezone.utc).isoformat()
+    try:
+        await save_itinerary(itinerary)
+    except HTTPException:
+        # The cached plan has the edit the database missed
+        itinerary_plans.pop(itinerary_id, None)
+        raise
+    itinerary_plans[itinerary_id] = (itinerary["updated_at"], plan)
+    elapsed = time.perf_counter() - started
+    ITINERARY_EDIT_SECONDS.observe(elapsed, op=edit["op"])
+    return {**plan.summary(changed), "updated_at": itinerary["updated_at"], "elapsed_ms": round(elapsed * 1000, 2)}
+
+@api_router.get("/itineraries/{itinerary_id}/export")
+async def export_itinerary(itinerary_id: str, export_format: str = Query("json", alias="format")):
+    """Export itinerary as JSON, PDF (with a map per day), ICS calendar or GPX track"""
+    itinerary = await load_itinerary(itinerary_id)
+    if export_format == "json":
+        return itinerary
+    try:
+        # Waits on the render pool, so keep it off the event loop
+        content, media_type, filename = await asyncio.to_thread(render_export, itinerary, export_format)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RenderTimeout:
+        raise HTTPException(status_code=503, detail="Export is taking too long, please retry")
+    return Response(content, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# Route planning
+@api_router.post("/routes/optimize")
+async def optimize_itinerary(request: TripPlanRequest):
+    """Plan a multi-day itinerary within daily hours, with hotel overnights between days"""
+    if not request.attractions:
+        raise HTTPException(status_code=400, detail="Attractions list is required")
+    try:
+        # CPU-bound for up to PLANNER_CPU_BUDGET_MS; keep it off the event loop
+        return await asyncio.to_thread(
+            plan_trip, request.attractions, start_location=request.start_location,
+            start_date=request.start_date, days=request.days,
+            day_start=request.day_start, day_end=request.day_end)
+    except PlanningError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.post("/routes/matrix")
+async def calculate_route_matrix(payload: Any = Body(...)):
+    """Distances and durations for many origin/destination pairs, streamed as NDJSON"""
+    try:
+        # Geocodes the request's addresses, which blocks
+        lines = await asyncio.to_thread(route_matrix, payload)
+    except MatrixError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.on_event("shutdown")
+async def stop_export_pool():
+    await asyncio.to_thread(shutdown_export_pool)
 
 # Contact Information
 @api_router.get("/contact/{vendor_id}")
 async def get_contact(vendor_id: str):
     if db is not None:
         try:
-            vendor = await db.vendors.find_one({"id": vendor_id})
+            with track_span("mongo", "vendors.find_one"):
+                vendor = await db_reads.vendors.find_one({"id": vendor_id})
             if vendor:
                 return {"phone": vendor.get('phone'), "name": vendor.get('name')}
-        except:
-            pass
+        except Exception as e:
+            logger.error("Vendor contact lookup failed: %s", e)
     
     # Fallback to mock data
     for vendor in MOCK_VENDORS:
@@ -403,78 +1156,135 @@ async def get_contact(vendor_id: str):
     raise HTTPException(status_code=404, detail="Vendor not found")
 
 # Multilingual Chatbot
-@api_router.post("/chat")
-async def chat_with_bot(message: ChatMessage):
-    def get_contextual_fallback(user_message: str, language: str):
-        """Generate contextual fallback responses based on user input"""
-        user_lower = user_message.lower()
-        
-        # Tourism-related responses
-        if any(word in user_lower for word in ['place', 'visit', 'tourist', 'attraction', 'spot', 'go', 'see']):
-            if language == "hindi":
-                return "झारखंड में कई खूबसूरत जगहें हैं! 🏔️\n\n🌊 हुंद्रू फॉल्स - राज्य का सबसे प्रसिद्ध झरना\n🦁 बेतला राष्ट्रीय उद्यान - वन्यजीव सफारी के लिए\n🏛️ रांची - राजधानी शहर\n⛰️ नेतरहाट - झारखंड का दिल\n\nआप किस जगह के बारे में और जानना चाहते हैं?"
-            return "Jharkhand has many beautiful places to visit! 🏔️\n\n🌊 Hundru Falls - The state's most famous waterfall\n🦁 Betla National Park - For wildlife safari\n🏛️ Ranchi - The capital city\n⛰️ Netarhat - The heart of Jharkhand\n\nWhich place would you like to know more about?"
-        
-        elif any(word in user_lower for word in ['food', 'eat', 'cuisine', 'dish']):
-            if language == "hindi":
-                return "झारखंड का स्थानीय भोजन बहुत स्वादिष्ट है! 🍽️\n\n🥘 लिट्टी चोखा\n🍖 मटन करी\n🌾 चावल और दाल\n🥯 दूधपूरी\n🍜 रागी रोटी\n\nकौन सा व्यंजन आपको दिलचस्प लगता है?"
-            return "Jharkhand has delicious local cuisine! 🍽️\n\n🥘 Litti Chokha\n🍖 Mutton Curry\n🌾 Rice and Dal\n🥯 Dhudhpuri\n🍜 Ragi Roti\n\nWhich dish interests you?"
-        
-        elif any(word in user_lower for word in ['culture', 'festival', 'tradition', 'dance']):
-            if language == "hindi":
-                return "झारखंड की संस्कृति बहुत समृद्ध है! 🎭\n\n🎪 सरहुल - मुख्य त्योहार\n💃 छऊ नृत्य\n🎨 आदिवासी कला\n🏛️ पारंपरिक शिल्प\n🎵 लोक संगीत\n\nआप किस सांस्कृतिक पहलू के बारे में जानना चाहते हैं?"
-            return "Jharkhand has a rich cultural heritage! 🎭\n\n🎪 Sarhul - Main festival\n💃 Chhau dance\n🎨 Tribal art\n🏛️ Traditional crafts\n🎵 Folk music\n\nWhich cultural aspect would you like to explore?"
-        
-        elif any(word in user_lower for word in ['hotel', 'stay', 'accommodation', 'book']):
-            if language == "hindi":
-                return "झारखंड में ठहरने के लिए कई विकल्प हैं! 🏨\n\n🏨 रांची हेरिटेज होटल - ₹2500/रात\n🏡 गेस्ट हाउस\n⛺ इको रिसॉर्ट्स\n🏕️ कैंपिंग साइट्स\n\nआप किस प्रकार का आवास पसंद करेंगे?"
-            return "There are many accommodation options in Jharkhand! 🏨\n\n🏨 Ranchi Heritage Hotel - ₹2500/night\n🏡 Guest Houses\n⛺ Eco Resorts\n🏕️ Camping Sites\n\nWhat type of accommodation would you prefer?"
-        
-        # Default fallback
-        if language == "hindi":
-            return "नमस्ते! मैं आपका झारखंड पर्यटन सहायक हूँ। 🙏\n\nमैं आपकी मदद कर सकता हूँ:\n• पर्यटन स्थलों की जानकारी\n• स्थानीय भोजन\n• संस्कृति और त्योहार\n• आवास विकल्प\n\nआप क्या जानना चाहते हैं?"
-        return "Hello! I'm your Jharkhand tourism assistant! 🙏\n\nI can help you with:\n• Tourist attractions\n• Local food\n• Culture & festivals\n• Accommodation options\n\nWhat would you like to know?"
-    
-    # Use contextual fallback response
-    fallback_response = get_contextual_fallback(message.user_message, message.language)
-    
+CHAT_ANSWERS = counter('chat_answers_total', 'Chat replies by where the answer came from', ('source',))
+
+# Catalog and vendor index used to ground and short-circuit chat answers
+chat_knowledge = ChatKnowledgeBase()
+chat_vendors_loaded_at = 0.0
+CHAT_VENDOR_REFRESH_SECONDS = float(os.environ.get('CHAT_VENDOR_REFRESH_SECONDS', 300))
+
+async def refresh_chat_vendors():
+    global chat_vendors_loaded_at
+    await sync_vendor_caches()
+    if time.monotonic() - chat_vendors_loaded_at < CHAT_VENDOR_REFRESH_SECONDS:
+        return
+    chat_vendors_loaded_at = time.monotonic()
+    vendors = MOCK_VENDORS
+    if db is not None:
+        try:
+            with track_span("mongo", "vendors.find"):
+                vendors = await db_reads.vendors.find({}, {"_id": 0}).to_list(1000) or MOCK_VENDORS
+        except Exception as e:
+            logger.error("Failed to load vendors for chat index: %s", e)
+    chat_knowledge.set_vendors(vendors)
+
+# Recent turns per chat session, bounded by a token budget
+chat_sessions = SessionStore(
+    max_sessions=int(os.environ.get('CHAT_SESSION_MAX', 10000)),
+    ttl=float(os.environ.get('CHAT_SESSION_TTL_SECONDS', 1800)),
+    max_turns=int(os.environ.get('CHAT_SESSION_MAX_TURNS', 8)),
+    token_budget=int(os.environ.get('CHAT_SESSION_TOKEN_BUDGET', 600)),
+)
+
+async def load_session_turns(session_id: str, limit: int):
+    """Load the latest turns of a session from chat history, oldest first"""
+    if db is None:
+        return []
+    try:
+        with track_span("mongo", "chat_history.find"):
+            records = await db.chat_history.find(
+                {"session_id": session_id}, {"_id": 0, "user_message": 1, "bot_response": 1}
+            ).sort("created_at", -1).limit(limit).to_list(limit)
+    except Exception as e:
+        logger.error("Failed to hydrate chat session: %s", e)
+        return []
+    return [(r["user_message"], r["bot_response"]) for r in reversed(records)]
+
+async def count_session_turns(session_id: str) -> Optional[int]:
+    if db is None:
+        return None
+    try:
+        with track_span("mongo", "chat_history.count_documents"):
+            return await db.chat_history.count_documents({"session_id": session_id})
+    except Exception as e:
+        logger.error("Failed to count chat session turns: %s", e)
+        return None
+
+async def save_chat_record(message: ChatMessage, response: str, session=None):
+    if session is not None:
+        chat_sessions.record_turn(session, message.user_message, response)
+    if db is None:
+        return
+    try:
+        chat_record = {
+            "id": message.id,
+            "session_id": message.session_id,
+            "user_message": message.user_message,
+            "bot_response": response,
+            "language": message.language,
+            "user_type": message.user_type,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **expiry("chat_history"),
+        }
+        with track_span("mongo", "chat_history.insert_one"):
+            await db.chat_history.insert_one(chat_record)
+    except Exception as db_exc:
+        logger.error("Failed to save chat history: %s", db_exc)
+
+@api_router.post("/chat", dependencies=[Depends(enforce_chat_rate_limit)])
+async def chat_with_bot(message: ChatMessage, request: Request):
+    message.session_id = message.session_id or request.headers.get("X-Session-Id")
+    session = None
+    if message.session_id:
+        await check_rate_limit(chat_session_limiter, message.session_id)
+        # With several workers, another one may have served this session's latest turns
+        version = await count_session_turns(message.session_id) if WORKERS > 1 else None
+        session = await chat_sessions.get_or_hydrate(message.session_id, load_session_turns, version)
+
+    intent = classify_intent(message.user_message)
+    if route_for(intent) == CANNED:
+        answer = canned_answer(intent, message.language)
+        CHAT_ANSWERS.inc(source="canned")
+        await save_chat_record(message, answer, session)
+        return {"response": answer, "language": message.language}
+
+    await refresh_chat_vendors()
+    # Simple catalog lookups are answered from the local index, no LLM round-trip
+    direct_answer = chat_knowledge.answer_directly(message.user_message, message.language)
+    if direct_answer is not None:
+        CHAT_ANSWERS.inc(source="catalog")
+        await save_chat_record(message, direct_answer, session)
+        return {"response": direct_answer, "language": message.language}
+
     try:
         language_instruction = ""
         if message.language == "hindi":
             language_instruction = "Please respond in Hindi (Devanagari script). "
         system_message = f"{language_instruction}You are a helpful tourism assistant for Jharkhand state in India. Provide information about tourist spots, local culture, food, festivals, and travel tips. Be friendly and informative."
-        response = get_gemini_response(system_message, message.user_message)
-        # Try to save to database if available
-        if db is not None:
-            try:
-                chat_record = {
-                    "id": message.id,
-                    "user_message": message.user_message,
-                    "bot_response": response,
-                    "language": message.language,
-                    "user_type": message.user_type,
-                    "created_at": datetime.now(timezone.utc).isoformat()
-                }
-                await db.chat_history.insert_one(chat_record)
-            except Exception as db_exc:
-                print(f"[DB ERROR] {db_exc}")
+        context = chat_knowledge.build_context(message.user_message)
+        if context:
+            system_message += f" When naming specific places, hotels, guides or prices, use only these catalog facts:\n{context}"
+        history = session.prompt_history() if session is not None else ""
+        if history:
+            system_message += f"\n\nConversation so far:\n{history}"
+        # Identical prompts with identical history share one call
+        flight_key = (message.language, " ".join(message.user_message.casefold().split()), history)
+        response = await chat_flights.do(
+            flight_key,
+            lambda: gemini_breaker.call(get_gemini_response, system_message, message.user_message),
+        )
+        CHAT_ANSWERS.inc(source="llm")
+        await save_chat_record(message, response, session)
         return {"response": response, "language": message.language}
     except Exception as e:
-        print(f"[GEMINI ERROR] {e}")
-        # Try to save to database with fallback response
-        if db is not None:
-            try:
-                chat_record = {
-                    "id": message.id,
-                    "user_message": message.user_message,
-                    "bot_response": fallback_response,
-                    "language": message.language,
-                    "user_type": message.user_type,
-                    "created_at": datetime.now(timezone.utc).isoformat()
-                }
-                await db.chat_history.insert_one(chat_record)
-            except Exception as db_exc:
-                print(f"[DB ERROR] {db_exc}")
+        if isinstance(e, CircuitOpenError):
+            logger.debug("Gemini circuit open, answering from fallback")
+        else:
+            logger.error("Gemini call failed, using fallback: %r", e)
+        # Only built when the LLM path fails
+        fallback_response = canned_answer(intent, message.language)
+        CHAT_ANSWERS.inc(source="fallback")
+        await save_chat_record(message, fallback_response, session)
         return {"response": fallback_response, "language": message.language}
 
 # Emergency endpoints
@@ -482,24 +1292,119 @@ class EmergencySOSRequest(BaseModel):
     location: Dict[str, float]
     message: str = "Emergency SOS"
 
+    @field_validator("location")
+    @classmethod
+    def has_coordinates(cls, value):
+        if 'lat' not in value or 'lng' not in value:
+            raise ValueError("location needs lat and lng")
+        return value
+
+dispatch_tasks = set()
+
 @api_router.post("/emergency/sos")
 async def emergency_sos(request: EmergencySOSRequest):
+    raised_at = time.perf_counter()
     emergency_record = {
         "id": str(uuid.uuid4()),
         "location": request.location,
         "message": request.message,
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "status": "active"
+        "status": "active",
+        **expiry("emergency_alerts"),
     }
-    
-    if db is not None:
+    responders = nearest_responders(request.location)
+    # The dispatcher stores the alert while notifying, so a slow database can't delay the notifications
+    try:
+        await work_queue.submit(URGENT, alert_dispatcher.dispatch, emergency_record, raised_at, responders,
+                                name="sos_dispatch")
+    except RuntimeError:
+        # Work queue not running (no startup events); never drop an alert
+        task = asyncio.create_task(alert_dispatcher.dispatch(emergency_record, raised_at, responders))
+        # The loop only keeps weak references to tasks
+        dispatch_tasks.add(task)
+        task.add_done_callback(dispatch_tasks.discard)
+    return {
+        "status": "SOS sent",
+        "emergency_id": emergency_record["id"],
+        "responders": [{key: r[key] for key in ("id", "name", "kind", "contact", "distance_km")} for r in responders],
+    }
+
+@api_router.get("/emergency/{emergency_id}")
+async def get_emergency(emergency_id: str):
+    """An SOS alert with the delivery status of its notifications"""
+    alert = alert_dispatcher.recent.get(emergency_id)
+    if alert is None and db is not None:
         try:
-            await db.emergency_alerts.insert_one(emergency_record)
-        except:
-            pass  # Continue even if database save fails
-    
-    # In a real implementation, this would trigger notifications to authorities
-    return {"status": "SOS sent", "emergency_id": emergency_record["id"]}
+            with track_span("mongo", "emergency_alerts.find_one"):
+                alert = await db_reads.emergency_alerts.find_one({"id": emergency_id}, {"_id": 0})
+        except Exception as e:
+            logger.error("Failed to load emergency alert %s: %s", emergency_id, e)
+            raise HTTPException(status_code=503, detail="Emergency alerts are temporarily unavailable")
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Emergency alert not found")
+    return alert
+
+@api_router.get("/analytics/summary")
+async def analytics_summary():
+    """Platform-wide counts, as of the last analytics rollup"""
+    if db is None:
+        raise HTTPException(status_code=503, detail="Analytics need a database")
+    return await stored_summary(db)
+
+# Background jobs
+CACHE_WARM_INTERVAL_SECONDS = float(os.environ.get('CACHE_WARM_INTERVAL_SECONDS', 300))
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_ROLLUP_INTERVAL_SECONDS', 300))
+CHAT_SESSION_COMPACT_INTERVAL_SECONDS = float(os.environ.get('CHAT_SESSION_COMPACT_INTERVAL_SECONDS', 60))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get('ARCHIVE_INTERVAL_SECONDS', 3600))
+WARMUP_TIMEOUT_SECONDS = float(os.environ.get('WARMUP_TIMEOUT_SECONDS', 10))
+
+def build_catalog_indexes():
+    catalog_store.current()
+    attraction_grid()
+    responder_grids()
+
+async def warm_catalog():
+    await asyncio.to_thread(build_catalog_indexes)
+
+async def warm_chat():
+    await refresh_chat_vendors()
+    await asyncio.to_thread(chat_knowledge.index)
+
+async def compact_chat_sessions():
+    return chat_sessions.prune()
+
+async def refresh_analytics():
+    return await refresh_summary(db)
+
+async def bury_archived(collection: str, records: List[Dict[str, Any]]):
+    # Synced clients learn of archived records through tombstones
+    if collection in SYNC_COLLECTIONS:
+        await change_feed.bury(collection, records)
+
+async def archive_history():
+    # MongoDB's TTL monitor removes expired records itself
+    return await run_retention(db, ARCHIVE_DIR, native_ttl=USING_MONGO, on_delete=bury_archived)
+
+@app.on_event("startup")
+async def start_scheduler():
+    scheduler.add("warm_catalog", warm_catalog, CACHE_WARM_INTERVAL_SECONDS)
+    scheduler.add("warm_chat", warm_chat, CACHE_WARM_INTERVAL_SECONDS)
+    scheduler.add("compact_chat_sessions", compact_chat_sessions, CHAT_SESSION_COMPACT_INTERVAL_SECONDS)
+    if db is not None:
+        scheduler.add("refresh_analytics", refresh_analytics, ANALYTICS_ROLLUP_INTERVAL_SECONDS,
+                      exclusive=True, run_at_start=True)
+        scheduler.add("archive_history", archive_history, ARCHIVE_INTERVAL_SECONDS, exclusive=True)
+    # Warm this worker's caches before it takes traffic, so no request pays for it
+    try:
+        await asyncio.wait_for(asyncio.gather(scheduler.run("warm_catalog"), scheduler.run("warm_chat")),
+                               WARMUP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("Cache warm-up took over %ss; serving while it finishes", WARMUP_TIMEOUT_SECONDS)
+    scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -518,13 +1423,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# Sets the response format (JSON or MessagePack) for everything inside it
+app.add_middleware(ContentNegotiationMiddleware)
+# Outermost, so every response (including CORS, error and MessagePack responses) is compressed
+app.add_middleware(CompressionMiddleware)
 
 if __name__ == "__main__":
     import uvicorn
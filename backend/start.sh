@@ -1,2 +1,2 @@
 #!/bin/bash
-uvicorn server_integrated:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+gunicorn -c gunicorn.conf.py server_integrated:app
\ No newline at end of file
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import; run it on a throwaway local store
+os.environ["MONGO_URL"] = ""
+os.environ["LOCAL_DATA_DIR"] = tempfile.mkdtemp()
+# Geocode against the built-in city table, not Google
+os.environ["GOOGLE_MAPS_API_KEY"] = ""
+
+
+@pytest.fixture(scope="session")
+def client():
+    from starlette.testclient import TestClient
+
+    import server_integrated
+
+    with TestClient(server_integrated.app) as client:
+        yield client
@@ -0,0 +1,54 @@
+import asyncio
+
+from utils.booking_engine import BookingEngine, LocalAvailabilityStore
+
+
+def make_engine(vendors):
+    async def lookup(vendor_id):
+        return vendors.get(vendor_id)
+    return BookingEngine(LocalAvailabilityStore(), lookup)
+
+
+def test_vendor_without_availability_is_bookable_up_to_capacity():
+    vendor = {"id": "guide-1", "daily_capacity": 2}
+    engine = make_engine({"guide-1": vendor})
+
+    async def scenario():
+        await engine.register_vendor(vendor)
+        return [await engine.reserve("guide-1", "2026-10-19") for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [True, True, False]
+
+
+def test_vendor_with_availability_only_takes_declared_dates():
+    vendor = {"id": "hotel-1", "availability": ["2026-10-20"]}
+    engine = make_engine({"hotel-1": vendor})
+
+    async def scenario():
+        await engine.register_vendor(vendor)
+        return await engine.reserve("hotel-1", "2026-10-19"), await engine.reserve("hotel-1", "2026-10-20")
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_unknown_vendor_is_not_bookable():
+    engine = make_engine({})
+    assert asyncio.run(engine.reserve("missing", "2026-10-19")) is False
+
+
+def test_vendor_without_availability_is_listed_until_full():
+    open_vendor = {"id": "guide-1"}
+    dated_vendor = {"id": "hotel-1", "availability": ["2026-10-20"]}
+    engine = make_engine({"guide-1": open_vendor, "hotel-1": dated_vendor})
+
+    async def scenario():
+        await engine.register_vendor(open_vendor)
+        await engine.register_vendor(dated_vendor)
+        before = sorted(await engine.available_vendor_ids("2026-10-20")), await engine.available_vendor_ids("2026-10-21")
+        await engine.reserve("guide-1", "2026-10-20")
+        after = await engine.available_vendor_ids("2026-10-20"), await engine.available_vendor_ids("2026-10-21")
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before == (["guide-1", "hotel-1"], ["guide-1"])
+    assert after == (["hotel-1"], ["guide-1"])
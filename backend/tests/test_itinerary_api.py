@@ -0,0 +1,78 @@
+import pytest
+
+from data.catalog_loader import get_catalog
+from utils.tour_state import stop_id
+
+
+@pytest.fixture
+def itinerary(client):
+    attractions = [a["id"] for a in get_catalog().attractions[:4]]
+    response = client.post("/api/itineraries", json={
+        "title": "Weekend in Ranchi",
+        "start_date": "2026-11-06",
+        "days": [{"attractions": attractions[:2]}, {"attractions": attractions[2:]}],
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+@pytest.mark.parametrize("export_format, media_type, signature", [
+    ("pdf", "application/pdf", b"%PDF"),
+    ("ics", "text/calendar", b"BEGIN:VCALENDAR"),
+    ("gpx", "application/gpx+xml", b"<?xml"),
+])
+def test_export_formats(client, itinerary, export_format, media_type, signature):
+    response = client.get(f"/api/itineraries/{itinerary['id']}/export", params={"format": export_format})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(media_type)
+    assert f"itinerary-{itinerary['id']}.{export_format}" in response.headers["content-disposition"]
+    assert response.content.startswith(signature)
+
+
+def test_export_json_and_unknown_format(client, itinerary):
+    assert client.get(f"/api/itineraries/{itinerary['id']}/export").json()["id"] == itinerary["id"]
+    assert client.get(f"/api/itineraries/{itinerary['id']}/export", params={"format": "docx"}).status_code == 400
+
+
+def test_export_missing_itinerary(client):
+    assert client.get("/api/itineraries/nope/export", params={"format": "pdf"}).status_code == 404
+
+
+def day_orders(client, itinerary_id):
+    days = client.get(f"/api/itineraries/{itinerary_id}").json()["days"]
+    return [[stop_id(stop) for stop in day["attractions"]] for day in days]
+
+
+def test_edit_add(client, itinerary):
+    new = get_catalog().attractions[4]["id"]
+    response = client.post(f"/api/itineraries/{itinerary['id']}/edits",
+                           json={"op": "add", "attraction_id": new, "day": 0})
+    assert response.status_code == 200
+    assert [day["label"] for day in response.json()["days"]] == ["Day 1"]
+    assert new in response.json()["days"][0]["order"]
+    assert new in day_orders(client, itinerary["id"])[0]
+
+
+def test_edit_remove(client, itinerary):
+    removed = itinerary["days"][0]["attractions"][0]
+    response = client.post(f"/api/itineraries/{itinerary['id']}/edits",
+                           json={"op": "remove", "attraction_id": removed})
+    assert response.status_code == 200
+    assert removed not in sum(day_orders(client, itinerary["id"]), [])
+
+
+def test_edit_move(client, itinerary):
+    moved = itinerary["days"][0]["attractions"][0]
+    response = client.post(f"/api/itineraries/{itinerary['id']}/edits",
+                           json={"op": "move", "attraction_id": moved, "day": 1, "position": 0})
+    assert response.status_code == 200
+    assert [day["label"] for day in response.json()["days"]] == ["Day 1", "Day 2"]
+    days = day_orders(client, itinerary["id"])
+    assert moved not in days[0] and days[1][0] == moved
+
+
+def test_invalid_edits(client, itinerary):
+    url = f"/api/itineraries/{itinerary['id']}/edits"
+    assert client.post(url, json={"op": "remove", "attraction_id": "not-there"}).status_code == 400
+    assert client.post(url, json={"op": "rotate", "attraction_id": "x"}).status_code == 400
+    assert client.post("/api/itineraries/nope/edits", json={"op": "remove", "attraction_id": "x"}).status_code == 404
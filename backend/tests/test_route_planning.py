@@ -0,0 +1,39 @@
+import json
+
+from data.catalog_loader import get_catalog
+
+
+def test_optimize_plans_every_attraction(client):
+    attractions = [a["id"] for a in get_catalog().attractions[:6]]
+    response = client.post("/api/routes/optimize", json={"attractions": attractions, "start_date": "2026-11-06"})
+    assert response.status_code == 200
+    plan = response.json()
+    planned = [stop["id"] for day in plan["optimized_days"] for stop in day["attractions"]]
+    assert sorted(planned + plan["unscheduled"]) == sorted(attractions)
+    assert plan["optimized_days"][0]["date"] == "2026-11-06"
+
+
+def test_optimize_rejects_bad_requests(client):
+    assert client.post("/api/routes/optimize", json={"attractions": []}).status_code == 400
+    assert client.post("/api/routes/optimize", json={"attractions": ["no-such-place"]}).status_code == 400
+
+
+def matrix_lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_matrix_streams_rows(client):
+    response = client.post("/api/routes/matrix", json={
+        "origins": ["Ranchi", {"lat": 22.8046, "lng": 86.2029}], "destinations": ["Dhanbad", "Patna"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = matrix_lines(response)
+    assert [line["type"] for line in lines] == ["locations", "row", "row", "done"]
+    assert all(len(line["distance_km"]) == 2 for line in lines[1:3])
+    assert lines[-1]["cells"] == 4
+
+
+def test_matrix_rejects_bodies_that_are_not_objects(client):
+    for body in ([{"origins": ["Ranchi"]}], "Ranchi", 3):
+        assert client.post("/api/routes/matrix", json=body).status_code == 400
+    assert client.post("/api/routes/matrix", json={"origins": []}).status_code == 400
@@ -0,0 +1,55 @@
+from data.catalog_loader import get_catalog
+from utils.vendor_geo import enrich_vendor, resolve_spot_ids
+
+
+def attraction_id(name):
+    return next(a['id'] for a in get_catalog().attractions if a['name'] == name)
+
+
+def vendor_payload(**overrides):
+    payload = {
+        "name": "Test Guide",
+        "type": "guide",
+        "location": "Ranchi",
+        "phone": "9999999999",
+        "services": ["tours"],
+        "nearby_spots": [],
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_spot_names_resolve_on_whole_tokens():
+    assert resolve_spot_ids(["Hundru"]) == [attraction_id("Hundru Falls")]
+    assert resolve_spot_ids(["hundru falls, Ranchi"]) == [attraction_id("Hundru Falls")]
+
+
+def test_generic_and_ambiguous_spot_names_are_dropped():
+    # "falls" is in four attraction names and "Zoological Park" in two
+    assert resolve_spot_ids(["falls", "park", "Zoological Park", "Hund"]) == []
+
+
+def test_city_only_vendor_is_located_approximately():
+    vendor = enrich_vendor({"id": "v1", "location": "Ranchi", "nearby_spots": []})
+    assert vendor['location_precision'] == 'city'
+    assert vendor['coordinates'] and vendor['geo'] is None
+
+
+def test_malformed_coordinates_are_rejected(client):
+    for coordinates in ({"lat": 23.4}, {"latitude": 23.4, "longitude": 85.4}, {"lat": "north", "lng": 85.4},
+                        {"lat": 123.0, "lng": 85.4}):
+        response = client.post("/api/vendors", json=vendor_payload(coordinates=coordinates))
+        assert response.status_code == 422, coordinates
+
+
+def test_city_only_vendor_is_not_ranked_by_distance(client):
+    hundru = get_catalog().attractions_by_id[attraction_id("Hundru Falls")]['coordinates']
+    city = client.post("/api/vendors", json=vendor_payload(name="City Guide")).json()
+    exact = client.post("/api/vendors", json=vendor_payload(name="Falls Guide", coordinates=hundru)).json()
+    assert city['location_precision'] == 'city'
+    assert exact['location_precision'] == 'exact'
+
+    response = client.get("/api/vendors/near", params={"lat": hundru['lat'], "lng": hundru['lng'], "radius_km": 200})
+    assert response.status_code == 200
+    ids = {vendor['id'] for vendor in response.json()}
+    assert exact['id'] in ids and city['id'] not in ids
@@ -0,0 +1,36 @@
+import asyncio
+
+from utils.work_queue import BACKGROUND, URGENT, PriorityWorkQueue
+
+
+def test_stop_drains_urgent_jobs_and_drops_the_rest():
+    done = []
+
+    async def job(name, seconds):
+        await asyncio.sleep(seconds)
+        done.append(name)
+
+    async def scenario():
+        queue = PriorityWorkQueue(workers=0, reserved=1)
+        queue.start()
+        await queue.submit(URGENT, job, "sos-1", 0.05)
+        await queue.submit(URGENT, job, "sos-2", 0.05)
+        background = await queue.submit(BACKGROUND, job, "rollup", 0)
+        await asyncio.sleep(0)
+        await queue.stop(drain_seconds=5)
+        return background.cancelled()
+
+    assert asyncio.run(scenario())
+    assert done == ["sos-1", "sos-2"]
+
+
+def test_stop_gives_up_on_urgent_jobs_after_the_drain_timeout():
+    async def scenario():
+        queue = PriorityWorkQueue(workers=0, reserved=1)
+        queue.start()
+        stuck = await queue.submit(URGENT, asyncio.sleep, 60)
+        await asyncio.sleep(0)
+        await asyncio.wait_for(queue.stop(drain_seconds=0.05), 1)
+        return stuck.cancelled()
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,238 @@
+"""SOS alert dispatch to the nearest police stations and hospitals.
+
+Responders come from the catalog's ``responders.json`` and are indexed in a
+grid per kind, rebuilt when the catalog changes. An alert goes to the
+``ALERT_RESPONDERS_PER_KIND`` nearest responders of each kind, through every
+configured notifier at once. Each send has its own timeout and failed sends
+are retried up to ``ALERT_SEND_ATTEMPTS`` times inside one deadline,
+``ALERT_DISPATCH_TIMEOUT_SECONDS`` after the alert was raised. The first
+attempt is made even if the deadline has already passed, so an alert that
+waited (say on a slow database) is still sent. Dispatch therefore finishes
+within the deadline plus one send timeout however slow a backend is.
+
+The alert is stored concurrently with the fan-out rather than before it,
+and the outcome of every delivery is recorded on it afterwards.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from data.catalog_loader import RESPONDER_KINDS, get_catalog
+from utils.geo_index import GridIndex
+from utils.metrics import counter, histogram, track_span
+
+logger = logging.getLogger(__name__)
+
+ALERT_NOTIFIERS = os.environ.get('ALERT_NOTIFIERS', 'log')
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL')
+ALERT_DISPATCH_TIMEOUT_SECONDS = float(os.environ.get('ALERT_DISPATCH_TIMEOUT_SECONDS', 5))
+ALERT_SEND_TIMEOUT_SECONDS = float(os.environ.get('ALERT_SEND_TIMEOUT_SECONDS', 2))
+ALERT_SEND_ATTEMPTS = int(os.environ.get('ALERT_SEND_ATTEMPTS', 3))
+RETRY_BACKOFF_SECONDS = 0.2
+ALERT_RESPONDERS_PER_KIND = int(os.environ.get('ALERT_RESPONDERS_PER_KIND', 2))
+ALERT_SEARCH_RADIUS_KM = float(os.environ.get('ALERT_SEARCH_RADIUS_KM', 150))
+RECENT_ALERTS = 256
+
+SOS_DISPATCH_SECONDS = histogram('sos_dispatch_seconds', 'Time from an SOS being raised to all notifications settling')
+SOS_DELIVERIES = counter('sos_deliveries_total', 'SOS notifications by backend and outcome', ('notifier', 'status'))
+
+
+class LogNotifier:
+    """Writes notifications to the application log"""
+    name = 'log'
+
+    async def send(self, alert: Dict[str, Any], responder: Dict[str, Any]):
+        logger.warning("SOS %s -> %s (%s, %s): %s at %s", alert['id'], responder['name'], responder['kind'],
+                       responder['contact'], alert['message'], alert['location'])
+
+
+class MemoryNotifier:
+    """Keeps notifications in memory; a stand-in backend for tests and local runs"""
+    name = 'memory'
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent: List[Tuple[str, str]] = []
+
+    async def send(self, alert: Dict[str, Any], responder: Dict[str, Any]):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("memory notifier set to fail")
+        self.sent.append((alert['id'], responder['id']))
+
+
+class WebhookNotifier:
+    """POSTs each notification as JSON to a dispatch service"""
+    name = 'webhook'
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def send(self, alert: Dict[str, Any], responder: Dict[str, Any]):
+        if self._client is None:
+            self._client = httpx.AsyncClient()
+        response = await self._client.post(self.url, json={'alert': alert, 'responder': responder})
+        response.raise_for_status()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def build_notifiers(spec: str = ALERT_NOTIFIERS) -> List[Any]:
+    """Notifiers named in a comma-separated ``ALERT_NOTIFIERS`` value"""
+    notifiers = []
+    for name in filter(None, (part.strip() for part in spec.split(','))):
+        if name == 'log':
+            notifiers.append(LogNotifier())
+        elif name == 'memory':
+            notifiers.append(MemoryNotifier())
+        elif name == 'webhook':
+            if not ALERT_WEBHOOK_URL:
+                logger.warning("ALERT_NOTIFIERS includes webhook but ALERT_WEBHOOK_URL is not set")
+                continue
+            notifiers.append(WebhookNotifier(ALERT_WEBHOOK_URL))
+        else:
+            logger.warning("Unknown alert notifier %r", name)
+    return notifiers or [LogNotifier()]
+
+
+_grids_lock = threading.Lock()
+_grids: Tuple[Optional[str], Dict[str, GridIndex]] = (None, {})
+
+
+def responder_grids() -> Dict[str, GridIndex]:
+    """Grid index of the active catalog's responders per kind, rebuilt when the catalog changes"""
+    global _grids
+    catalog = get_catalog()
+    version, grids = _grids
+    if version == catalog.content_hash:
+        return grids
+    with _grids_lock:
+        if _grids[0] != catalog.content_hash:
+            grids = {kind: GridIndex() for kind in RESPONDER_KINDS}
+            for responder in catalog.responders:
+                grids[responder['kind']].insert(responder['id'], responder['coordinates']['lat'],
+                                                responder['coordinates']['lng'], responder)
+            _grids = (catalog.content_hash, grids)
+        return _grids[1]
+
+
+def nearest_responders(location: Dict[str, float], per_kind: int = ALERT_RESPONDERS_PER_KIND,
+                       max_radius_km: float = ALERT_SEARCH_RADIUS_KM) -> List[Dict[str, Any]]:
+    """The ``per_kind`` nearest responders of each kind, nearest first within a kind"""
+    lat, lng = float(location['lat']), float(location['lng'])
+    found = []
+    for kind, grid in responder_grids().items():
+        for distance, _, responder in grid.nearest(lat, lng, k=per_kind, max_radius_km=max_radius_km):
+            found.append({**responder, 'distance_km': round(distance, 2)})
+    return found
+
+
+class AlertDispatcher:
+    def __init__(self, collection=None, notifiers: Optional[Sequence[Any]] = None,
+                 timeout: float = ALERT_DISPATCH_TIMEOUT_SECONDS, send_timeout: float = ALERT_SEND_TIMEOUT_SECONDS,
+                 attempts: int = ALERT_SEND_ATTEMPTS):
+        self.collection = collection
+        self.notifiers = list(notifiers) if notifiers is not None else build_notifiers()
+        self.timeout = timeout
+        self.send_timeout = send_timeout
+        self.attempts = attempts
+        # Outcomes of recent alerts, for status reads without a database
+        self.recent: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+    async def _deliver(self, notifier, alert: Dict[str, Any], responder: Dict[str, Any],
+                       deadline: float) -> Dict[str, Any]:
+        started = time.perf_counter()
+        status, error, attempts = 'timeout', None, 0
+        while attempts < self.attempts:
+            if attempts:
+                await asyncio.sleep(min(RETRY_BACKOFF_SECONDS * attempts, max(0.0, deadline - time.perf_counter())))
+            remaining = deadline - time.perf_counter()
+            if attempts and remaining <= 0:
+                break
+            timeout = min(self.send_timeout, remaining) if remaining > 0 else self.send_timeout
+            attempts += 1
+            try:
+                await asyncio.wait_for(notifier.send(alert, responder), timeout)
+            except asyncio.TimeoutError:
+                status, error = 'timeout', f"no answer within {timeout:.2f}s"
+            except Exception as e:
+                status, error = 'failed', str(e)
+            else:
+                status, error = 'delivered', None
+                break
+        SOS_DELIVERIES.inc(notifier=notifier.name, status=status)
+        return {
+            'responder_id': responder['id'],
+            'kind': responder['kind'],
+            'notifier': notifier.name,
+            'status': status,
+            'attempts': attempts,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+            'error': error,
+        }
+
+    async def dispatch(self, alert: Dict[str, Any], raised_at: Optional[float] = None,
+                       responders: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Notify the nearest responders of ``alert``; ``raised_at`` is its ``time.perf_counter()``"""
+        raised_at = time.perf_counter() if raised_at is None else raised_at
+        deadline = raised_at + self.timeout
+        if responders is None:
+            responders = nearest_responders(alert['location'])
+        saved = asyncio.create_task(self._save(alert)) if self.collection is not None else None
+        deliveries = await asyncio.gather(*(
+            self._deliver(notifier, alert, responder, deadline)
+            for responder in responders for notifier in self.notifiers
+        ))
+        outcome = {
+            'status': 'dispatched' if any(d['status'] == 'delivered' for d in deliveries) else 'undelivered',
+            'responders': responders,
+            'deliveries': deliveries,
+            'dispatched_at': datetime.now(timezone.utc).isoformat(),
+        }
+        SOS_DISPATCH_SECONDS.observe(time.perf_counter() - raised_at)
+        if outcome['status'] == 'undelivered':
+            logger.error("SOS %s reached no responder", alert['id'])
+        self._remember(alert['id'], {**alert, **outcome})
+        if saved is not None:
+            await saved
+            # Upsert, so the alert is stored even if the first write failed
+            fields = {key: value for key, value in alert.items() if key not in outcome}
+            try:
+                with track_span("mongo", "emergency_alerts.update_one"):
+                    await self.collection.update_one(
+                        {'id': alert['id']}, {'$set': outcome, '$setOnInsert': fields}, upsert=True)
+            except Exception as e:
+                logger.error("Failed to record dispatch of SOS %s: %s", alert['id'], e)
+        return outcome
+
+    async def _save(self, alert: Dict[str, Any]):
+        try:
+            with track_span("mongo", "emergency_alerts.insert_one"):
+                # A copy, since the insert adds _id
+                await self.collection.insert_one(dict(alert))
+        except Exception as e:
+            logger.error("Failed to save emergency alert %s: %s", alert['id'], e)
+
+    def _remember(self, alert_id: str, alert: Dict[str, Any]):
+        self.recent[alert_id] = alert
+        self.recent.move_to_end(alert_id)
+        while len(self.recent) > RECENT_ALERTS:
+            self.recent.popitem(last=False)
+
+    async def close(self):
+        for notifier in self.notifiers:
+            if hasattr(notifier, 'close'):
+                await notifier.close()
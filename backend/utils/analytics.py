@@ -0,0 +1,72 @@
+"""Admin analytics rollups.
+
+The summary behind ``/api/analytics/summary`` counts vendors, bookings,
+feedback, chat traffic and SOS alerts. Computing it reads whole
+collections, so a scheduled job computes it off the request path and stores
+it in ``analytics_rollups``; requests read the stored copy.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from utils.metrics import track_span
+
+SUMMARY = "summary"
+TOP_VENDORS = 10
+
+
+async def _scan(collection, fields):
+    with track_span("mongo", f"{collection.name}.find"):
+        return await collection.find({}, {"_id": 0, **{field: 1 for field in fields}}).to_list(None)
+
+
+def _count(values) -> Dict[str, int]:
+    # Stored documents need string keys
+    return {str(value): count for value, count in Counter(values).items() if value is not None}
+
+
+async def compute_summary(db) -> Dict[str, Any]:
+    vendors = await _scan(db.vendors, ("type",))
+    bookings = await _scan(db.bookings, ("vendor_id", "status"))
+    feedback = await _scan(db.feedback, ("rating", "sentiment"))
+    chats = await _scan(db.chat_history, ("language", "created_at"))
+    alerts = await _scan(db.emergency_alerts, ("status",))
+
+    ratings = [f["rating"] for f in feedback if f.get("rating") is not None]
+    day_ago = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    return {
+        "vendors": {"total": len(vendors), "by_type": _count(v.get("type") for v in vendors)},
+        "bookings": {
+            "total": len(bookings),
+            "by_status": _count(b.get("status") for b in bookings),
+            "top_vendors": [{"vendor_id": vendor_id, "bookings": count} for vendor_id, count
+                            in Counter(b.get("vendor_id") for b in bookings).most_common(TOP_VENDORS)],
+        },
+        "feedback": {
+            "total": len(feedback),
+            "average_rating": round(sum(ratings) / len(ratings), 2) if ratings else None,
+            "by_sentiment": _count(f.get("sentiment") for f in feedback),
+        },
+        "chat": {
+            "messages": len(chats),
+            # ISO timestamps in UTC sort as strings
+            "messages_last_24h": sum(1 for c in chats if str(c.get("created_at", "")) >= day_ago),
+            "by_language": _count(c.get("language") for c in chats),
+        },
+        "emergencies": {"total": len(alerts), "by_status": _count(a.get("status") for a in alerts)},
+    }
+
+
+async def refresh_summary(db) -> Dict[str, Any]:
+    """Recompute the summary and store it"""
+    summary = {"name": SUMMARY, "computed_at": datetime.now(timezone.utc).isoformat(), **await compute_summary(db)}
+    with track_span("mongo", "analytics_rollups.update_one"):
+        await db.analytics_rollups.update_one({"name": SUMMARY}, {"$set": summary}, upsert=True)
+    return summary
+
+
+async def stored_summary(db) -> Dict[str, Any]:
+    """The stored summary, computed now if no job has stored one yet"""
+    with track_span("mongo", "analytics_rollups.find_one"):
+        summary = await db.analytics_rollups.find_one({"name": SUMMARY}, {"_id": 0})
+    return summary if summary is not None else await refresh_summary(db)
@@ -0,0 +1,289 @@
+"""Tiered retention for chat history, feedback and SOS alerts.
+
+Records stay in their collection while recent. Once older than their
+policy's ``archive_after_days``, a scheduled job moves them to
+zstd-compressed NDJSON files under ``ARCHIVE_DIR`` and deletes them from the
+collection. Chat turns are compacted on the way: one line per conversation
+holding its turns, rather than one per turn. As a backstop, new records
+carry an ``expires_at`` date after ``ttl_days``, which a MongoDB TTL index
+enforces (the local store has no TTL monitor, so the job deletes them).
+
+Each archive file starts with a header line naming its collection. A record
+deleted only after its file is safely written may be archived twice if the
+job dies in between; replay upserts by ``id``, so that is harmless.
+
+Export and replay from the command line, in the backend directory::
+
+    python -m utils.archive export chat_history --before 2026-01-01 --output chats.ndjson.zst
+    python -m utils.archive replay local_data/archive/chat_history/*.ndjson.zst --into chat_history_restored
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+import zstandard
+
+from utils.metrics import counter, track_span
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH = int(os.environ.get('ARCHIVE_BATCH', 5000))
+ARCHIVE_ZSTD_LEVEL = int(os.environ.get('ARCHIVE_ZSTD_LEVEL', 9))
+ARCHIVE_SCHEMA_VERSION = 1
+SUFFIX = '.ndjson.zst'
+
+ARCHIVED_RECORDS = counter('archived_records_total', 'Records moved from a collection to archive files', ('collection',))
+EXPIRED_RECORDS = counter('expired_records_total', 'Records deleted by the local TTL sweep', ('collection',))
+
+
+class RetentionPolicy:
+    def __init__(self, collection: str, time_field: str, archive_after_days: float, ttl_days: float,
+                 group_by: Optional[str] = None):
+        self.collection = collection
+        self.time_field = time_field
+        self.archive_after_days = archive_after_days
+        # 0 disables the TTL backstop
+        self.ttl_days = ttl_days
+        self.group_by = group_by
+
+
+def _days(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+POLICIES = {
+    policy.collection: policy for policy in (
+        RetentionPolicy('chat_history', 'created_at', _days('CHAT_ARCHIVE_AFTER_DAYS', 14),
+                        _days('CHAT_HISTORY_TTL_DAYS', 30), group_by='session_id'),
+        RetentionPolicy('feedback', 'created_at', _days('FEEDBACK_ARCHIVE_AFTER_DAYS', 180),
+                        _days('FEEDBACK_TTL_DAYS', 0)),
+        RetentionPolicy('emergency_alerts', 'timestamp', _days('EMERGENCY_ARCHIVE_AFTER_DAYS', 90),
+                        _days('EMERGENCY_TTL_DAYS', 0)),
+    )
+}
+
+
+def expiry(collection: str) -> Dict[str, Any]:
+    """Fields to add to a new record of ``collection`` so the TTL index removes it in time"""
+    policy = POLICIES.get(collection)
+    if policy is None or not policy.ttl_days:
+        return {}
+    return {'expires_at': datetime.now(timezone.utc) + timedelta(days=policy.ttl_days)}
+
+
+async def create_ttl_indexes(db):
+    for policy in POLICIES.values():
+        try:
+            with track_span("mongo", f"{policy.collection}.create_index"):
+                await db[policy.collection].create_index([(policy.time_field, 1)])
+                await db[policy.collection].create_index([('expires_at', 1)], expireAfterSeconds=0)
+        except Exception as e:
+            logger.error("Failed to create retention indexes on %s: %s", policy.collection, e)
+
+
+# Archive files
+
+def _compact(policy: RetentionPolicy, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Archive lines for records sorted by time; grouped records become one line per group"""
+    for record in records:
+        record.pop('expires_at', None)
+    if policy.group_by is None:
+        return records
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for record in records:
+        key = record.pop(policy.group_by, None)
+        groups.setdefault(key, {policy.group_by: key, 'records': []})['records'].append(record)
+    return list(groups.values())
+
+
+def expand(header: Dict[str, Any], line: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """The records an archive line holds"""
+    group_by = header.get('group_by')
+    if group_by is None:
+        yield line
+        return
+    for record in line['records']:
+        yield {**record, group_by: line[group_by]}
+
+
+def write_archive(path: Path, collection: str, lines: Iterable[Dict[str, Any]], group_by: Optional[str] = None,
+                  level: int = ARCHIVE_ZSTD_LEVEL) -> int:
+    """Write an archive file atomically; returns the number of lines after the header"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+    count = 0
+    with open(partial, 'wb') as raw:
+        with zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=False) as writer:
+            writer.write(orjson.dumps({
+                'archive': collection,
+                'schema_version': ARCHIVE_SCHEMA_VERSION,
+                'group_by': group_by,
+                'created_at': datetime.now(timezone.utc).isoformat(),
+            }) + b'\n')
+            for line in lines:
+                writer.write(orjson.dumps(line) + b'\n')
+                count += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    partial.replace(path)
+    return count
+
+
+def read_archive(path: Path):
+    """(header, iterator of lines) of an archive file"""
+    stream = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')), encoding='utf-8')
+    header = orjson.loads(stream.readline())
+    if 'archive' not in header:
+        stream.close()
+        raise ValueError(f"{path} is not an archive file")
+    if header.get('schema_version', 0) > ARCHIVE_SCHEMA_VERSION:
+        stream.close()
+        raise ValueError(f"{path} has archive schema {header['schema_version']}, newer than this code")
+
+    def lines():
+        with stream:
+            for text in stream:
+                if text.strip():
+                    yield orjson.loads(text)
+    return header, lines()
+
+
+def _archive_path(directory: Path, collection: str) -> Path:
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    return directory / collection / f"{collection}-{stamp}{SUFFIX}"
+
+
+# Scheduled job
+
+async def archive_collection(db, policy: RetentionPolicy, directory: Path, batch: int = ARCHIVE_BATCH,
+                             on_delete=None) -> int:
+    """Move records older than the policy's archive age to archive files; returns how many
+
+    ``on_delete``, if given, is awaited with the collection name and the
+    records each time archived records are about to be deleted.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=policy.archive_after_days)).isoformat()
+    collection = db[policy.collection]
+    moved = 0
+    while True:
+        # Timestamps are stored as UTC ISO strings, which sort as strings
+        with track_span("mongo", f"{policy.collection}.find"):
+            records = await collection.find({policy.time_field: {"$lt": cutoff}}, {"_id": 0}) \
+                .sort(policy.time_field, 1).limit(batch).to_list(batch)
+        if not records:
+            return moved
+        ids = [record['id'] for record in records if 'id' in record]
+        path = _archive_path(directory, policy.collection)
+        await asyncio.to_thread(write_archive, path, policy.collection, _compact(policy, records), policy.group_by)
+        if on_delete is not None:
+            await on_delete(policy.collection, records)
+        with track_span("mongo", f"{policy.collection}.delete_many"):
+            await collection.delete_many({"id": {"$in": ids}})
+        moved += len(ids)
+        ARCHIVED_RECORDS.inc(len(ids), collection=policy.collection)
+        logger.info("Archived %d %s records to %s", len(ids), policy.collection, path)
+        if len(records) < batch or len(ids) < len(records):
+            # Records without an id can't be deleted selectively; don't loop over them again
+            return moved
+
+
+async def purge_expired(db) -> int:
+    """Delete records past ``expires_at``, for storage without TTL indexes"""
+    now = datetime.now(timezone.utc).isoformat()
+    purged = 0
+    for policy in POLICIES.values():
+        with track_span("mongo", f"{policy.collection}.delete_many"):
+            result = await db[policy.collection].delete_many({"expires_at": {"$lt": now}})
+        purged += result.deleted_count
+        if result.deleted_count:
+            EXPIRED_RECORDS.inc(result.deleted_count, collection=policy.collection)
+    return purged
+
+
+async def run_retention(db, directory: Path, native_ttl: bool, on_delete=None) -> Dict[str, int]:
+    """Archive every policy's old records, then sweep expired ones where the database doesn't"""
+    moved = {}
+    for policy in POLICIES.values():
+        try:
+            moved[policy.collection] = await archive_collection(db, policy, directory, on_delete=on_delete)
+        except Exception as e:
+            logger.error("Archiving %s failed: %s", policy.collection, e)
+    if not native_ttl:
+        moved['expired'] = await purge_expired(db)
+    return moved
+
+
+# Command line export and replay
+
+async def export(db, collection: str, path: Path, before: Optional[str] = None, delete: bool = False) -> int:
+    """Write a collection's records (older than ``before``, an ISO date) to an archive file"""
+    policy = POLICIES.get(collection) or RetentionPolicy(collection, 'created_at', 0, 0)
+    query = {policy.time_field: {"$lt": before}} if before else {}
+    records = await db[collection].find(query, {"_id": 0}).sort(policy.time_field, 1).to_list(None)
+    count = await asyncio.to_thread(write_archive, path, collection, _compact(policy, records), policy.group_by)
+    if delete and records:
+        await db[collection].delete_many({"id": {"$in": [r['id'] for r in records if 'id' in r]}})
+    logger.info("Exported %d %s records to %s (%d lines)", len(records), collection, path, count)
+    return len(records)
+
+
+async def replay(db, paths: List[Path], into: Optional[str] = None) -> int:
+    """Insert archived records back into their collection (or ``into``); existing ids are kept as they are"""
+    restored = 0
+    for path in paths:
+        header, lines = read_archive(path)
+        collection = db[into or header['archive']]
+        for line in lines:
+            for record in expand(header, line):
+                if 'id' in record:
+                    await collection.update_one({"id": record['id']}, {"$setOnInsert": record}, upsert=True)
+                else:
+                    await collection.insert_one(record)
+                restored += 1
+        logger.info("Replayed %s into %s", path, collection.name)
+    return restored
+
+
+def open_database():
+    """The configured database: MongoDB when MONGO_URL is set, else the local store"""
+    mongo_url = os.environ.get('MONGO_URL')
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(mongo_url)[os.environ.get('DB_NAME', 'jharkhand_tourism')]
+    from utils.local_store import LocalDatabase
+    local_dir = Path(os.environ.get('LOCAL_DATA_DIR', Path(__file__).resolve().parent.parent / 'local_data'))
+    return LocalDatabase(os.environ.get('LOCAL_DB_PATH', local_dir / 'local.db'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.archive', description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='write records to an archive file')
+    export_parser.add_argument('collection')
+    export_parser.add_argument('--output', type=Path, required=True)
+    export_parser.add_argument('--before', help='only records older than this ISO date')
+    export_parser.add_argument('--delete', action='store_true', help='delete the exported records')
+    replay_parser = commands.add_parser('replay', help='insert archived records back into the database')
+    replay_parser.add_argument('paths', nargs='+', type=Path)
+    replay_parser.add_argument('--into', help='collection to restore into (default: the archived one)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    db = open_database()
+    started = time.perf_counter()
+    if args.command == 'export':
+        count = asyncio.run(export(db, args.collection, args.output, args.before, args.delete))
+    else:
+        count = asyncio.run(replay(db, args.paths, args.into))
+    print(f"{args.command}: {count} records in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
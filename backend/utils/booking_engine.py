@@ -0,0 +1,225 @@
+"""Vendor availability index and conflict-free booking reservations.
+
+Each (vendor, date) slot has a capacity and a reserved count. A booking
+reserves a slot with a single conditional increment, so concurrent requests
+can never push a slot over capacity. ``MongoAvailabilityStore`` does this
+with a conditional ``$inc`` on ``vendor_availability``; ``LocalAvailabilityStore``
+does it under an asyncio lock and appends every change to a journal file that
+is replayed on start.
+
+A vendor that declares no availability dates is open on every date. It gets
+a marker slot under ``OPEN_DATES`` and real slots are created on demand, so
+it counts as available on any date where it has no full slot.
+"""
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.metrics import counter, track_span
+
+logger = logging.getLogger(__name__)
+
+RESERVATIONS = counter('booking_reservations_total', 'Booking slot reservation attempts', ('result',))
+
+# Slot "date" marking a vendor open on every date; never reserved
+OPEN_DATES = "*"
+
+
+class AvailabilityStore:
+    """Storage for per-vendor date -> capacity slots"""
+
+    async def ensure_slot(self, vendor_id: str, date: str, capacity: int):
+        raise NotImplementedError
+
+    async def set_slots(self, vendor_id: str, dates: Iterable[str], capacity: int):
+        for date in dates:
+            await self.ensure_slot(vendor_id, date, capacity)
+
+    async def reserve_slot(self, vendor_id: str, date: str) -> Optional[bool]:
+        """True if reserved, False if full, None if the slot does not exist"""
+        raise NotImplementedError
+
+    async def release_slot(self, vendor_id: str, date: str):
+        raise NotImplementedError
+
+    async def available_vendor_ids(self, date: str) -> List[str]:
+        raise NotImplementedError
+
+    async def full_vendor_ids(self, date: str) -> List[str]:
+        raise NotImplementedError
+
+
+class MongoAvailabilityStore(AvailabilityStore):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def create_indexes(self):
+        await self.collection.create_index([("vendor_id", 1), ("date", 1)], unique=True)
+        await self.collection.create_index([("date", 1)])
+
+    async def ensure_slot(self, vendor_id, date, capacity):
+        try:
+            with track_span("mongo", "vendor_availability.update_one"):
+                await self.collection.update_one(
+                    {"vendor_id": vendor_id, "date": date},
+                    {"$setOnInsert": {"capacity": capacity, "reserved": 0}},
+                    upsert=True,
+                )
+        except DuplicateKeyError:
+            pass  # Another request created the slot first
+
+    async def reserve_slot(self, vendor_id, date):
+        with track_span("mongo", "vendor_availability.update_one"):
+            result = await self.collection.update_one(
+                {"vendor_id": vendor_id, "date": date, "$expr": {"$lt": ["$reserved", "$capacity"]}},
+                {"$inc": {"reserved": 1}},
+            )
+        if result.modified_count:
+            return True
+        with track_span("mongo", "vendor_availability.count_documents"):
+            exists = await self.collection.count_documents({"vendor_id": vendor_id, "date": date})
+        return False if exists else None
+
+    async def release_slot(self, vendor_id, date):
+        with track_span("mongo", "vendor_availability.update_one"):
+            await self.collection.update_one(
+                {"vendor_id": vendor_id, "date": date, "reserved": {"$gt": 0}},
+                {"$inc": {"reserved": -1}},
+            )
+
+    async def available_vendor_ids(self, date):
+        with track_span("mongo", "vendor_availability.find"):
+            slots = await self.collection.find(
+                {"date": date, "$expr": {"$lt": ["$reserved", "$capacity"]}}, {"_id": 0, "vendor_id": 1}
+            ).to_list(None)
+        return [slot["vendor_id"] for slot in slots]
+
+    async def full_vendor_ids(self, date):
+        with track_span("mongo", "vendor_availability.find"):
+            slots = await self.collection.find(
+                {"date": date, "$expr": {"$gte": ["$reserved", "$capacity"]}}, {"_id": 0, "vendor_id": 1}
+            ).to_list(None)
+        return [slot["vendor_id"] for slot in slots]
+
+
+class LocalAvailabilityStore(AvailabilityStore):
+    """In-process slots guarded by a lock, journaled to disk when a path is given"""
+
+    def __init__(self, journal_path: Optional[Path] = None):
+        self.journal_path = Path(journal_path) if journal_path else None
+        self._slots: Dict[str, Dict[str, List[int]]] = {}
+        self._by_date: Dict[str, set] = {}
+        self._lock = asyncio.Lock()
+        if self.journal_path and self.journal_path.exists():
+            self._replay()
+
+    def _replay(self):
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt booking journal line")
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry):
+        vendor_id, date = entry["vendor_id"], entry["date"]
+        slots = self._slots.setdefault(vendor_id, {})
+        if entry["op"] == "slot":
+            slots.setdefault(date, [entry["capacity"], 0])
+        elif entry["op"] == "reserve":
+            slots[date][1] += 1
+        elif entry["op"] == "release":
+            slots[date][1] = max(0, slots[date][1] - 1)
+        capacity, reserved = slots[date]
+        if reserved < capacity:
+            self._by_date.setdefault(date, set()).add(vendor_id)
+        else:
+            self._by_date.get(date, set()).discard(vendor_id)
+
+    def _record(self, entry):
+        self._apply(entry)
+        if self.journal_path:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    async def ensure_slot(self, vendor_id, date, capacity):
+        async with self._lock:
+            if date not in self._slots.get(vendor_id, {}):
+                self._record({"op": "slot", "vendor_id": vendor_id, "date": date, "capacity": capacity})
+
+    async def reserve_slot(self, vendor_id, date):
+        async with self._lock:
+            slot = self._slots.get(vendor_id, {}).get(date)
+            if slot is None:
+                return None
+            if slot[1] >= slot[0]:
+                return False
+            self._record({"op": "reserve", "vendor_id": vendor_id, "date": date})
+            return True
+
+    async def release_slot(self, vendor_id, date):
+        async with self._lock:
+            if date in self._slots.get(vendor_id, {}):
+                self._record({"op": "release", "vendor_id": vendor_id, "date": date})
+
+    async def available_vendor_ids(self, date):
+        return list(self._by_date.get(date, ()))
+
+    async def full_vendor_ids(self, date):
+        return [vendor_id for vendor_id, slots in self._slots.items()
+                if date in slots and slots[date][1] >= slots[date][0]]
+
+
+class BookingEngine:
+    """Reserves vendor capacity for bookings, creating slots on demand"""
+
+    def __init__(self, store: AvailabilityStore,
+                 vendor_lookup: Callable[[str], Awaitable[Optional[dict]]], default_capacity: int = 1):
+        self.store = store
+        self.vendor_lookup = vendor_lookup
+        self.default_capacity = default_capacity
+
+    def capacity_of(self, vendor: dict) -> int:
+        return vendor.get("daily_capacity") or self.default_capacity
+
+    async def register_vendor(self, vendor: dict):
+        dates = vendor.get("availability") or [OPEN_DATES]
+        await self.store.set_slots(vendor["id"], dates, self.capacity_of(vendor))
+
+    @staticmethod
+    def offers(vendor: dict, date: str) -> bool:
+        """Vendors that declare no availability dates take bookings on any date"""
+        availability = vendor.get("availability")
+        return not availability or date in availability
+
+    async def reserve(self, vendor_id: str, date: str) -> bool:
+        if date == OPEN_DATES:
+            RESERVATIONS.inc(result="conflict")
+            return False
+        reserved = await self.store.reserve_slot(vendor_id, date)
+        if reserved is None:
+            # Slots are created on demand: for vendors without declared dates, and for
+            # vendors registered before the availability index existed
+            vendor = await self.vendor_lookup(vendor_id)
+            if vendor is not None and self.offers(vendor, date):
+                await self.store.ensure_slot(vendor_id, date, self.capacity_of(vendor))
+                reserved = await self.store.reserve_slot(vendor_id, date)
+        RESERVATIONS.inc(result="reserved" if reserved else "conflict")
+        return bool(reserved)
+
+    async def release(self, vendor_id: str, date: str):
+        await self.store.release_slot(vendor_id, date)
+
+    async def available_vendor_ids(self, date: str) -> List[str]:
+        """Vendors with a free slot on ``date``, and open vendors whose slot for it isn't full"""
+        available = set(await self.store.available_vendor_ids(date))
+        open_vendors = set(await self.store.available_vendor_ids(OPEN_DATES))
+        if open_vendors:
+            available |= open_vendors - set(await self.store.full_vendor_ids(date))
+        return list(available)
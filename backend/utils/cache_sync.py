@@ -0,0 +1,76 @@
+"""Cross-worker cache invalidation through generation counters in the database.
+
+Each worker process keeps its own caches. A writer that changes the data
+behind a cache bumps that cache's generation in the ``cache_generations``
+collection; readers compare the stored generation with the one their cache
+was built from and rebuild when they differ. Reads are throttled to one
+database round trip per ``interval`` seconds per name, so a change reaches
+every worker within that interval.
+"""
+import logging
+import time
+from typing import Dict, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.metrics import counter, track_span
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATIONS = counter(
+    'cache_invalidations_total', 'Per-worker caches dropped because another worker changed their data', ('cache',))
+
+
+class CacheGenerations:
+    def __init__(self, collection, interval: float = 2.0):
+        self.collection = collection
+        self.interval = interval
+        self._seen: Dict[str, int] = {}
+        self._checked: Dict[str, Tuple[float, int]] = {}
+
+    async def create_indexes(self):
+        await self.collection.create_index([("name", 1)], unique=True)
+
+    async def _increment(self, name: str):
+        with track_span("mongo", "cache_generations.find_one_and_update"):
+            return await self.collection.find_one_and_update(
+                {"name": name}, {"$inc": {"generation": 1}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+
+    async def bump(self, name: str):
+        """Record a change; the caller updates this worker's own caches"""
+        try:
+            document = await self._increment(name)
+        except DuplicateKeyError:
+            # Another worker's upsert created the document first; it exists now
+            document = await self._increment(name)
+        generation = document["generation"]
+        # Skip our own change, unless another worker's landed since we last looked
+        if generation == self._seen.get(name, 0) + 1:
+            self._seen[name] = generation
+        self._checked[name] = (time.monotonic(), generation)
+
+    async def _current(self, name: str) -> int:
+        checked_at, generation = self._checked.get(name, (float('-inf'), 0))
+        if time.monotonic() - checked_at < self.interval:
+            return generation
+        try:
+            with track_span("mongo", "cache_generations.find_one"):
+                document = await self.collection.find_one({"name": name}, {"_id": 0, "generation": 1})
+            generation = document["generation"] if document else 0
+        except Exception as e:
+            # Serve the cache as is; the next check retries
+            logger.error("Cache generation check for %s failed: %s", name, e)
+        self._checked[name] = (time.monotonic(), generation)
+        return generation
+
+    async def stale(self, name: str) -> bool:
+        """True once per change made by another worker since this worker last looked"""
+        generation = await self._current(name)
+        if generation == self._seen.get(name, 0):
+            return False
+        self._seen[name] = generation
+        CACHE_INVALIDATIONS.inc(cache=name)
+        return True
@@ -0,0 +1,102 @@
+"""Change sequence numbers and delta reads for client sync.
+
+Every write to a synced collection stamps the document with ``seq``, taken
+from one counter shared by all workers, and ``changed_at``. A client keeps
+the ``cursor`` of its last sync and asks for documents with a higher
+``seq``.
+
+Sequence numbers are handed out before the write lands, so a write can
+become visible after a later one. The cursor therefore only moves past
+documents that changed more than ``settle_seconds`` ago, longer than any
+write may take. Anything newer is returned now and again on the next sync;
+clients apply documents by id, so a repeat is harmless.
+
+Documents deleted from a synced collection (by the archive job) leave a
+tombstone, stamped like a write, so delta syncs can pass the deletion on.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.metrics import track_span
+
+COUNTER_NAME = "changes"
+
+
+class ChangeFeed:
+    def __init__(self, counters, tombstones=None, settle_seconds: float = 10.0):
+        self.counters = counters
+        self.tombstones = tombstones
+        self.settle_seconds = settle_seconds
+
+    async def create_indexes(self):
+        await self.counters.create_index([("name", 1)], unique=True)
+        if self.tombstones is not None:
+            await self.tombstones.create_index([("collection", 1), ("seq", 1)])
+
+    async def _increment(self, count: int = 1):
+        with track_span("mongo", "change_counters.find_one_and_update"):
+            return await self.counters.find_one_and_update(
+                {"name": COUNTER_NAME}, {"$inc": {"seq": count}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+
+    async def _advance(self, count: int = 1) -> int:
+        """Take ``count`` sequence numbers; returns the highest"""
+        try:
+            counter = await self._increment(count)
+        except DuplicateKeyError:
+            # Another worker's upsert created the counter first; it exists now
+            counter = await self._increment(count)
+        return counter["seq"]
+
+    async def stamp(self) -> Dict[str, Any]:
+        """Fields to $set on a document being written"""
+        return {"seq": await self._advance(), "changed_at": time.time()}
+
+    async def bury(self, collection: str, documents: List[Dict[str, Any]]):
+        """Leave tombstones for documents about to be deleted from ``collection``"""
+        documents = [document for document in documents if 'id' in document]
+        if not documents:
+            return
+        # One sequence number each; a page boundary must never fall between equal numbers
+        first = await self._advance(len(documents)) - len(documents) + 1
+        changed_at = time.time()
+        for seq, document in enumerate(documents, first):
+            tombstone = {"id": document["id"], "collection": collection, "seq": seq, "changed_at": changed_at}
+            if "vendor_id" in document:
+                tombstone["vendor_id"] = document["vendor_id"]
+            with track_span("mongo", "sync_tombstones.insert_one"):
+                await self.tombstones.insert_one(tombstone)
+
+    async def changes(self, collection, query: Dict[str, Any], since: int,
+                      limit: int) -> Tuple[List[Dict[str, Any]], Optional[int], bool]:
+        """(documents changed after ``since`` in seq order, highest seq the cursor may pass, more pages)
+
+        The bound is None when nothing here holds the cursor back. ``since`` 0
+        is a full sync and includes documents written before sequence numbers
+        existed.
+        """
+        if since > 0:
+            query = {**query, "seq": {"$gt": since}}
+        with track_span("mongo", f"{collection.name}.find"):
+            documents = await collection.find(query, {"_id": 0}).sort("seq", 1).to_list(limit + 1)
+        bound, more = None, len(documents) > limit
+        if more:
+            documents = documents[:limit]
+            bound = documents[-1].get("seq", 0)
+        settled_before = time.time() - self.settle_seconds
+        for document in documents:
+            if document.get("changed_at", 0) > settled_before:
+                bound = document.get("seq", 0) - 1
+                break
+        return documents, bound, more
+
+
+def next_cursor(since: int, results: List[Tuple[List[Dict[str, Any]], Optional[int], bool]]) -> int:
+    """Highest seq the client has seen every change up to, after one sync"""
+    seen = [documents[-1].get("seq", 0) for documents, _, _ in results if documents]
+    bounds = [bound for _, bound, _ in results if bound is not None]
+    return max(since, min([max(seen, default=since)] + bounds))
@@ -0,0 +1,145 @@
+"""Per-session chat memory with bounded prompt size.
+
+Each session keeps its most recent turns in a ring buffer. When the turns
+exceed the token budget, the oldest turns are folded into a short extractive
+summary, so the history added to a prompt stays bounded however long the
+conversation runs. Sessions are evicted LRU-first and after ``ttl`` seconds
+idle; a miss can be hydrated from persisted history.
+"""
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+from utils.metrics import counter, gauge
+
+# Rough chars-per-token ratio, matching utils.retrieval
+CHARS_PER_TOKEN = 4
+SUMMARY_MAX_CHARS = 600
+SENTENCE_RE = re.compile(r"(?<=[.!?।])\s+")
+
+SESSION_LOOKUPS = counter('chat_session_lookups_total', 'Chat session cache lookups', ('result',))
+ACTIVE_SESSIONS = gauge('chat_sessions_active', 'Chat sessions held in memory')
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _first_sentence(text: str, limit: int = 120) -> str:
+    sentence = SENTENCE_RE.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1] + "…"
+
+
+class ChatSession:
+    def __init__(self, session_id: str, max_turns: int):
+        self.session_id = session_id
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max_turns)
+        self.summary = ""
+        self.last_used = time.monotonic()
+        # Stored turn count this copy reflects, when the caller tracks one
+        self.version: Optional[int] = None
+
+    def _turn_tokens(self) -> int:
+        return sum(estimate_tokens(user) + estimate_tokens(bot) for user, bot in self.turns)
+
+    def _fold(self, user: str, bot: str):
+        note = f"User asked: {_first_sentence(user)} Assistant: {_first_sentence(bot)}"
+        summary = f"{self.summary} {note}".strip()
+        # Keep the most recent part of the summary when it outgrows its cap
+        self.summary = summary[-SUMMARY_MAX_CHARS:]
+
+    def add_turn(self, user: str, bot: str, token_budget: int):
+        if len(self.turns) == self.turns.maxlen:
+            self._fold(*self.turns[0])
+        self.turns.append((user, bot))
+        while len(self.turns) > 1 and self._turn_tokens() > token_budget:
+            self._fold(*self.turns.popleft())
+
+    def prompt_history(self) -> str:
+        """History block for the LLM prompt, empty for a new session"""
+        lines = []
+        if self.summary:
+            lines.append(f"Earlier in this conversation: {self.summary}")
+        for user, bot in self.turns:
+            lines.append(f"User: {user}")
+            lines.append(f"Assistant: {bot}")
+        return "\n".join(lines)
+
+
+class SessionStore:
+    """LRU/TTL cache of chat sessions"""
+
+    def __init__(self, max_sessions: int = 10_000, ttl: float = 1800, max_turns: int = 8,
+                 token_budget: int = 600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_used < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+        ACTIVE_SESSIONS.set(len(self._sessions))
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        session = self._sessions.get(session_id)
+        if session is not None and time.monotonic() - session.last_used >= self.ttl:
+            del self._sessions[session_id]
+            session = None
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    async def get_or_hydrate(self, session_id: str,
+                             loader: Callable[[str, int], Awaitable[List[Tuple[str, str]]]],
+                             version: Optional[int] = None) -> ChatSession:
+        """Return the cached session, or rebuild it from ``loader`` on a miss.
+
+        With a ``version`` (the stored turn count), a cached copy that doesn't
+        match it, e.g. because another worker served the latest turns, is rebuilt.
+        """
+        session = self.get(session_id)
+        if session is not None and (version is None or session.version == version):
+            SESSION_LOOKUPS.inc(result="hit")
+            return session
+        SESSION_LOOKUPS.inc(result="miss" if session is None else "stale")
+        if session is not None:
+            del self._sessions[session_id]
+        session = ChatSession(session_id, self.max_turns)
+        session.version = version
+        # The loader returns (user, bot) pairs, oldest first
+        for user, bot in await loader(session_id, self.max_turns):
+            session.add_turn(user, bot, self.token_budget)
+        # A concurrent request may have hydrated the same session meanwhile
+        existing = self._sessions.get(session_id)
+        if existing is not None:
+            return existing
+        self._sessions[session_id] = session
+        self._evict()
+        return session
+
+    def record_turn(self, session: ChatSession, user: str, bot: str):
+        session.add_turn(user, bot, self.token_budget)
+        session.last_used = time.monotonic()
+        if session.version is not None:
+            session.version += 1
+
+    def prune(self) -> int:
+        """Drop every idle session now rather than when the next one is added; returns how many"""
+        now = time.monotonic()
+        expired = [key for key, session in self._sessions.items() if now - session.last_used >= self.ttl]
+        for key in expired:
+            del self._sessions[key]
+        ACTIVE_SESSIONS.set(len(self._sessions))
+        return len(expired)
+
+    def clear(self):
+        self._sessions.clear()
+        ACTIVE_SESSIONS.set(0)
@@ -0,0 +1,105 @@
+"""Circuit breaker for slow or failing external dependencies.
+
+After ``failure_threshold`` consecutive failures (errors or calls exceeding
+the latency budget) the circuit opens and calls fail immediately with
+``CircuitOpenError``. Once ``recovery_timeout`` has passed a single probe
+call is let through (half-open); its outcome closes or re-opens the circuit.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable
+
+from utils.metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = gauge(
+    'circuit_breaker_state', 'Circuit breaker state (0=closed, 1=half-open, 2=open)', ('name',))
+BREAKER_TRANSITIONS = counter(
+    'circuit_breaker_transitions_total', 'Circuit breaker state changes', ('name', 'state'))
+BREAKER_REJECTIONS = counter(
+    'circuit_breaker_rejections_total', 'Calls failed fast while the circuit was open', ('name',))
+BREAKER_TIMEOUTS = counter(
+    'circuit_breaker_timeouts_total', 'Calls that exceeded the latency budget', ('name',))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the dependency while the circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 call_timeout: float = 8.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.call_timeout = call_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        BREAKER_STATE.set(_STATE_VALUES[CLOSED], name=name)
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def _transition(self, state: str):
+        if state == self._state:
+            return
+        self._state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], name=self.name)
+        BREAKER_TRANSITIONS.inc(name=self.name, state=state)
+        logger.warning("Circuit '%s' is now %s", self.name, state)
+
+    def _before_call(self):
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probe_in_flight):
+            BREAKER_REJECTIONS.inc(name=self.name)
+            raise CircuitOpenError(f"circuit '{self.name}' is open")
+        if state == HALF_OPEN:
+            self._transition(HALF_OPEN)
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self._failures = 0
+        self._probe_in_flight = False
+        self._transition(CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        was_probe = self._probe_in_flight
+        self._probe_in_flight = False
+        if was_probe or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    async def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking ``func`` in a worker thread within the latency budget"""
+        self._before_call()
+        try:
+            # A timed-out thread keeps running in the background, but the request
+            # is released and repeated timeouts open the circuit
+            result = await asyncio.wait_for(
+                asyncio.to_thread(func, *args, **kwargs), timeout=self.call_timeout)
+        except asyncio.TimeoutError:
+            BREAKER_TIMEOUTS.inc(name=self.name)
+            self.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # The caller went away; let the next request probe instead
+            self._probe_in_flight = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
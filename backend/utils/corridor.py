@@ -0,0 +1,132 @@
+"""Attractions along a route corridor.
+
+The route is a polyline. Each segment (split to at most
+``SEGMENT_MAX_KM``) queries a grid index of the catalog's attractions with
+the smallest circle that covers the segment plus the corridor buffer, and
+each candidate is measured by its true distance to the segment, not to the
+nearest vertex. Work therefore grows with route length and corridor
+density rather than with the number of sample points.
+
+Candidates are ranked by detour: the extra distance of leaving the route
+``DETOUR_WINDOW_FACTOR * buffer_km`` before the nearest route point,
+visiting the attraction and rejoining the same distance after it.
+"""
+import bisect
+import math
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from data.catalog_loader import get_catalog
+from utils.geo_index import KM_PER_DEG_LAT, GridIndex
+from utils.route_calculator import calculate_distance
+
+SEGMENT_MAX_KM = 20.0
+DETOUR_WINDOW_FACTOR = 2.0
+
+_grid_lock = threading.Lock()
+_grid: Tuple[Optional[str], Optional[GridIndex]] = (None, None)
+
+
+def attraction_grid() -> GridIndex:
+    """Grid index of the active catalog's attractions, rebuilt when the catalog changes"""
+    global _grid
+    catalog = get_catalog()
+    version, grid = _grid
+    if version == catalog.content_hash:
+        return grid
+    with _grid_lock:
+        if _grid[0] != catalog.content_hash:
+            grid = GridIndex()
+            for attraction in catalog.attractions:
+                grid.insert(attraction['id'], attraction['coordinates']['lat'],
+                            attraction['coordinates']['lng'], attraction)
+            _grid = (catalog.content_hash, grid)
+        return _grid[1]
+
+
+def _densify(points: Sequence[Dict[str, float]]) -> List[Tuple[float, float]]:
+    path = [(p['lat'], p['lng']) for p in points]
+    dense = path[:1]
+    for (lat1, lng1), (lat2, lng2) in zip(path, path[1:]):
+        pieces = max(1, math.ceil(calculate_distance(lat1, lng1, lat2, lng2) / SEGMENT_MAX_KM))
+        for step in range(1, pieces + 1):
+            ratio = step / pieces
+            dense.append((lat1 + (lat2 - lat1) * ratio, lng1 + (lng2 - lng1) * ratio))
+    return dense
+
+
+def _project(point, start, end) -> Tuple[float, float]:
+    """(distance km, fraction along) of the closest point of segment start-end"""
+    # Equirectangular plane around the segment; exact enough at corridor scale
+    scale = KM_PER_DEG_LAT * math.cos(math.radians((start[0] + end[0]) / 2))
+    ex, ey = (end[1] - start[1]) * scale, (end[0] - start[0]) * KM_PER_DEG_LAT
+    px, py = (point[1] - start[1]) * scale, (point[0] - start[0]) * KM_PER_DEG_LAT
+    length_sq = ex * ex + ey * ey
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, (px * ex + py * ey) / length_sq))
+    return math.hypot(px - t * ex, py - t * ey), t
+
+
+class _Polyline:
+    def __init__(self, path: List[Tuple[float, float]]):
+        self.path = path
+        self.offsets = [0.0]
+        for (lat1, lng1), (lat2, lng2) in zip(path, path[1:]):
+            self.offsets.append(self.offsets[-1] + calculate_distance(lat1, lng1, lat2, lng2))
+
+    @property
+    def length(self) -> float:
+        return self.offsets[-1]
+
+    def at(self, offset: float) -> Tuple[float, float]:
+        """Point ``offset`` km along the polyline"""
+        if len(self.path) == 1:
+            return self.path[0]
+        offset = max(0.0, min(self.length, offset))
+        index = max(1, min(len(self.path) - 1, bisect.bisect_left(self.offsets, offset)))
+        span = self.offsets[index] - self.offsets[index - 1]
+        ratio = 0.0 if span == 0 else (offset - self.offsets[index - 1]) / span
+        (lat1, lng1), (lat2, lng2) = self.path[index - 1], self.path[index]
+        return (lat1 + (lat2 - lat1) * ratio, lng1 + (lng2 - lng1) * ratio)
+
+    def detour(self, point: Tuple[float, float], offset: float, window: float) -> float:
+        entry, exit_ = max(0.0, offset - window), min(self.length, offset + window)
+        (lat1, lng1), (lat2, lng2) = self.at(entry), self.at(exit_)
+        via = calculate_distance(lat1, lng1, point[0], point[1]) + calculate_distance(point[0], point[1], lat2, lng2)
+        return max(0.0, via - (exit_ - entry))
+
+
+def corridor_attractions(waypoints: Sequence[Dict[str, float]], buffer_km: float = 10,
+                         interests: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Attractions within ``buffer_km`` of the polyline through ``waypoints``, cheapest detour first"""
+    if not waypoints:
+        return []
+    polyline = _Polyline(_densify(waypoints))
+    grid = attraction_grid()
+    best: Dict[str, Tuple[float, float, Dict[str, Any]]] = {}
+    segments = list(zip(polyline.path, polyline.path[1:])) or [(polyline.path[0], polyline.path[0])]
+    for index, (start, end) in enumerate(segments):
+        middle = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+        half = calculate_distance(start[0], start[1], end[0], end[1]) / 2
+        for _, key, attraction in grid.query_radius(middle[0], middle[1], half + buffer_km):
+            if interests and not any(tag in attraction.get('interest_tags', []) for tag in interests):
+                continue
+            coordinates = attraction['coordinates']
+            distance, t = _project((coordinates['lat'], coordinates['lng']), start, end)
+            if distance > buffer_km or (key in best and best[key][0] <= distance):
+                continue
+            offset = polyline.offsets[index] + t * (polyline.offsets[index + 1] - polyline.offsets[index]) \
+                if index + 1 < len(polyline.offsets) else 0.0
+            best[key] = (distance, offset, attraction)
+
+    window = DETOUR_WINDOW_FACTOR * buffer_km
+    results = []
+    for distance, offset, attraction in best.values():
+        coordinates = attraction['coordinates']
+        results.append({
+            **attraction,
+            'distance_from_route': round(distance, 2),
+            'route_position_km': round(offset, 1),
+            'detour_km': round(polyline.detour((coordinates['lat'], coordinates['lng']), offset, window), 2),
+        })
+    results.sort(key=lambda a: (a['detour_km'], a['distance_from_route']))
+    return results
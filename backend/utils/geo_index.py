@@ -0,0 +1,65 @@
+"""Uniform-grid spatial index for radius and nearest-neighbour lookups.
+
+Points are bucketed into cells of ``cell_deg`` degrees, so a radius query
+only measures distance to points in the handful of cells the circle touches.
+Used when MongoDB's 2dsphere index is not available.
+"""
+import math
+from typing import Any, Dict, Hashable, List, Tuple
+
+from utils.route_calculator import calculate_distance
+
+KM_PER_DEG_LAT = 111.32
+
+
+class GridIndex:
+    def __init__(self, cell_deg: float = 0.1):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], Dict[Hashable, Tuple[float, float, Any]]] = {}
+        self._positions: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def insert(self, key: Hashable, lat: float, lng: float, payload: Any = None):
+        self.remove(key)
+        cell = self._cell(lat, lng)
+        self._cells.setdefault(cell, {})[key] = (lat, lng, payload)
+        self._positions[key] = cell
+
+    def remove(self, key: Hashable):
+        cell = self._positions.pop(key, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> List[Tuple[float, Hashable, Any]]:
+        """(distance_km, key, payload) for points within ``radius_km``, nearest first"""
+        lat_span = radius_km / KM_PER_DEG_LAT
+        lng_span = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+        min_cell = self._cell(lat - lat_span, lng - lng_span)
+        max_cell = self._cell(lat + lat_span, lng + lng_span)
+        results = []
+        for cell_lat in range(min_cell[0], max_cell[0] + 1):
+            for cell_lng in range(min_cell[1], max_cell[1] + 1):
+                for key, (p_lat, p_lng, payload) in self._cells.get((cell_lat, cell_lng), {}).items():
+                    distance = calculate_distance(lat, lng, p_lat, p_lng)
+                    if distance <= radius_km:
+                        results.append((distance, key, payload))
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def nearest(self, lat: float, lng: float, k: int = 1,
+                max_radius_km: float = 500.0) -> List[Tuple[float, Hashable, Any]]:
+        """The ``k`` nearest points, searching outward in growing rings"""
+        radius = self.cell_deg * KM_PER_DEG_LAT
+        while True:
+            found = self.query_radius(lat, lng, radius)
+            if len(found) >= k or radius >= max_radius_km:
+                return found[:k]
+            radius = min(radius * 2, max_radius_km)
@@ -0,0 +1,131 @@
+"""Keyword intent classification for the chatbot.
+
+All bilingual keyword sets are compiled once into a single alternation regex
+with one named group per intent, so classifying a message is one scan. The
+intent decides whether a message gets a canned answer or goes to the LLM,
+and which canned answer to use when the LLM is unavailable.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+PLACES = "places"
+FOOD = "food"
+CULTURE = "culture"
+ACCOMMODATION = "accommodation"
+GREETING = "greeting"
+THANKS = "thanks"
+GENERAL = "general"
+
+# Topic intents in tie-break order; English words also match simple inflections
+INTENT_KEYWORDS = {
+    PLACES: {
+        "english": ["place", "visit", "tourist", "attraction", "spot", "go", "see", "sightseeing", "trip",
+                    "waterfall", "falls", "temple", "park", "destination", "ghoom", "ghumne", "jagah"],
+        "hindi": ["जगह", "घूम", "पर्यटन", "स्थल", "झरना", "मंदिर", "देखने"],
+    },
+    FOOD: {
+        "english": ["food", "eat", "cuisine", "dish", "restaurant", "breakfast", "lunch", "dinner", "snack",
+                    "khana"],
+        "hindi": ["खाना", "भोजन", "व्यंजन", "खाने"],
+    },
+    CULTURE: {
+        "english": ["culture", "festival", "tradition", "dance", "music", "art", "craft", "tribal", "sarhul",
+                    "chhau", "tyohar"],
+        "hindi": ["संस्कृति", "त्योहार", "परंपरा", "नृत्य", "सरहुल", "छऊ"],
+    },
+    ACCOMMODATION: {
+        "english": ["hotel", "stay", "accommodation", "book", "room", "resort", "lodge", "guest house",
+                    "homestay"],
+        "hindi": ["होटल", "ठहर", "कमरा", "रुकने"],
+    },
+    GREETING: {
+        "english": ["hi", "hello", "hey", "namaste", "namaskar", "good morning", "good evening"],
+        "hindi": ["नमस्ते", "नमस्कार"],
+    },
+    THANKS: {
+        "english": ["thanks", "thank you", "thx", "dhanyavad", "shukriya"],
+        "hindi": ["धन्यवाद", "शुक्रिया"],
+    },
+}
+TOPIC_INTENTS = [PLACES, FOOD, CULTURE, ACCOMMODATION]
+# Small-talk intents only win when the message is nothing more than that
+SMALL_TALK_MAX_WORDS = 4
+
+# How each intent is answered: "canned" never calls the LLM
+CANNED = "canned"
+LLM = "llm"
+INTENT_ROUTES = {GREETING: CANNED, THANKS: CANNED}
+
+
+def _compile_matcher():
+    groups = []
+    for intent, keywords in INTENT_KEYWORDS.items():
+        english = "|".join(re.escape(w) for w in sorted(keywords["english"], key=len, reverse=True))
+        # Devanagari vowel signs are not \w, so Hindi keywords match as substrings
+        hindi = "|".join(re.escape(w) for w in keywords["hindi"])
+        groups.append(rf"(?P<{intent}>\b(?:{english})(?:s|es|ing|ed)?\b|{hindi})")
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+
+INTENT_MATCHER = _compile_matcher()
+
+
+@lru_cache(maxsize=4096)
+def _classify_normalized(text: str) -> str:
+    hits = Counter(match.lastgroup for match in INTENT_MATCHER.finditer(text))
+    topics = [intent for intent in TOPIC_INTENTS if hits[intent]]
+    if topics:
+        return max(topics, key=lambda intent: (hits[intent], -TOPIC_INTENTS.index(intent)))
+    if len(text.split()) <= SMALL_TALK_MAX_WORDS:
+        if hits[THANKS]:
+            return THANKS
+        if hits[GREETING]:
+            return GREETING
+    return GENERAL
+
+
+def classify_intent(message: str) -> str:
+    """Classify a chat message into one of the intents above"""
+    return _classify_normalized(" ".join(message.lower().split()))
+
+
+def route_for(intent: str) -> str:
+    """Whether an intent is answered with a canned reply or by the LLM"""
+    return INTENT_ROUTES.get(intent, LLM)
+
+
+def canned_answer(intent: str, language: str = "english") -> str:
+    """Canned reply for an intent, used for small talk and as the LLM fallback"""
+    answers = CANNED_ANSWERS.get(intent, CANNED_ANSWERS[GENERAL])
+    return answers["hindi"] if language == "hindi" else answers["english"]
+
+
+CANNED_ANSWERS = {
+    PLACES: {
+        "english": "Jharkhand has many beautiful places to visit! 🏔️\n\n🌊 Hundru Falls - The state's most famous waterfall\n🦁 Betla National Park - For wildlife safari\n🏛️ Ranchi - The capital city\n⛰️ Netarhat - The heart of Jharkhand\n\nWhich place would you like to know more about?",
+        "hindi": "झारखंड में कई खूबसूरत जगहें हैं! 🏔️\n\n🌊 हुंद्रू फॉल्स - राज्य का सबसे प्रसिद्ध झरना\n🦁 बेतला राष्ट्रीय उद्यान - वन्यजीव सफारी के लिए\n🏛️ रांची - राजधानी शहर\n⛰️ नेतरहाट - झारखंड का दिल\n\nआप किस जगह के बारे में और जानना चाहते हैं?",
+    },
+    FOOD: {
+        "english": "Jharkhand has delicious local cuisine! 🍽️\n\n🥘 Litti Chokha\n🍖 Mutton Curry\n🌾 Rice and Dal\n🥯 Dhudhpuri\n🍜 Ragi Roti\n\nWhich dish interests you?",
+        "hindi": "झारखंड का स्थानीय भोजन बहुत स्वादिष्ट है! 🍽️\n\n🥘 लिट्टी चोखा\n🍖 मटन करी\n🌾 चावल और दाल\n🥯 दूधपूरी\n🍜 रागी रोटी\n\nकौन सा व्यंजन आपको दिलचस्प लगता है?",
+    },
+    CULTURE: {
+        "english": "Jharkhand has a rich cultural heritage! 🎭\n\n🎪 Sarhul - Main festival\n💃 Chhau dance\n🎨 Tribal art\n🏛️ Traditional crafts\n🎵 Folk music\n\nWhich cultural aspect would you like to explore?",
+        "hindi": "झारखंड की संस्कृति बहुत समृद्ध है! 🎭\n\n🎪 सरहुल - मुख्य त्योहार\n💃 छऊ नृत्य\n🎨 आदिवासी कला\n🏛️ पारंपरिक शिल्प\n🎵 लोक संगीत\n\nआप किस सांस्कृतिक पहलू के बारे में जानना चाहते हैं?",
+    },
+    ACCOMMODATION: {
+        "english": "There are many accommodation options in Jharkhand! 🏨\n\n🏨 Ranchi Heritage Hotel - ₹2500/night\n🏡 Guest Houses\n⛺ Eco Resorts\n🏕️ Camping Sites\n\nWhat type of accommodation would you prefer?",
+        "hindi": "झारखंड में ठहरने के लिए कई विकल्प हैं! 🏨\n\n🏨 रांची हेरिटेज होटल - ₹2500/रात\n🏡 गेस्ट हाउस\n⛺ इको रिसॉर्ट्स\n🏕️ कैंपिंग साइट्स\n\nआप किस प्रकार का आवास पसंद करेंगे?",
+    },
+    GENERAL: {
+        "english": "Hello! I'm your Jharkhand tourism assistant! 🙏\n\nI can help you with:\n• Tourist attractions\n• Local food\n• Culture & festivals\n• Accommodation options\n\nWhat would you like to know?",
+        "hindi": "नमस्ते! मैं आपका झारखंड पर्यटन सहायक हूँ। 🙏\n\nमैं आपकी मदद कर सकता हूँ:\n• पर्यटन स्थलों की जानकारी\n• स्थानीय भोजन\n• संस्कृति और त्योहार\n• आवास विकल्प\n\nआप क्या जानना चाहते हैं?",
+    },
+}
+
+CANNED_ANSWERS[GREETING] = CANNED_ANSWERS[GENERAL]
+CANNED_ANSWERS[THANKS] = {
+    "english": "You're welcome! 🙏 Enjoy exploring Jharkhand. Ask me anytime about places, food, culture or stays.",
+    "hindi": "आपका स्वागत है! 🙏 झारखंड घूमने का आनंद लें। जगहों, भोजन, संस्कृति या ठहरने के बारे में कभी भी पूछें।",
+}
@@ -0,0 +1,286 @@
+"""Itinerary export to PDF, ICS and GPX.
+
+Rendering runs in a process pool, so a large PDF doesn't hold the GIL of
+the process serving requests. Finished files are cached by itinerary id,
+``updated_at`` and format; any edit changes ``updated_at``, so a cached
+file is never served for an edited itinerary.
+
+Itinerary days may be a list (``[{"date": ..., "attractions": [...]}, ...]``)
+or the planner's mapping of day label to stops. Stops may be attraction
+dicts or catalog ids.
+"""
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from multiprocessing import get_context
+from typing import Any, Dict, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from data.catalog_loader import get_catalog
+from utils.metrics import counter, histogram
+
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+EXPORT_TIMEOUT_SECONDS = float(os.environ.get('EXPORT_TIMEOUT_SECONDS', 30))
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+EXPORT_REQUESTS = counter('itinerary_exports_total', 'Itinerary exports by format and cache result', ('format', 'cache'))
+EXPORT_RENDER_SECONDS = histogram('itinerary_export_render_seconds', 'Itinerary export render time', ('format',))
+
+DAY_START_HOUR = 9
+DEFAULT_STOP_HOURS = 2.0
+TRAVEL_GAP_HOURS = 0.5
+
+FORMATS = {
+    'pdf': ('application/pdf', 'pdf'),
+    'ics': ('text/calendar; charset=utf-8', 'ics'),
+    'gpx': ('application/gpx+xml', 'gpx'),
+}
+
+
+class ExportError(ValueError):
+    """The itinerary can't be exported in the requested format"""
+
+
+def _stop(item) -> Optional[Dict[str, Any]]:
+    catalog = get_catalog()
+    if isinstance(item, str):
+        item = catalog.attractions_by_id.get(item)
+        if item is None:
+            return None
+    elif item.get('id') in catalog.attractions_by_id:
+        item = {**catalog.attractions_by_id[item['id']], **item}
+    coordinates = item.get('coordinates') or {}
+    duration = catalog.duration_of(item)
+    return {
+        'name': item.get('name', 'Stop'),
+        'city': item.get('city'),
+        'description': item.get('description'),
+        'lat': coordinates.get('lat'),
+        'lng': coordinates.get('lng'),
+        'hours': duration[1] if duration else DEFAULT_STOP_HOURS,
+    }
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def normalize_itinerary(itinerary: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain, picklable form of an itinerary for the renderers"""
+    days = itinerary.get('days') or []
+    if isinstance(days, dict):
+        days = [{'label': label, 'attractions': stops} for label, stops in days.items()]
+    start = _parse_date(itinerary.get('start_date'))
+    normalized = []
+    for index, day in enumerate(days):
+        if isinstance(day, list):
+            day = {'attractions': day}
+        stops = [s for s in map(_stop, day.get('attractions') or day.get('stops') or []) if s is not None]
+        day_date = _parse_date(day.get('date')) or (start + timedelta(days=index) if start else None)
+        normalized.append({
+            'label': day.get('label') or f"Day {day.get('day', index + 1)}",
+            'date': day_date.isoformat() if day_date else None,
+            'stops': stops,
+        })
+    return {
+        'id': itinerary['id'],
+        'title': itinerary.get('title') or 'My Jharkhand Trip',
+        'updated_at': itinerary.get('updated_at'),
+        'days': normalized,
+    }
+
+
+# Renderers: module-level so the process pool can pickle them
+
+def render_pdf(data: Dict[str, Any]) -> bytes:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        for day in data['days'] or [{'label': 'No days planned', 'date': None, 'stops': []}]:
+            fig, (map_ax, text_ax) = plt.subplots(
+                1, 2, figsize=(11.69, 8.27), gridspec_kw={'width_ratios': [3, 2]})
+            heading = f"{data['title']} - {day['label']}" + (f" ({day['date']})" if day['date'] else "")
+            fig.suptitle(heading, fontsize=14)
+            located = [s for s in day['stops'] if s['lat'] is not None and s['lng'] is not None]
+            if located:
+                lngs = [s['lng'] for s in located]
+                lats = [s['lat'] for s in located]
+                map_ax.plot(lngs, lats, '-', color='#2e7d32', linewidth=1.5, zorder=1)
+                map_ax.scatter(lngs, lats, s=60, color='#c62828', zorder=2)
+                for number, stop in enumerate(located, 1):
+                    map_ax.annotate(f"{number}. {stop['name']}", (stop['lng'], stop['lat']),
+                                    textcoords='offset points', xytext=(6, 6), fontsize=8)
+                map_ax.margins(0.2)
+                map_ax.set_aspect('equal', adjustable='datalim')
+            map_ax.set_xlabel('Longitude')
+            map_ax.set_ylabel('Latitude')
+            map_ax.grid(True, alpha=0.3)
+            text_ax.axis('off')
+            lines = []
+            for number, stop in enumerate(day['stops'], 1):
+                lines.append(f"{number}. {stop['name']}" + (f" ({stop['city']})" if stop['city'] else ""))
+                lines.append(f"    about {stop['hours']:g} h")
+            text_ax.text(0, 1, "\n".join(lines) or "No stops", va='top', fontsize=9, family='monospace')
+            pdf.savefig(fig)
+            plt.close(fig)
+    return buffer.getvalue()
+
+
+def _ics_text(value: str) -> str:
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ics_fold(line: str) -> str:
+    # RFC 5545 lines are at most 75 octets; continuation lines start with a space
+    encoded = line.encode('utf-8')
+    parts = []
+    while len(encoded) > 75:
+        cut = 75
+        while (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = b' ' + encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n'.join(parts)
+
+
+def render_ics(data: Dict[str, Any]) -> bytes:
+    if any(day['stops'] and not day['date'] for day in data['days']):
+        raise ExportError("Calendar export needs a start_date or a date on every day")
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Jharkhand Tourism//Itinerary//EN', 'CALSCALE:GREGORIAN',
+             f"X-WR-CALNAME:{_ics_text(data['title'])}"]
+    for day_index, day in enumerate(data['days']):
+        if not day['stops']:
+            continue
+        start = datetime.combine(date.fromisoformat(day['date']), datetime.min.time()) + timedelta(hours=DAY_START_HOUR)
+        for stop_index, stop in enumerate(day['stops']):
+            end = start + timedelta(hours=stop['hours'])
+            lines += [
+                'BEGIN:VEVENT',
+                f"UID:{data['id']}-{day_index}-{stop_index}@jharkhand-tourism",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+                f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+                f"SUMMARY:{_ics_text(stop['name'])}",
+            ]
+            if stop['city']:
+                lines.append(f"LOCATION:{_ics_text(stop['city'])}")
+            if stop['lat'] is not None and stop['lng'] is not None:
+                lines.append(f"GEO:{stop['lat']};{stop['lng']}")
+            if stop['description']:
+                lines.append(f"DESCRIPTION:{_ics_text(stop['description'])}")
+            lines.append('END:VEVENT')
+            start = end + timedelta(hours=TRAVEL_GAP_HOURS)
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_ics_fold(line) for line in lines) + '\r\n').encode('utf-8')
+
+
+def render_gpx(data: Dict[str, Any]) -> bytes:
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<gpx version="1.1" creator="Jharkhand Tourism" xmlns="http://www.topografix.com/GPX/1/1">',
+             f"  <metadata><name>{escape(data['title'])}</name></metadata>"]
+    tracks = []
+    for day in data['days']:
+        located = [s for s in day['stops'] if s['lat'] is not None and s['lng'] is not None]
+        for stop in located:
+            lines.append(f'  <wpt lat="{stop["lat"]}" lon="{stop["lng"]}"><name>{escape(stop["name"])}</name>'
+                         f'<type>{escape(day["label"])}</type></wpt>')
+        if len(located) > 1:
+            points = "".join(f'<trkpt lat="{s["lat"]}" lon="{s["lng"]}"/>' for s in located)
+            tracks.append(f"  <trk><name>{escape(day['label'])}</name><trkseg>{points}</trkseg></trk>")
+    lines += tracks
+    lines.append('</gpx>')
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+RENDERERS = {'pdf': render_pdf, 'ics': render_ics, 'gpx': render_gpx}
+
+
+class ExportCache:
+    """LRU of rendered files bounded by total size"""
+
+    def __init__(self, max_bytes: int = EXPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+    def put(self, key, content: bytes):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            # Older versions of this itinerary can never be requested again
+            for stale in [k for k in self._entries if k[0] == key[0] and k[1] != key[1]]:
+                self._size -= len(self._entries.pop(stale))
+            self._entries[key] = content
+            self._size += len(content)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+export_cache = ExportCache()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the serving process runs threads, which fork doesn't carry safely
+            _pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=get_context('spawn'))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def export_itinerary(itinerary: Dict[str, Any], export_format: str) -> Tuple[bytes, str, str]:
+    """(content, mimetype, filename) for an itinerary, from cache when unchanged"""
+    if export_format not in RENDERERS:
+        raise ExportError(f"Unsupported export format {export_format!r}")
+    mimetype, extension = FORMATS[export_format]
+    filename = f"itinerary-{itinerary['id']}.{extension}"
+    key = (itinerary['id'], str(itinerary.get('updated_at')), export_format)
+    content = export_cache.get(key)
+    if content is not None:
+        EXPORT_REQUESTS.inc(format=export_format, cache='hit')
+        return content, mimetype, filename
+    EXPORT_REQUESTS.inc(format=export_format, cache='miss')
+    data = normalize_itinerary(itinerary)
+    started = time.perf_counter()
+    future = _get_pool().submit(RENDERERS[export_format], data)
+    content = future.result(timeout=EXPORT_TIMEOUT_SECONDS)
+    EXPORT_RENDER_SECONDS.observe(time.perf_counter() - started, format=export_format)
+    export_cache.put(key, content)
+    return content, mimetype, filename
@@ -0,0 +1,437 @@
+"""Embedded document store with the subset of the Motor API the backend uses.
+
+Used when ``MONGO_URL`` is not set, so single-node and edge deployments keep
+vendors, bookings, feedback and chat history without running MongoDB. Each
+collection is a SQLite table of JSON documents, opened in WAL mode so reads
+don't block the writer.
+
+Paths passed to ``create_index`` get a ``json_extract`` expression index, and
+equality filters, numeric ranges and sorts on them are answered by SQLite;
+every other condition is checked in Python against the candidate rows. Writes run in
+``BEGIN IMMEDIATE`` transactions, so read-modify-write updates such as
+``$inc`` and ``find_one_and_update`` stay atomic across processes sharing
+the file. Datetimes are stored as ISO strings and come back as strings.
+"""
+import asyncio
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_PATH = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$')
+_RANGE_OPERATORS = {'$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+
+def get_path(document: Dict[str, Any], path: str):
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _matches_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and any(k.startswith('$') for k in condition):
+        for op, operand in condition.items():
+            if op == '$regex':
+                flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+                if not isinstance(value, str) or not re.search(operand, value, flags):
+                    return False
+            elif op == '$options':
+                continue
+            elif op == '$in':
+                if value not in operand:
+                    return False
+            elif op == '$exists':
+                if (value is not None) != bool(operand):
+                    return False
+            elif op == '$ne':
+                if value == operand:
+                    return False
+            elif op in ('$lt', '$lte', '$gt', '$gte'):
+                if value is None:
+                    return False
+                if op == '$lt' and not value < operand:
+                    return False
+                if op == '$lte' and not value <= operand:
+                    return False
+                if op == '$gt' and not value > operand:
+                    return False
+                if op == '$gte' and not value >= operand:
+                    return False
+            else:
+                raise NotImplementedError(f"Unsupported query operator {op}")
+        return True
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+_EXPR_OPS = {
+    '$lt': lambda a, b: a < b,
+    '$lte': lambda a, b: a <= b,
+    '$gt': lambda a, b: a > b,
+    '$gte': lambda a, b: a >= b,
+    '$eq': lambda a, b: a == b,
+}
+
+
+def _expr_operand(document, operand):
+    if isinstance(operand, str) and operand.startswith('$'):
+        return get_path(document, operand[1:])
+    return operand
+
+
+def _matches_expr(document, expr) -> bool:
+    (op, (left, right)), = expr.items()
+    left, right = _expr_operand(document, left), _expr_operand(document, right)
+    if left is None or right is None:
+        return False
+    return _EXPR_OPS[op](left, right)
+
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Check a document against a (simple) Mongo filter"""
+    for path, condition in (query or {}).items():
+        if path == '$expr':
+            if not _matches_expr(document, condition):
+                return False
+            continue
+        if not _matches_condition(get_path(document, path), condition):
+            return False
+    return True
+
+
+def apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False):
+    """Apply $set, $setOnInsert, $inc and $push to a document in place"""
+    for op, fields in update.items():
+        for path, value in fields.items():
+            parent = document
+            parts = path.split('.')
+            for part in parts[:-1]:
+                parent = parent.setdefault(part, {})
+            if op == '$set' or (op == '$setOnInsert' and inserting):
+                parent[parts[-1]] = value
+            elif op == '$inc':
+                parent[parts[-1]] = parent.get(parts[-1], 0) + value
+            elif op == '$push':
+                parent.setdefault(parts[-1], []).append(value)
+            elif op != '$setOnInsert':
+                raise NotImplementedError(f"Unsupported update operator {op}")
+
+
+def upsert_seed(query: Dict[str, Any]) -> Dict[str, Any]:
+    """The document an upsert starts from: the filter's plain equality fields"""
+    return {k: v for k, v in query.items() if not k.startswith('$') and not isinstance(v, dict)}
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return document
+    included = [k for k, v in projection.items() if v and k != '_id']
+    if included:
+        result = {k: document[k] for k in included if k in document}
+        if projection.get('_id', 1) and '_id' in document:
+            result['_id'] = document['_id']
+        return result
+    return {k: v for k, v in document.items() if projection.get(k, 1)}
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot store {type(value).__name__} in the local store")
+
+
+def _dumps(document) -> str:
+    return json.dumps(document, default=_encode, ensure_ascii=False)
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+
+class LocalCursor:
+    """Lazy query; runs when awaited through ``to_list`` or async iteration"""
+
+    def __init__(self, collection: 'LocalCollection', query, projection):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: Optional[Tuple[str, int]] = None
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key, direction=1):
+        self._sort = (key, direction)
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None):
+        limit = min(filter(None, (self._limit, length)), default=0)
+        documents = await self._collection._run(self._collection._select, self._query, self._sort, limit)
+        return [project(d, self._projection) for d in documents]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iter is None:
+            self._iter = iter(await self.to_list(None))
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class LocalCollection:
+    def __init__(self, database: 'LocalDatabase', name: str):
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid collection name {name!r}")
+        self.database = database
+        self.name = name
+        self._indexed = set()
+        database._execute(f'CREATE TABLE IF NOT EXISTS "{name}" (_id TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+
+    async def _run(self, func, *args):
+        return await asyncio.to_thread(self.database._locked, func, *args)
+
+    # Queries, called with the database lock held
+
+    def _where(self, query) -> Tuple[str, list, bool]:
+        """SQL for the indexed equality and range conditions, and whether equality alone covers the filter"""
+        clauses, params, exact = [], [], 0
+        # Indexed paths are assumed to hold scalars, so equality needs no array check
+        for path, condition in query.items():
+            if path not in self._indexed:
+                continue
+            if isinstance(condition, (str, int, float, bool)):
+                clauses.append(f"json_extract(doc, '$.{path}') = ?")
+                params.append(condition)
+                exact += 1
+            elif (isinstance(condition, dict) and list(condition) == ['$in']
+                  and all(isinstance(v, (str, int, float, bool)) for v in condition['$in'])):
+                values = list(condition['$in']) or [None]
+                clauses.append(f"json_extract(doc, '$.{path}') IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+                exact += 1
+            elif (isinstance(condition, dict) and condition and set(condition) <= set(_RANGE_OPERATORS)
+                  and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in condition.values())):
+                # SQLite orders text above numbers where MongoDB wouldn't compare them at all,
+                # so ranges only narrow the scan and matches() still checks each document
+                for operator, value in condition.items():
+                    clauses.append(f"json_extract(doc, '$.{path}') {_RANGE_OPERATORS[operator]} ?")
+                    params.append(value)
+        sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return sql, params, exact == len(query)
+
+    def _select(self, query, sort=None, limit=0) -> List[Dict[str, Any]]:
+        where, params, covered = self._where(query)
+        sql = f'SELECT doc FROM "{self.name}"{where}'
+        if sort is not None and _PATH.match(sort[0]):
+            sql += f" ORDER BY json_extract(doc, '$.{sort[0]}') {'DESC' if sort[1] < 0 else 'ASC'}"
+        if limit and covered:
+            sql += f" LIMIT {int(limit)}"
+        documents = []
+        for (doc,) in self.database._connection.execute(sql, params):
+            document = json.loads(doc)
+            if covered or matches(document, query):
+                documents.append(document)
+                if limit and len(documents) >= limit:
+                    break
+        return documents
+
+    def _insert(self, document):
+        try:
+            self.database._connection.execute(
+                f'INSERT INTO "{self.name}" (_id, doc) VALUES (?, ?)', (document['_id'], _dumps(document)))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e)) from e
+
+    def _replace(self, document):
+        try:
+            self.database._connection.execute(
+                f'UPDATE "{self.name}" SET doc = ? WHERE _id = ?', (_dumps(document), document['_id']))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e)) from e
+
+    def _update(self, query, update, upsert):
+        """(before, after, upserted) for the first matching document, inside one write transaction"""
+        with self.database._transaction():
+            found = self._select(query, limit=1)
+            if found:
+                before = found[0]
+                after = copy.deepcopy(before)
+                apply_update(after, update)
+                self._replace(after)
+                return before, after, False
+            if not upsert:
+                return None, None, False
+            document = upsert_seed(query)
+            apply_update(document, update, inserting=True)
+            document.setdefault('_id', uuid.uuid4().hex)
+            self._insert(document)
+            return None, document, True
+
+    def _insert_one(self, document):
+        with self.database._transaction():
+            self._insert(document)
+
+    def _delete(self, query):
+        with self.database._transaction():
+            ids = [d['_id'] for d in self._select(query)]
+            self.database._connection.executemany(
+                f'DELETE FROM "{self.name}" WHERE _id = ?', [(i,) for i in ids])
+            return len(ids)
+
+    def _create_index(self, paths: List[Tuple[str, int]], unique: bool):
+        name = f"{self.name}__{'__'.join(p.replace('.', '_') for p, _ in paths)}"
+        columns = ", ".join(
+            f"json_extract(doc, '$.{p}'){' DESC' if d < 0 else ''}" for p, d in paths)
+        self.database._connection.execute(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{name}" ON "{self.name}" ({columns})')
+        return name
+
+    # Motor-compatible API
+
+    async def insert_one(self, document):
+        # Like pymongo, the caller's document gains its _id
+        document.setdefault('_id', uuid.uuid4().hex)
+        await self._run(self._insert_one, document)
+        return InsertOneResult(document['_id'])
+
+    def find(self, query=None, projection=None):
+        return LocalCursor(self, query, projection)
+
+    async def find_one(self, query=None, projection=None):
+        found = await self._run(self._select, query or {}, None, 1)
+        return project(found[0], projection) if found else None
+
+    async def count_documents(self, query=None):
+        return len(await self._run(self._select, query or {}))
+
+    async def update_one(self, query, update, upsert=False):
+        before, after, upserted = await self._run(self._update, query, update, upsert)
+        if upserted:
+            return UpdateResult(0, 0, after['_id'])
+        if after is None:
+            return UpdateResult(0, 0)
+        return UpdateResult(1, int(before != after))
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE):
+        before, after, _ = await self._run(self._update, query, update, upsert)
+        document = after if return_document == ReturnDocument.AFTER else before
+        return project(document, projection) if document is not None else None
+
+    async def delete_many(self, query):
+        return DeleteResult(await self._run(self._delete, query or {}))
+
+    async def create_index(self, keys, unique=False, **kwargs):
+        """Expression index on ascending/descending keys; other index types are not supported and skipped"""
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        if not all(isinstance(d, int) and _PATH.match(p) for p, d in keys):
+            return None
+        name = await self._run(self._create_index, list(keys), unique)
+        self._indexed.update(p for p, _ in keys)
+        return name
+
+
+class LocalDatabase:
+    """SQLite file holding one table per collection; attribute access returns a collection"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._collections: Dict[str, LocalCollection] = {}
+        self._open()
+
+    def _open(self):
+        self._pid = os.getpid()
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA busy_timeout=5000")
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # A SQLite connection must not be used across fork; each worker opens its own
+            self._open()
+
+    def __getattr__(self, name: str) -> LocalCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> LocalCollection:
+        self._check_fork()
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = LocalCollection(self, name)
+            return self._collections[name]
+
+    async def command(self, name: str):
+        """Only ``ping`` is supported, for health checks"""
+        if name != 'ping':
+            raise NotImplementedError(f"Unsupported command {name}")
+        await asyncio.to_thread(self._execute, "SELECT 1")
+        return {'ok': 1.0}
+
+    def _locked(self, func, *args):
+        self._check_fork()
+        with self._lock:
+            return func(*args)
+
+    def _execute(self, sql, params=()):
+        self._check_fork()
+        with self._lock:
+            return self._connection.execute(sql, params)
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front so the read and the write
+    # of an update can't interleave with another process's update
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
@@ -0,0 +1,195 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are kept in a module-level registry and
+rendered by ``render_metrics`` for the ``/metrics`` endpoint. ``track_span``
+times calls to external dependencies (Mongo, Gemini, geocoding).
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}' for k, v in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One slot per bucket, then sum and count
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{labels} {series[-1]}')
+        return lines
+
+
+_registry: Dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric_cls, name, documentation, labelnames=(), **kwargs):
+    with _registry_lock:
+        existing = _registry.get(name)
+        if existing is not None:
+            return existing
+        metric = metric_cls(name, documentation, labelnames, **kwargs)
+        _registry[name] = metric
+        return metric
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    """Get or create a counter in the registry"""
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames=()) -> Gauge:
+    """Get or create a gauge in the registry"""
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    """Get or create a histogram in the registry"""
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text format"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+def _reset_locks_after_fork():
+    # A lock held by another thread at fork time would stay locked in the child
+    global _registry_lock
+    _registry_lock = threading.Lock()
+    for metric in _registry.values():
+        metric._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+HTTP_REQUESTS = counter(
+    'http_requests_total', 'HTTP requests by route and status code', ('method', 'route', 'status'))
+HTTP_ERRORS = counter(
+    'http_request_errors_total', 'HTTP requests that raised or returned a 5xx status', ('method', 'route'))
+HTTP_LATENCY = histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+HTTP_IN_FLIGHT = gauge(
+    'http_requests_in_flight', 'HTTP requests currently being served', ('method',))
+DEPENDENCY_LATENCY = histogram(
+    'dependency_call_duration_seconds', 'Latency of calls to external dependencies', ('dependency', 'operation'))
+DEPENDENCY_ERRORS = counter(
+    'dependency_call_errors_total', 'Failed calls to external dependencies', ('dependency', 'operation'))
+
+
+@contextmanager
+def track_span(dependency: str, operation: str):
+    """Time a block that calls an external dependency, counting failures"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DEPENDENCY_ERRORS.inc(dependency=dependency, operation=operation)
+        raise
+    finally:
+        DEPENDENCY_LATENCY.observe(time.perf_counter() - start, dependency=dependency, operation=operation)
@@ -0,0 +1,124 @@
+"""MongoDB client settings and connection pool monitoring.
+
+``mongo_client_options`` reads pool sizes and timeouts from the environment.
+``timeoutMS`` bounds every operation end to end (server selection, pool
+checkout and the round trip), so a slow cluster surfaces as fast errors
+rather than requests piling up behind it. ``PoolMonitor`` is a pymongo pool
+listener that tracks connections in use and checkouts waiting for one, which
+the readiness endpoint and ``/metrics`` report as pool saturation.
+"""
+import os
+import threading
+from typing import Any, Dict
+
+from pymongo import ReadPreference
+from pymongo.monitoring import ConnectionPoolListener
+
+from utils.metrics import counter, gauge
+
+POOL_CONNECTIONS = gauge('mongo_pool_connections', 'MongoDB pool connections by state', ('state',))
+POOL_WAITERS = gauge('mongo_pool_waiters', 'Operations waiting to check out a MongoDB connection')
+POOL_CHECKOUT_FAILURES = counter(
+    'mongo_pool_checkout_failures_total', 'Failed MongoDB connection checkouts', ('reason',))
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+
+def mongo_client_options() -> Dict[str, Any]:
+    return {
+        'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+        'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_MS', 60000)),
+        'timeoutMS': int(os.environ.get('MONGO_TIMEOUT_MS', 5000)),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'connectTimeoutMS': int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+    }
+
+
+def read_preference():
+    """Read preference for read-heavy endpoints (``MONGO_READ_PREFERENCE``, default primary)
+
+    Secondaries may lag, so a client could miss its own write; opt in to them
+    only for deployments where slightly stale listings are acceptable.
+    """
+    name = os.environ.get('MONGO_READ_PREFERENCE', 'primary')
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown MONGO_READ_PREFERENCE {name!r}")
+    return READ_PREFERENCES[name]
+
+
+class PoolMonitor(ConnectionPoolListener):
+    """Counts open, in-use and awaited connections across all pools of a client"""
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.waiters = 0
+        self._update()
+
+    def _update(self, open_=0, in_use=0, waiters=0):
+        # Listeners are called from driver threads
+        with self._lock:
+            self.open += open_
+            self.in_use += in_use
+            self.waiters += waiters
+            POOL_CONNECTIONS.set(self.open, state='open')
+            POOL_CONNECTIONS.set(self.in_use, state='in_use')
+            POOL_WAITERS.set(self.waiters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'open': self.open,
+                'in_use': self.in_use,
+                'waiters': self.waiters,
+                'max_size': self.max_pool_size,
+                'saturation': round(self.in_use / self.max_pool_size, 3) if self.max_pool_size else None,
+            }
+
+    def saturated(self) -> bool:
+        """Every connection is busy and operations are queueing for one"""
+        with self._lock:
+            return self.in_use >= self.max_pool_size and self.waiters > 0
+
+    def connection_created(self, event):
+        self._update(open_=1)
+
+    def connection_closed(self, event):
+        self._update(open_=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(waiters=1)
+
+    def connection_checked_out(self, event):
+        self._update(in_use=1, waiters=-1)
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_FAILURES.inc(reason=str(event.reason))
+        self._update(waiters=-1)
+
+    def connection_checked_in(self, event):
+        self._update(in_use=-1)
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
@@ -0,0 +1,108 @@
+"""Token-bucket rate limiting with pluggable bucket storage.
+
+``InMemoryRateLimitStore`` keeps buckets in this process. ``MongoRateLimitStore``
+keeps them in a collection so every instance shares one budget; the refill
+and take happen in a single atomic pipeline update. Each bucket document
+expires once it would have refilled completely, since a full bucket is the
+same as none.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from pymongo import ReturnDocument
+
+from utils.metrics import counter, track_span
+
+RATE_LIMITED = counter('rate_limited_requests_total', 'Requests rejected by a rate limiter', ('limiter',))
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+
+class RateLimitStore:
+    """Storage backend for token buckets"""
+
+    async def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> RateLimitDecision:
+        raise NotImplementedError
+
+    async def create_indexes(self):
+        pass
+
+
+def _decision(tokens: float, allowed: bool, rate: float, cost: float) -> RateLimitDecision:
+    retry_after = 0.0 if allowed else max(0.0, (cost - tokens) / rate)
+    return RateLimitDecision(allowed, tokens, retry_after)
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Per-process buckets, evicting the least recently used beyond ``max_keys``"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    async def take(self, key, rate, capacity, cost=1.0):
+        now = time.monotonic()
+        async with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                bucket = [capacity, now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = [tokens, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return _decision(tokens, allowed, rate, cost)
+
+
+class MongoRateLimitStore(RateLimitStore):
+    """Buckets shared across instances, one document per key"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, key, rate, capacity, cost=1.0):
+        now = time.time()
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, rate]},
+        ]}]}
+        pipeline = [
+            {"$set": {"tokens": refilled, "updated": now,
+                      "expires_at": datetime.fromtimestamp(now + capacity / rate, timezone.utc)}},
+            {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+            {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+        ]
+        with track_span("mongo", "rate_limits.find_one_and_update"):
+            bucket = await self.collection.find_one_and_update(
+                {"_id": key}, pipeline, upsert=True, return_document=ReturnDocument.AFTER)
+        return _decision(bucket["tokens"], bucket["allowed"], rate, cost)
+
+    async def create_indexes(self):
+        with track_span("mongo", "rate_limits.create_index"):
+            await self.collection.create_index([("expires_at", 1)], expireAfterSeconds=0)
+
+
+class RateLimiter:
+    """Allow ``rate`` requests per second per key, with bursts up to ``capacity``"""
+
+    def __init__(self, name: str, rate: float, capacity: float, store: RateLimitStore = None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.store = store or InMemoryRateLimitStore()
+
+    async def check(self, key: str, cost: float = 1.0) -> RateLimitDecision:
+        decision = await self.store.take(f"{self.name}:{key}", self.rate, self.capacity, cost)
+        if not decision.allowed:
+            RATE_LIMITED.inc(limiter=self.name)
+        return decision
@@ -0,0 +1,210 @@
+"""Response serialization and compression negotiated per request.
+
+``NegotiatedJSONResponse`` is the app's default response class. It encodes
+with orjson, or with MessagePack when the client's ``Accept`` prefers
+``application/msgpack``. A response class never sees the request, so
+``ContentNegotiationMiddleware`` records the choice in a context variable
+for the duration of each request.
+
+``CompressionMiddleware`` compresses bodies of at least
+``COMPRESSION_MIN_BYTES`` with Brotli or gzip, whichever the client's
+``Accept-Encoding`` prefers. Streamed responses are compressed chunk by
+chunk and flushed after each one, so NDJSON lines still arrive as they are
+produced. Both are plain ASGI middleware, so they add no extra task per
+request.
+"""
+import contextvars
+import os
+from datetime import date
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import brotli
+import msgpack
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+# Quality 4-5 is where Brotli beats gzip on both size and speed for dynamic responses
+BROTLI_QUALITY = 4
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson', 'application/msgpack', 'application/x-msgpack',
+    'application/xml', 'application/gpx+xml', 'application/javascript', 'image/svg+xml',
+)
+
+response_format: contextvars.ContextVar[str] = contextvars.ContextVar('response_format', default='json')
+
+
+def _preferences(header: Optional[str]) -> Dict[str, float]:
+    """Quality value per token of an Accept or Accept-Encoding header"""
+    qualities = {}
+    for part in (header or '').split(','):
+        token, *params = [p.strip() for p in part.split(';')]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        qualities[token.lower()] = q
+    return qualities
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    qualities = _preferences(accept)
+    msgpack_q = max(qualities.get(t, 0.0) for t in MSGPACK_TYPES)
+    json_q = max(qualities.get(JSON_TYPE, 0.0), qualities.get('application/*', 0.0), qualities.get('*/*', 0.0))
+    return 'msgpack' if msgpack_q > 0 and msgpack_q >= json_q else 'json'
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    qualities = _preferences(accept_encoding)
+    wildcard = qualities.get('*', 0.0)
+    br, gzip = qualities.get('br', wildcard), qualities.get('gzip', wildcard)
+    if br > 0 and br >= gzip:
+        return 'br'
+    return 'gzip' if gzip > 0 else None
+
+
+def _msgpack_default(value):
+    # Same text as the JSON encoding, so both formats carry identical values
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+class NegotiatedJSONResponse(JSONResponse):
+    """JSON via orjson, or MessagePack when the request negotiated it"""
+
+    def __init__(self, content: Any, *args, **kwargs):
+        self.format = response_format.get()
+        if self.format == 'msgpack':
+            self.media_type = MSGPACK_TYPES[0]
+        super().__init__(content, *args, **kwargs)
+        self.headers.setdefault('vary', 'Accept')
+
+    def render(self, content: Any) -> bytes:
+        if self.format == 'msgpack':
+            return msgpack.packb(content, use_bin_type=True, default=_msgpack_default)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ContentNegotiationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = response_format.set(negotiate_format(Headers(scope=scope).get('accept')))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            response_format.reset(token)
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 16+ writes the gzip container
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress ``data`` and flush, so the client can decode everything sent so far"""
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+
+class _CompressingSend:
+    """Wraps ``send``; holds the body back until it is known to reach the minimum size"""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[Dict[str, Any]] = None
+        self.pending = b''
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _encoded_headers(self, length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = MutableHeaders(raw=list(self.start['headers']))
+        headers['content-encoding'] = self.encoding
+        if length is None:
+            del headers['content-length']
+        else:
+            headers['content-length'] = str(length)
+        headers.add_vary_header('Accept-Encoding')
+        return headers.raw
+
+    async def __call__(self, message):
+        if message['type'] == 'http.response.start':
+            headers = Headers(raw=message['headers'])
+            content_type = headers.get('content-type', '').lower()
+            if 'content-encoding' in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if message['type'] != 'http.response.body' or self.passthrough:
+            await self.send(message)
+            return
+
+        body, more_body = message.get('body', b''), message.get('more_body', False)
+        if self.compressor is None:
+            # Responses can arrive in several chunks (BaseHTTPMiddleware streams
+            # every response), so size is judged on what has accumulated
+            self.pending += body
+            if more_body and len(self.pending) < self.minimum_size:
+                return
+            body, self.pending = self.pending, b''
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send({'type': 'http.response.body', 'body': body})
+                return
+            self.compressor = _Compressor(self.encoding)
+            if not more_body:
+                body = self.compressor.finish(body)
+                await self.send({**self.start, 'headers': self._encoded_headers(len(body))})
+                await self.send({'type': 'http.response.body', 'body': body})
+                return
+            await self.send({**self.start, 'headers': self._encoded_headers(None)})
+
+        body = self.compressor.chunk(body) if more_body else self.compressor.finish(body)
+        await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
@@ -0,0 +1,206 @@
+"""Local BM25 retrieval over the catalog and vendors for the chatbot.
+
+``ChatKnowledgeBase`` indexes attractions, hotels and vendors, builds a
+compact token-budgeted context for the LLM prompt and answers simple
+lookups ("hotels in Betla") straight from the index.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from data.catalog_loader import get_catalog
+from utils.route_calculator import calculate_distance
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOP_WORDS = {
+    "a", "an", "the", "in", "at", "near", "of", "to", "for", "and", "or", "is", "are", "me", "i",
+    "what", "which", "where", "how", "about", "tell", "show", "list", "any", "some", "can", "you",
+    "please", "there", "with", "on", "my", "do", "does", "best", "good",
+}
+# Rough chars-per-token ratio for budgeting prompt context without a tokenizer
+CHARS_PER_TOKEN = 4
+NEARBY_HOTEL_RADIUS_KM = 50
+
+LOOKUP_PATTERNS = {
+    "hotel": re.compile(
+        r"^\s*(?:show |list |find |any |best |good )*(?:hotels?|stays?|accommodations?|lodges?|resorts?)"
+        r"\s+(?P<prep>in|at|near|around)\s+(?P<place>[\w\s]+?)\s*\??\s*$", re.IGNORECASE),
+    "attraction": re.compile(
+        r"^\s*(?:show |list |find |best |top )*(?:places|attractions|spots|things to do|places to visit)"
+        r"\s+(?P<prep>in|at|near|around)\s+(?P<place>[\w\s]+?)\s*\??\s*$", re.IGNORECASE),
+    "guide": re.compile(
+        r"^\s*(?:show |list |find |any )*(?:guides?|tour guides?)"
+        r"\s+(?P<prep>in|at|near|around)\s+(?P<place>[\w\s]+?)\s*\??\s*$", re.IGNORECASE),
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    """Inverted index scored with Okapi BM25"""
+
+    def __init__(self, documents: List[Tuple[str, Dict[str, Any], str]], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths = []
+        for doc_id, (_, _, text) in enumerate(documents):
+            terms = Counter(tokenize(text))
+            self.lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                self.postings.setdefault(term, []).append((doc_id, freq))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+        count = len(documents)
+        self.idf = {
+            term: math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 5, kinds=None) -> List[Tuple[float, str, Dict[str, Any]]]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for doc_id, score in ranked:
+            kind, record, _ = self.documents[doc_id]
+            if kinds and kind not in kinds:
+                continue
+            results.append((score, kind, record))
+            if len(results) >= k:
+                break
+        return results
+
+
+def _attraction_text(a):
+    return " ".join([a["name"], a["city"], a["type"], " ".join(a.get("interest_tags", [])),
+                     a.get("description", ""), a.get("best_time", ""), a.get("duration", "")])
+
+
+def _hotel_text(h):
+    return " ".join([h["name"], h["city"], "hotel stay accommodation", " ".join(h.get("amenities", [])),
+                     h.get("price_range", "")])
+
+
+def _vendor_text(v):
+    return " ".join([v["name"], v["type"], v["location"], " ".join(v.get("services", [])),
+                     " ".join(v.get("nearby_spots", []))])
+
+
+def format_record(kind: str, record: Dict[str, Any]) -> str:
+    """One compact line per record for prompts and direct answers"""
+    if kind == "attraction":
+        return (f"{record['name']} ({record['city']}) - {record['type']}, {record.get('duration', '')}, "
+                f"best {record.get('best_time', '')}: {record.get('description', '')}")
+    if kind == "hotel":
+        return (f"{record['name']} ({record['city']}) - {record['price_range']}, "
+                f"{record['rooms']} rooms, contact {record['contact']}")
+    pricing = ", ".join(f"{k.replace('_', ' ')} ₹{v}" for k, v in record.get("pricing", {}).items())
+    return (f"{record['name']} ({record['type']}, {record['location']}) - "
+            f"{', '.join(record.get('services', []))}{'; ' + pricing if pricing else ''}, phone {record['phone']}")
+
+
+class ChatKnowledgeBase:
+    """BM25 index over the active catalog plus vendors, rebuilt when either changes"""
+
+    def __init__(self):
+        self._vendors: List[Dict[str, Any]] = []
+        self._vendor_generation = 0
+        self._index: Optional[BM25Index] = None
+        self._index_key = None
+
+    def set_vendors(self, vendors: List[Dict[str, Any]]):
+        self._vendors = list(vendors)
+        self._vendor_generation += 1
+
+    def add_vendor(self, vendor: Dict[str, Any]):
+        self.set_vendors(self._vendors + [vendor])
+
+    def index(self) -> BM25Index:
+        catalog = get_catalog()
+        key = (catalog.version, self._vendor_generation)
+        if self._index is None or self._index_key != key:
+            documents = [("attraction", a, _attraction_text(a)) for a in catalog.attractions]
+            documents += [("hotel", h, _hotel_text(h)) for h in catalog.hotels]
+            documents += [("vendor", v, _vendor_text(v)) for v in self._vendors]
+            self._index = BM25Index(documents)
+            self._index_key = key
+        return self._index
+
+    def build_context(self, query: str, k: int = 6, token_budget: int = 350) -> str:
+        """Top-k matching records as bullet lines, cut off at ``token_budget`` tokens"""
+        lines, used = [], 0
+        for _, kind, record in self.index().search(query, k=k):
+            line = f"- [{kind}] {format_record(kind, record)}"
+            cost = len(line) // CHARS_PER_TOKEN + 1
+            if used + cost > token_budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+    def _hotels_for_place(self, place: str) -> List[Dict[str, Any]]:
+        catalog = get_catalog()
+        for city, hotels in catalog.hotels_by_city.items():
+            if city.lower() == place:
+                return list(hotels)
+        named = [h for h in catalog.hotels if place in h["name"].lower()]
+        if named:
+            return named
+        anchors = [a["coordinates"] for a in catalog.attractions if place in a["name"].lower()]
+        if not anchors:
+            return []
+        anchor = anchors[0]
+        nearby = []
+        for hotel in catalog.hotels:
+            distance = calculate_distance(anchor["lat"], anchor["lng"],
+                                          hotel["coordinates"]["lat"], hotel["coordinates"]["lng"])
+            if distance <= NEARBY_HOTEL_RADIUS_KM:
+                nearby.append((distance, hotel))
+        return [hotel for _, hotel in sorted(nearby, key=lambda item: item[0])]
+
+    def _attractions_for_place(self, place: str) -> List[Dict[str, Any]]:
+        for city, attractions in get_catalog().attractions_by_city.items():
+            if city.lower() == place:
+                return list(attractions)
+        return []
+
+    def _guides_for_place(self, place: str) -> List[Dict[str, Any]]:
+        return [v for v in self._vendors if v.get("type") == "guide"
+                and (place in v["location"].lower() or any(place in s.lower() for s in v.get("nearby_spots", [])))]
+
+    def answer_directly(self, message: str, language: str = "english") -> Optional[str]:
+        """Answer simple catalog lookups without the LLM, or return None"""
+        for kind, pattern in LOOKUP_PATTERNS.items():
+            match = pattern.match(message)
+            if not match:
+                continue
+            place = " ".join(match.group("place").lower().split())
+            if kind == "hotel":
+                records = self._hotels_for_place(place)
+            elif kind == "attraction":
+                records = self._attractions_for_place(place)
+            else:
+                records = self._guides_for_place(place)
+            if not records:
+                return None
+            record_kind = "vendor" if kind == "guide" else kind
+            lines = "\n".join(f"• {format_record(record_kind, r)}" for r in records[:8])
+            title = place.title()
+            prep = match.group("prep").lower()
+            if language == "hindi":
+                headers = {"hotel": f"{title} में ठहरने के विकल्प:", "attraction": f"{title} में घूमने की जगहें:",
+                           "guide": f"{title} में गाइड:"}
+            else:
+                headers = {"hotel": f"Places to stay {prep} {title}:", "attraction": f"Places to visit {prep} {title}:",
+                           "guide": f"Guides {prep} {title}:"}
+            return f"{headers[kind]}\n\n{lines}"
+        return None
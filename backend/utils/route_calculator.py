@@ -1,7 +1,15 @@
+import logging
 import requests
 import math
 import os
-from data.attractions_data import get_all_attractions
+from utils.metrics import track_span
+
+logger = logging.getLogger(__name__)
+
+# Spacing of the points of a route's polyline
+WAYPOINT_SPACING_KM = 10
+GEOCODE_TIMEOUT_SECONDS = float(os.getenv('GEOCODE_TIMEOUT_SECONDS', 5))
+DEFAULT_COORDINATES = {'lat': 23.3441, 'lng': 85.3096}  # Ranchi
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate distance between two coordinates using Haversine formula"""
@@ -27,7 +35,11 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return distance
 
 def geocode_address(address):
-    """Convert address to coordinates using Google Maps Geocoding API"""
+    """Convert address to coordinates, defaulting to Ranchi when the lookup fails"""
+    return lookup_address(address) or DEFAULT_COORDINATES
+
+def lookup_address(address):
+    """Convert address to coordinates using Google Maps Geocoding API; None if it can't be found"""
     api_key = os.getenv('GOOGLE_MAPS_API_KEY')
     
     if not api_key:
@@ -46,9 +58,7 @@ def geocode_address(address):
         for location, coords in mock_locations.items():
             if location in address_lower:
                 return coords
-
-        # Default to Ranchi if no match found
-        return {'lat': 23.3441, 'lng': 85.3096}
+        return None
     try:
         url = f"https://maps.googleapis.com/maps/api/geocode/json"
         params = {
@@ -56,19 +66,22 @@ def geocode_address(address):
             'key': api_key
         }
         
-        response = requests.get(url, params=params)
-        data = response.json()
+        with track_span("geocoding", "google_maps"):
+            response = requests.get(url, params=params, timeout=GEOCODE_TIMEOUT_SECONDS)
+            data = response.json()
         
         if data['status'] == 'OK' and data['results']:
             location = data['results'][0]['geometry']['location']
             return {'lat': location['lat'], 'lng': location['lng']}
+        elif data['status'] == 'ZERO_RESULTS':
+            return None
         else:
             raise Exception(f"Geocoding failed: {data['status']}")
     
     except Exception as e:
-        print(f"Geocoding error: {e}")
-        # Return default coordinates (Ranchi) on error
-        return {'lat': 23.3441, 'lng': 85.3096}
+        # Request errors quote the URL, key included
+        logger.warning("Geocoding %r failed: %s", address, str(e).replace(api_key, '***'))
+        return None
 
 def calculate_route(origin, destination):
     """Calculate route between origin and destination"""
@@ -82,8 +95,8 @@ def calculate_route(origin, destination):
         dest_coords['lat'], dest_coords['lng']
     )
     
-    # Generate waypoints along the route (simplified)
-    waypoints = generate_waypoints(origin_coords, dest_coords)
+    # Generate waypoints along the route (simplified), denser for longer trips
+    waypoints = generate_waypoints(origin_coords, dest_coords, max(1, math.ceil(distance / WAYPOINT_SPACING_KM)))
     
     return {
         'origin': origin_coords,
@@ -106,38 +119,10 @@ def generate_waypoints(origin, destination, num_points=5):
     return waypoints
 
 def find_nearby_attractions(waypoints, buffer_km=10, interests=None):
-    """Find attractions near the route waypoints"""
-    all_attractions = get_all_attractions()
-    nearby_attractions = []
-    
-    for waypoint in waypoints:
-        for attraction in all_attractions:
-            # Calculate distance from waypoint to attraction
-            distance = calculate_distance(
-                waypoint['lat'], waypoint['lng'],
-                attraction['coordinates']['lat'], attraction['coordinates']['lng']
-            )
-            
-            # Check if attraction is within buffer distance
-            if distance <= buffer_km:
-                # Filter by interests if provided
-                if interests:
-                    attraction_interests = attraction.get('interest_tags', [])
-                    if not any(interest in attraction_interests for interest in interests):
-                        continue
-                
-                # Add distance info to attraction
-                attraction_with_distance = attraction.copy()
-                attraction_with_distance['distance_from_route'] = round(distance, 2)
-                
-                # Avoid duplicates
-                if not any(na['id'] == attraction['id'] for na in nearby_attractions):
-                    nearby_attractions.append(attraction_with_distance)
-    
-    # Sort by distance from route
-    nearby_attractions.sort(key=lambda x: x['distance_from_route'])
-    
-    return nearby_attractions
+    """Find attractions within buffer_km of the route polyline, smallest detour first"""
+    # Imported here: the corridor search builds on geo_index, which imports this module
+    from utils.corridor import corridor_attractions
+    return corridor_attractions(waypoints, buffer_km, interests)
 
 def optimize_attraction_order(attractions, start_location):
     """Optimize the order of attractions to minimize travel distance"""
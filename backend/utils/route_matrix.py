@@ -0,0 +1,184 @@
+"""Distance and duration matrices for many origins and destinations.
+
+Locations are de-duplicated (addresses case- and whitespace-insensitively,
+coordinates exactly), each distinct address is geocoded once with lookups
+running concurrently, and distances come from one vectorized haversine pass
+per block of origin rows. Results are produced as NDJSON lines so a large
+matrix streams to the client block by block.
+
+An address that can't be geocoded is listed with null coordinates and an
+error, and every cell involving it is null.
+"""
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.route_calculator import lookup_address
+from utils.tour_state import AVERAGE_SPEED_KMH
+
+ROUTE_MATRIX_MAX_CELLS = int(os.environ.get('ROUTE_MATRIX_MAX_CELLS', 250000))
+# Each distinct address costs a geocoding call, however few cells it is part of
+ROUTE_MATRIX_MAX_ADDRESSES = int(os.environ.get('ROUTE_MATRIX_MAX_ADDRESSES', 200))
+GEOCODE_CONCURRENCY = int(os.environ.get('GEOCODE_CONCURRENCY', 8))
+EARTH_RADIUS_KM = 6371.0
+ROW_BLOCK = 256
+
+
+class MatrixError(ValueError):
+    """The matrix request is invalid"""
+
+
+def _location_key(location) -> Tuple:
+    if isinstance(location, str) and location.strip():
+        return ('address', ' '.join(location.lower().split()))
+    if isinstance(location, dict):
+        try:
+            return ('point', float(location['lat']), float(location['lng']))
+        except (KeyError, TypeError, ValueError):
+            pass
+    raise MatrixError(f"Location must be an address or {{lat, lng}}: {location!r}")
+
+
+class LocationTable:
+    """Distinct locations of a request, geocoded once each"""
+
+    def __init__(self):
+        self.keys: List[Tuple] = []
+        self.inputs: List[Any] = []
+        self._index: Dict[Tuple, int] = {}
+        self.addresses = 0
+        self.degrees = np.empty((0, 2))
+
+    def add(self, location) -> int:
+        key = _location_key(location)
+        index = self._index.get(key)
+        if index is None:
+            if key[0] == 'address':
+                self.addresses += 1
+                if self.addresses > ROUTE_MATRIX_MAX_ADDRESSES:
+                    raise MatrixError(f"At most {ROUTE_MATRIX_MAX_ADDRESSES} distinct addresses per request")
+            index = self._index[key] = len(self.keys)
+            self.keys.append(key)
+            self.inputs.append(location)
+        return index
+
+    def resolve(self) -> np.ndarray:
+        """(n, 2) array of latitude/longitude in radians, NaN for addresses that weren't found"""
+        coordinates = np.full((len(self.keys), 2), np.nan)
+        addresses = [(i, self.inputs[i]) for i, key in enumerate(self.keys) if key[0] == 'address']
+        for i, key in enumerate(self.keys):
+            if key[0] == 'point':
+                coordinates[i] = key[1:]
+        if addresses:
+            with ThreadPoolExecutor(max_workers=min(GEOCODE_CONCURRENCY, len(addresses))) as pool:
+                for (i, _), point in zip(addresses, pool.map(lookup_address, [a for _, a in addresses])):
+                    if point is not None:
+                        coordinates[i] = (point['lat'], point['lng'])
+        self.degrees = coordinates
+        return np.radians(coordinates)
+
+    @property
+    def unresolved(self) -> bool:
+        return bool(np.isnan(self.degrees).any())
+
+    def describe(self) -> List[Dict[str, Any]]:
+        described = []
+        for i, (lat, lng) in enumerate(self.degrees):
+            if math.isnan(lat):
+                described.append({'input': self.inputs[i], 'lat': None, 'lng': None, 'error': 'Address not found'})
+            else:
+                described.append({'input': self.inputs[i], 'lat': round(float(lat), 6), 'lng': round(float(lng), 6)})
+        return described
+
+
+def haversine_km(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Great-circle distances between broadcastable arrays of (lat, lng) radians"""
+    dlat = b[..., 0] - a[..., 0]
+    dlng = b[..., 1] - a[..., 1]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[..., 0]) * np.cos(b[..., 0]) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _line(document: Dict[str, Any]) -> str:
+    return json.dumps(document, separators=(',', ':')) + '\n'
+
+
+def _cells(values: np.ndarray, nullable: bool) -> List[Optional[float]]:
+    cells = np.round(values, 2).tolist()
+    if nullable:
+        return [None if math.isnan(cell) else cell for cell in cells]
+    return cells
+
+
+def _block(distances: np.ndarray, nullable: bool = False) -> Dict[str, List]:
+    return {
+        'distance_km': _cells(distances, nullable),
+        'duration_hours': _cells(distances / AVERAGE_SPEED_KMH, nullable),
+    }
+
+
+def route_matrix(payload: Dict[str, Any]) -> Iterator[str]:
+    """Validate and geocode a batch request, then return the NDJSON lines of its answer
+
+    The payload has either ``origins`` and ``destinations`` (every origin to
+    every destination, one ``row`` line per origin) or ``pairs`` of
+    ``{origin, destination}`` (``pairs`` lines of up to ``ROW_BLOCK`` results).
+    """
+    if not isinstance(payload, dict):
+        raise MatrixError("The request body must be a JSON object")
+    table = LocationTable()
+    pairs = payload.get('pairs')
+    if pairs is not None:
+        if not isinstance(pairs, list) or not pairs:
+            raise MatrixError("pairs must be a non-empty list")
+        if len(pairs) > ROUTE_MATRIX_MAX_CELLS:
+            raise MatrixError(f"At most {ROUTE_MATRIX_MAX_CELLS} pairs per request")
+        try:
+            left = np.array([table.add(p['origin']) for p in pairs])
+            right = np.array([table.add(p['destination']) for p in pairs])
+        except (KeyError, TypeError):
+            raise MatrixError("Each pair needs an origin and a destination")
+    else:
+        origins, destinations = payload.get('origins'), payload.get('destinations')
+        if not isinstance(origins, list) or not isinstance(destinations, list) or not origins or not destinations:
+            raise MatrixError("origins and destinations must be non-empty lists")
+        if len(origins) * len(destinations) > ROUTE_MATRIX_MAX_CELLS:
+            raise MatrixError(f"At most {ROUTE_MATRIX_MAX_CELLS} origin/destination cells per request")
+        left = np.array([table.add(o) for o in origins])
+        right = np.array([table.add(d) for d in destinations])
+    points = table.resolve()
+    return _stream(table, points, left, right, pairs is not None)
+
+
+def _stream(table: LocationTable, points: np.ndarray, left: np.ndarray, right: np.ndarray,
+            paired: bool) -> Iterator[str]:
+    yield _line({
+        'type': 'locations',
+        'locations': table.describe(),
+        'origins': left.tolist(),
+        'destinations': right.tolist(),
+    })
+    # Cells of unresolved locations are NaN, sent as null
+    nullable = table.unresolved
+    if paired:
+        for start in range(0, len(left), ROW_BLOCK):
+            distances = haversine_km(points[left[start:start + ROW_BLOCK]], points[right[start:start + ROW_BLOCK]])
+            yield _line({'type': 'pairs', 'start': start, **_block(distances, nullable)})
+        cells = len(left)
+    else:
+        # Rows repeat when an origin appears twice; compute each distinct origin once
+        destinations = points[right][np.newaxis, :, :]
+        for start in range(0, len(left), ROW_BLOCK):
+            rows = left[start:start + ROW_BLOCK]
+            distinct, inverse = np.unique(rows, return_inverse=True)
+            distances = haversine_km(points[distinct][:, np.newaxis, :], destinations)[inverse]
+            for offset, row in enumerate(distances):
+                yield _line({'type': 'row', 'origin': start + offset, **_block(row, nullable)})
+        cells = len(left) * len(right)
+    yield _line({'type': 'done', 'cells': cells, 'distinct_locations': len(table.keys),
+                 'unresolved_locations': int(np.isnan(table.degrees[:, 0]).sum())})
+
@@ -0,0 +1,122 @@
+"""Periodic background jobs.
+
+Each job has its own asyncio loop that sleeps ``interval`` seconds, spread by
+up to ``JITTER`` either way so workers started together don't fire
+together, and then runs the job on the work queue at background priority.
+
+Jobs that keep per-worker state (cache warming) run in every worker. Jobs
+marked ``exclusive`` write shared state and run in one worker per period:
+before running, a worker claims the job's row in the ``job_locks``
+collection by moving its ``due_at`` forward, a compare-and-set that only one
+worker can win. The claim also covers a worker that dies mid-run; the job is
+simply due again next period.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.metrics import counter, gauge, track_span
+from utils.work_queue import BACKGROUND, PriorityWorkQueue
+
+logger = logging.getLogger(__name__)
+
+JITTER = 0.1
+
+JOB_RUNS = counter('scheduled_job_runs_total', 'Scheduled job runs by outcome', ('job', 'result'))
+JOB_LAST_SUCCESS = gauge('scheduled_job_last_success_timestamp_seconds',
+                         'Unix time of the last successful run of each scheduled job', ('job',))
+
+
+class ScheduledJob:
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]], interval: float,
+                 exclusive: bool = False, run_at_start: bool = False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.exclusive = exclusive
+        self.run_at_start = run_at_start
+
+
+class Scheduler:
+    def __init__(self, queue: PriorityWorkQueue, locks=None, jitter: float = JITTER):
+        self.queue = queue
+        # job_locks collection; without one, exclusive jobs only guard against this process
+        self.locks = locks
+        self.jitter = jitter
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], interval: float, exclusive: bool = False,
+            run_at_start: bool = False):
+        self.jobs[name] = ScheduledJob(name, func, interval, exclusive, run_at_start)
+
+    async def create_indexes(self):
+        if self.locks is not None:
+            await self.locks.create_index([("name", 1)], unique=True)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._loop(job), name=f'scheduler-{job.name}')
+                       for job in self.jobs.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _delay(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _claim(self, job: ScheduledJob) -> bool:
+        """Take this period's run of an exclusive job; False if another worker has it"""
+        if self.locks is None:
+            return True
+        now = time.time()
+        try:
+            with track_span("mongo", "job_locks.update_one"):
+                await self.locks.update_one(
+                    {"name": job.name}, {"$setOnInsert": {"name": job.name, "due_at": 0}}, upsert=True)
+        except DuplicateKeyError:
+            pass
+        # Not due again until just before the earliest jittered timer of any worker
+        with track_span("mongo", "job_locks.find_one_and_update"):
+            claimed = await self.locks.find_one_and_update(
+                {"name": job.name, "due_at": {"$lte": now}},
+                {"$set": {"due_at": now + job.interval * (1 - 2 * self.jitter),
+                          "owner": self.owner, "claimed_at": now}},
+            )
+        return claimed is not None
+
+    async def run(self, name: str) -> Optional[Any]:
+        """Run a job now on the work queue, subject to its lock; returns what the job returned"""
+        job = self.jobs[name]
+        try:
+            if job.exclusive and not await self._claim(job):
+                JOB_RUNS.inc(job=name, result="skipped")
+                return None
+            result = await (await self.queue.submit(BACKGROUND, job.func, name=name))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            JOB_RUNS.inc(job=name, result="failed")
+            logger.error("Scheduled job %s failed: %s", name, e)
+            return None
+        JOB_RUNS.inc(job=name, result="ok")
+        JOB_LAST_SUCCESS.set(time.time(), job=name)
+        return result
+
+    async def _loop(self, job: ScheduledJob):
+        if not job.run_at_start:
+            await asyncio.sleep(self._delay(job.interval))
+        while True:
+            await self.run(job.name)
+            await asyncio.sleep(self._delay(job.interval))
@@ -0,0 +1,49 @@
+"""List responses without repeated model validation.
+
+Returning ``[Model(**record) for record in records]`` validates every record
+into a model, and FastAPI then dumps each model, validates the dumps against
+``response_model`` and serializes the result. A ``ListSerializer`` returns a
+finished response instead, so FastAPI's pass is skipped (``response_model``
+still documents the endpoint):
+
+- ``trusted`` is for records already checked against the model's fields,
+  such as catalog entries validated at load. They are copied field by field
+  with defaults filled in and encoded directly, without pydantic.
+- ``stored`` is for database documents, which may hold old or partial
+  records and ISO strings for datetimes. They are validated once in
+  pydantic-core through a ``TypeAdapter`` and dumped straight to JSON bytes.
+
+Measured on 10k-item lists (``python -m benchmarks.run --skip-api``),
+constructing models with ``model_construct`` is slower than one validation
+pass in pydantic-core, so neither path uses it.
+"""
+from typing import Any, Dict, Iterable, List, Type
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+from utils.response_encoding import JSON_TYPE, NegotiatedJSONResponse, response_format
+
+
+class ListSerializer:
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.adapter = TypeAdapter(List[model])
+        self.fields = tuple(model.model_fields)
+        self._defaults = {name: field for name, field in model.model_fields.items() if not field.is_required()}
+
+    def project(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The model's fields of each record, defaults filled in"""
+        fields, defaults = self.fields, self._defaults
+        return [{name: record[name] if name in record else defaults[name].get_default(call_default_factory=True)
+                 for name in fields} for record in records]
+
+    def trusted(self, records: Iterable[Dict[str, Any]]) -> Response:
+        return NegotiatedJSONResponse(self.project(records))
+
+    def stored(self, records: List[Dict[str, Any]]) -> Response:
+        """Raises ``pydantic.ValidationError`` if a record doesn't fit the model"""
+        models = self.adapter.validate_python(records)
+        if response_format.get() == 'msgpack':
+            return NegotiatedJSONResponse(self.adapter.dump_python(models, mode='json'))
+        return Response(self.adapter.dump_json(models), media_type=JSON_TYPE, headers={'vary': 'Accept'})
@@ -0,0 +1,26 @@
+"""Coalesce concurrent identical calls into one in-flight task."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from utils.metrics import counter
+
+COALESCED_CALLS = counter('singleflight_coalesced_total', 'Calls that joined an in-flight duplicate', ('group',))
+
+
+class SingleFlight:
+    """Callers with the same key while a call is running share its result"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            COALESCED_CALLS.inc(group=self.name)
+        # Shield so one caller disconnecting doesn't cancel the call for the others
+        return await asyncio.shield(task)
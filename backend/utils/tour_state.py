@@ -0,0 +1,300 @@
+"""Per-day tour state for applying single-stop itinerary edits incrementally.
+
+An ``ItineraryPlan`` keeps each day's stops in visiting order with the day's
+path length from the trip's start location. Adding, moving or removing one
+stop costs one insertion or removal delta, followed by a local repair
+(2-opt and or-opt moves that touch the edited position) on the affected days
+only, so a drag-and-drop edit never re-solves the whole trip.
+
+Days may be the planner's mapping of day label to stops or a list of
+``{"attractions": [...]}`` dicts; ``to_days`` writes back the same shape.
+Stops may be attraction dicts or catalog ids.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from data.catalog_loader import get_catalog
+from utils.route_calculator import calculate_distance
+
+AVERAGE_SPEED_KMH = 60
+REPAIR_WINDOW = 3
+MAX_REPAIR_PASSES = 8
+MAX_SEGMENT = 3
+EPSILON = 1e-9
+
+Point = Optional[Tuple[float, float]]
+
+
+class EditError(ValueError):
+    """The edit can't be applied to the itinerary"""
+
+
+@lru_cache(maxsize=65536)
+def _haversine(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    return calculate_distance(a[0], a[1], b[0], b[1])
+
+
+def _leg(a: Point, b: Point) -> float:
+    # Missing ends (no anchor, past the last stop, stops without coordinates) cost nothing
+    if a is None or b is None:
+        return 0.0
+    return _haversine(a, b)
+
+
+def _coordinates(value) -> Point:
+    if not value or value.get('lat') is None or value.get('lng') is None:
+        return None
+    return (float(value['lat']), float(value['lng']))
+
+
+def stop_id(stop) -> Optional[str]:
+    return stop if isinstance(stop, str) else stop.get('id')
+
+
+def _point(stop) -> Point:
+    if isinstance(stop, str):
+        stop = get_catalog().attractions_by_id.get(stop) or {}
+    point = _coordinates(stop.get('coordinates'))
+    if point is None and stop.get('id') in get_catalog().attractions_by_id:
+        point = _coordinates(get_catalog().attractions_by_id[stop['id']].get('coordinates'))
+    return point
+
+
+class DayTour:
+    """One day's stops in visiting order and the length of the path through them"""
+
+    def __init__(self, label: str, stops: Iterable[Any], anchor: Point = None):
+        self.label = label
+        self.anchor = anchor
+        self.stops = list(stops)
+        self.points = [_point(stop) for stop in self.stops]
+        self.distance_km = self._measure()
+
+    def __len__(self):
+        return len(self.stops)
+
+    def _measure(self) -> float:
+        return sum(_leg(self._prev(i), self.points[i]) for i in range(len(self.points)))
+
+    def _prev(self, index: int) -> Point:
+        return self.anchor if index == 0 else self.points[index - 1]
+
+    def _at(self, index: int) -> Point:
+        return self.points[index] if index < len(self.points) else None
+
+    def index_of(self, key: str) -> Optional[int]:
+        for index, stop in enumerate(self.stops):
+            if stop_id(stop) == key:
+                return index
+        return None
+
+    def insertion_cost(self, point: Point, index: int) -> float:
+        before, after = self._prev(index), self._at(index)
+        return _leg(before, point) + _leg(point, after) - _leg(before, after)
+
+    def cheapest_insertion(self, point: Point) -> Tuple[int, float]:
+        # Ties go to the end of the day, where the planner appends
+        return min(((index, self.insertion_cost(point, index)) for index in range(len(self.stops) + 1)),
+                   key=lambda candidate: (candidate[1], -candidate[0]))
+
+    def insert(self, stop, index: Optional[int] = None) -> int:
+        """Insert at ``index``, or at the cheapest position when None; returns the position"""
+        point = _point(stop)
+        if index is None:
+            index, delta = self.cheapest_insertion(point)
+        else:
+            index = max(0, min(index, len(self.stops)))
+            delta = self.insertion_cost(point, index)
+        self.stops.insert(index, stop)
+        self.points.insert(index, point)
+        self.distance_km += delta
+        return index
+
+    def pop(self, index: int):
+        before, point, after = self._prev(index), self.points[index], self._at(index + 1)
+        self.distance_km += _leg(before, after) - _leg(before, point) - _leg(point, after)
+        self.points.pop(index)
+        return self.stops.pop(index)
+
+    def _two_opt(self, lo: int, hi: int) -> bool:
+        # Reverse stops[i..j] for i or j near the edited position
+        n = len(self.points)
+        best = (-EPSILON, None)
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                if not (lo <= i <= hi or lo <= j <= hi):
+                    continue
+                a, b, c, d = self._prev(i), self.points[i], self.points[j], self._at(j + 1)
+                delta = _leg(a, c) + _leg(b, d) - _leg(a, b) - _leg(c, d)
+                if delta < best[0]:
+                    best = (delta, (i, j))
+        if best[1] is None:
+            return False
+        i, j = best[1]
+        self.stops[i:j + 1] = self.stops[i:j + 1][::-1]
+        self.points[i:j + 1] = self.points[i:j + 1][::-1]
+        return True
+
+    def _or_opt(self, lo: int, hi: int) -> bool:
+        # Move a run of up to MAX_SEGMENT stops that starts near the edited position
+        n = len(self.points)
+        best = (-EPSILON, None)
+        for length in range(1, min(MAX_SEGMENT, n - 1) + 1):
+            for i in range(max(0, lo - length + 1), min(hi, n - length) + 1):
+                first, last = self.points[i], self.points[i + length - 1]
+                before, after = self._prev(i), self._at(i + length)
+                removed = _leg(before, after) - _leg(before, first) - _leg(last, after)
+                rest = self.points[:i] + self.points[i + length:]
+                for k in range(len(rest) + 1):
+                    if k == i:
+                        continue
+                    q = self.anchor if k == 0 else rest[k - 1]
+                    r = rest[k] if k < len(rest) else None
+                    delta = removed + _leg(q, first) + _leg(last, r) - _leg(q, r)
+                    if delta < best[0]:
+                        best = (delta, (i, length, k))
+        if best[1] is None:
+            return False
+        i, length, k = best[1]
+        for items in (self.stops, self.points):
+            segment = items[i:i + length]
+            del items[i:i + length]
+            items[k:k] = segment
+        return True
+
+    def repair(self, around: int, window: int = REPAIR_WINDOW) -> None:
+        """Improve the order with moves that touch positions around ``around``"""
+        if len(self.points) < 3:
+            return
+        lo, hi = max(0, around - window), min(len(self.points) - 1, around + window)
+        for _ in range(MAX_REPAIR_PASSES):
+            if not (self._two_opt(lo, hi) or self._or_opt(lo, hi)):
+                break
+        # Re-measure rather than carry float drift from the deltas
+        self.distance_km = self._measure()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'label': self.label,
+            'order': [stop_id(stop) for stop in self.stops],
+            'stops': len(self.stops),
+            'distance_km': round(self.distance_km, 2),
+            'travel_hours': round(self.distance_km / AVERAGE_SPEED_KMH, 2),
+        }
+
+
+class ItineraryPlan:
+    """Tours for every day of an itinerary, edited one stop at a time"""
+
+    def __init__(self, days, anchor: Point = None):
+        self.anchor = anchor
+        self.days: "OrderedDict[str, DayTour]" = OrderedDict()
+        self._mapping = isinstance(days, dict)
+        self._day_fields: Dict[str, Dict[str, Any]] = {}
+        if self._mapping:
+            for label, stops in days.items():
+                self.days[label] = DayTour(label, stops or [], anchor)
+        else:
+            for index, day in enumerate(days or []):
+                if isinstance(day, list):
+                    day = {'attractions': day}
+                label = day.get('label') or f"Day {day.get('day', index + 1)}"
+                self._day_fields[label] = {k: v for k, v in day.items() if k not in ('attractions', 'stops')}
+                self.days[label] = DayTour(label, day.get('attractions') or day.get('stops') or [], anchor)
+
+    @classmethod
+    def from_itinerary(cls, itinerary: Dict[str, Any]) -> "ItineraryPlan":
+        return cls(itinerary.get('days') or [], _coordinates(itinerary.get('current_location')))
+
+    def to_days(self):
+        """The days in the shape the itinerary was created with"""
+        if self._mapping:
+            return {label: list(tour.stops) for label, tour in self.days.items()}
+        return [{**self._day_fields[label], 'attractions': list(tour.stops)} for label, tour in self.days.items()]
+
+    def day(self, key) -> DayTour:
+        if key in self.days:
+            return self.days[key]
+        if isinstance(key, int) and 0 <= key < len(self.days):
+            return list(self.days.values())[key]
+        raise EditError(f"Unknown day {key!r}")
+
+    def locate(self, key: str) -> Optional[Tuple[DayTour, int]]:
+        for tour in self.days.values():
+            index = tour.index_of(key)
+            if index is not None:
+                return tour, index
+        return None
+
+    def add(self, stop, day, position: Optional[int] = None, optimize: bool = True) -> List[str]:
+        if isinstance(stop, str):
+            attraction = get_catalog().attractions_by_id.get(stop)
+            if attraction is None:
+                raise EditError(f"Unknown attraction {stop!r}")
+            stop = dict(attraction)
+        key = stop_id(stop)
+        if not key:
+            raise EditError("Attraction has no id")
+        found = self.locate(key)
+        if found:
+            raise EditError(f"{key} is already in {found[0].label}")
+        tour = self.day(day)
+        index = tour.insert(stop, position)
+        if optimize and position is None:
+            tour.repair(index)
+        return [tour.label]
+
+    def remove(self, key: str, optimize: bool = True) -> List[str]:
+        found = self.locate(key)
+        if not found:
+            raise EditError(f"{key} is not in the itinerary")
+        tour, index = found
+        tour.pop(index)
+        if optimize:
+            tour.repair(index)
+        return [tour.label]
+
+    def move(self, key: str, day, position: Optional[int] = None, optimize: bool = True) -> List[str]:
+        found = self.locate(key)
+        if not found:
+            raise EditError(f"{key} is not in the itinerary")
+        source, index = found
+        target = self.day(day)
+        stop = source.pop(index)
+        if optimize and source is not target:
+            source.repair(index)
+        inserted = target.insert(stop, position)
+        if optimize and position is None:
+            target.repair(inserted)
+        return list(OrderedDict.fromkeys([source.label, target.label]))
+
+    def apply(self, edit: Dict[str, Any]) -> List[str]:
+        """Apply one ``add``/``move``/``remove`` edit; returns the labels of the days it changed"""
+        op = edit.get('op')
+        position = edit.get('position')
+        if position is not None and (not isinstance(position, int) or position < 0):
+            raise EditError("position must be a non-negative integer")
+        optimize = bool(edit.get('optimize', True))
+        if op == 'add':
+            stop = edit.get('attraction') or edit.get('attraction_id')
+            if not stop:
+                raise EditError("add needs an attraction or attraction_id")
+            return self.add(stop, edit.get('day'), position, optimize)
+        key = edit.get('attraction_id')
+        if not key:
+            raise EditError(f"{op} needs an attraction_id")
+        if op == 'remove':
+            return self.remove(key, optimize)
+        if op == 'move':
+            return self.move(key, edit.get('day'), position, optimize)
+        raise EditError(f"Unknown edit {op!r}")
+
+    def summary(self, labels: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        labels = list(self.days) if labels is None else labels
+        total = sum(tour.distance_km for tour in self.days.values())
+        return {
+            'days': [self.days[label].summary() for label in labels],
+            'total_distance_km': round(total, 2),
+            'total_travel_hours': round(total / AVERAGE_SPEED_KMH, 2),
+        }
@@ -0,0 +1,322 @@
+"""Multi-day trip planning with travel time, daily hours and hotel overnights.
+
+``plan_trip`` assigns attractions to days and orders each day. A day starts
+at ``day_start`` from the previous night's hotel (the trip's start location
+on day one), visits its stops for their catalog durations with road travel
+in between, and must reach the hotel nearest its last stop by ``day_end``;
+the last day ends at its last stop. A greedy cheapest-insertion build is
+improved by relocation and 2-opt moves until no move helps or the CPU budget
+runs out, so the answer is always returned within the budget.
+
+The objective is lexicographic: least time past ``day_end``, then fewest
+unscheduled attractions (when ``days`` caps the trip), then fewest days,
+then least travel time.
+"""
+import os
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from data.catalog_loader import get_catalog
+from utils.route_calculator import calculate_distance
+from utils.tour_state import AVERAGE_SPEED_KMH
+
+PLANNER_CPU_BUDGET_MS = float(os.environ.get('PLANNER_CPU_BUDGET_MS', 250))
+DAY_START_HOUR = 9.0
+DAY_END_HOUR = 19.0
+DEFAULT_VISIT_HOURS = 2.0
+MAX_DAYS = 30
+# Roads wind; straight-line distance understates the drive
+ROAD_FACTOR = 1.3
+
+Point = Optional[Tuple[float, float]]
+
+
+class PlanningError(ValueError):
+    """The planning request is invalid"""
+
+
+class _BudgetExhausted(Exception):
+    pass
+
+
+def _point(coordinates) -> Point:
+    if not coordinates or coordinates.get('lat') is None or coordinates.get('lng') is None:
+        return None
+    return (float(coordinates['lat']), float(coordinates['lng']))
+
+
+def _clock(hours: float) -> str:
+    minutes = int(round(hours * 60))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class _Stop:
+    __slots__ = ('attraction', 'point', 'visit_hours', 'season', 'hotel', 'hotel_km')
+
+    def __init__(self, attraction, point, visit_hours, season, hotel, hotel_km):
+        self.attraction = attraction
+        self.point = point
+        self.visit_hours = visit_hours
+        self.season = season
+        self.hotel = hotel
+        self.hotel_km = hotel_km
+
+
+class _Problem:
+    def __init__(self, stops: List[_Stop], start: Point, day_start: float, day_end: float,
+                 max_days: int, deadline: float):
+        self.stops = stops
+        self.start = start
+        self.day_start = day_start
+        self.day_end = day_end
+        self.max_days = max_days
+        self.deadline = deadline
+        self.evaluations = 0
+        self._km: Dict[Tuple[Point, Point], float] = {}
+
+    def km(self, a: Point, b: Point) -> float:
+        if a is None or b is None or a == b:
+            return 0.0
+        key = (a, b) if a < b else (b, a)
+        distance = self._km.get(key)
+        if distance is None:
+            distance = self._km[key] = calculate_distance(a[0], a[1], b[0], b[1]) * ROAD_FACTOR
+        return distance
+
+    def simulate(self, anchor: Point, route: List[int], last: bool) -> Tuple[float, float]:
+        """(finish hour, travel km) of one day"""
+        clock, travelled, position = self.day_start, 0.0, anchor
+        for index in route:
+            stop = self.stops[index]
+            leg = self.km(position, stop.point)
+            travelled += leg
+            clock += leg / AVERAGE_SPEED_KMH + stop.visit_hours
+            position = stop.point
+        if not last and route:
+            leg = self.stops[route[-1]].hotel_km
+            travelled += leg
+            clock += leg / AVERAGE_SPEED_KMH
+        return clock, travelled
+
+    def next_anchor(self, route: List[int]) -> Point:
+        hotel = self.stops[route[-1]].hotel
+        return _point(hotel['coordinates']) if hotel else self.stops[route[-1]].point
+
+    def cost(self, days: List[List[int]]) -> Tuple[float, int, int, float]:
+        self.evaluations += 1
+        if time.process_time() > self.deadline:
+            raise _BudgetExhausted()
+        anchor, overtime, travelled = self.start, 0.0, 0.0
+        for number, route in enumerate(days):
+            finish, km = self.simulate(anchor, route, number == len(days) - 1)
+            overtime += max(0.0, finish - self.day_end)
+            travelled += km
+            anchor = self.next_anchor(route)
+        scheduled = sum(len(route) for route in days)
+        return (round(overtime, 6), len(self.stops) - scheduled, len(days), round(travelled, 6))
+
+    def build(self) -> List[List[int]]:
+        """Fill days one at a time by cheapest feasible insertion"""
+        remaining = set(range(len(self.stops)))
+        days: List[List[int]] = []
+        anchor = self.start
+        while remaining and len(days) < self.max_days:
+            route: List[int] = []
+            while remaining:
+                best = None
+                for index in remaining:
+                    for position in range(len(route) + 1):
+                        candidate = route[:position] + [index] + route[position:]
+                        finish, km = self.simulate(anchor, candidate, False)
+                        if finish <= self.day_end and (best is None or km < best[0]):
+                            best = (km, candidate, index)
+                if best is None:
+                    break
+                route = best[1]
+                remaining.discard(best[2])
+            if not route:
+                # Longer than a whole day on its own: give it a day to itself
+                index = min(remaining, key=lambda i: (self.km(anchor, self.stops[i].point), i))
+                route = [index]
+                remaining.discard(index)
+            days.append(route)
+            anchor = self.next_anchor(route)
+        return days
+
+    def _neighbours(self, days: List[List[int]], unscheduled: List[int]):
+        for index in unscheduled:
+            for target in range(len(days) + (len(days) < self.max_days)):
+                route = days[target] if target < len(days) else []
+                for position in range(len(route) + 1):
+                    candidate = [list(r) for r in days] + ([] if target < len(days) else [[]])
+                    candidate[target].insert(position, index)
+                    yield candidate
+        for source, route in enumerate(days):
+            for i in range(len(route)):
+                # Relocate one stop, possibly into another day
+                for target in range(len(days)):
+                    for position in range(len(days[target]) + (target != source)):
+                        if target == source and position == i:
+                            continue
+                        candidate = [list(r) for r in days]
+                        index = candidate[source].pop(i)
+                        candidate[target].insert(position, index)
+                        yield [r for r in candidate if r]
+                # Reverse a run within the day
+                for j in range(i + 1, len(route)):
+                    candidate = [list(r) for r in days]
+                    candidate[source][i:j + 1] = candidate[source][i:j + 1][::-1]
+                    yield candidate
+
+    def improve(self, days: List[List[int]]) -> Tuple[List[List[int]], bool]:
+        """First-improvement local search; returns the best plan and whether the budget ran out"""
+        try:
+            best = self.cost(days)
+            improved = True
+            while improved:
+                improved = False
+                scheduled = {index for route in days for index in route}
+                unscheduled = [i for i in range(len(self.stops)) if i not in scheduled]
+                for candidate in self._neighbours(days, unscheduled):
+                    value = self.cost(candidate)
+                    if value < best:
+                        days, best, improved = candidate, value, True
+                        break
+        except _BudgetExhausted:
+            return days, True
+        return days, False
+
+
+def _resolve(item) -> Optional[Dict[str, Any]]:
+    catalog = get_catalog()
+    if isinstance(item, str):
+        attraction = catalog.attractions_by_id.get(item)
+        return dict(attraction) if attraction else None
+    if not isinstance(item, dict):
+        return None
+    if item.get('id') in catalog.attractions_by_id:
+        return {**catalog.attractions_by_id[item['id']], **item}
+    return dict(item)
+
+
+def _nearest_hotel(point: Point) -> Tuple[Optional[Dict[str, Any]], float]:
+    hotels = get_catalog().hotels
+    if point is None or not hotels:
+        return None, 0.0
+    distance, hotel = min(
+        ((calculate_distance(point[0], point[1], h['coordinates']['lat'], h['coordinates']['lng']), h) for h in hotels),
+        key=lambda candidate: candidate[0])
+    return hotel, distance * ROAD_FACTOR
+
+
+def _stop(attraction: Dict[str, Any]) -> _Stop:
+    catalog = get_catalog()
+    point = _point(attraction.get('coordinates'))
+    duration = catalog.duration_of(attraction)
+    # Plan for the middle of the catalog's range
+    visit_hours = sum(duration) / 2 if duration else DEFAULT_VISIT_HOURS
+    hotel, hotel_km = _nearest_hotel(point)
+    return _Stop(attraction, point, visit_hours, catalog.season_by_id.get(attraction.get('id')), hotel, hotel_km)
+
+
+def _parse_hour(value, default: float, name: str) -> float:
+    if value is None:
+        return default
+    try:
+        hour = float(value)
+    except (TypeError, ValueError):
+        raise PlanningError(f"{name} must be an hour of the day")
+    if not 0 <= hour <= 24:
+        raise PlanningError(f"{name} must be between 0 and 24")
+    return hour
+
+
+def plan_trip(attractions: List[Any], start_location: Optional[Dict[str, Any]] = None,
+              start_date: Optional[str] = None, days: Optional[int] = None,
+              day_start=None, day_end=None, cpu_budget_ms: Optional[float] = None) -> Dict[str, Any]:
+    """Assign ``attractions`` (dicts or catalog ids) to days and order each day"""
+    day_start = _parse_hour(day_start, DAY_START_HOUR, 'day_start')
+    day_end = _parse_hour(day_end, DAY_END_HOUR, 'day_end')
+    if day_end <= day_start:
+        raise PlanningError("day_end must be after day_start")
+    if days is not None and (not isinstance(days, int) or isinstance(days, bool) or days < 1):
+        raise PlanningError("days must be a positive integer")
+    first_date = None
+    if start_date:
+        try:
+            first_date = date.fromisoformat(str(start_date)[:10])
+        except ValueError:
+            raise PlanningError("start_date must be an ISO date")
+
+    resolved, seen = [], set()
+    for item in attractions:
+        attraction = _resolve(item)
+        if attraction is None:
+            raise PlanningError(f"Unknown attraction {item!r}")
+        if attraction.get('id') in seen:
+            continue
+        seen.add(attraction.get('id'))
+        resolved.append(attraction)
+
+    started = time.process_time()
+    budget = PLANNER_CPU_BUDGET_MS if cpu_budget_ms is None else cpu_budget_ms
+    problem = _Problem(
+        [_stop(a) for a in resolved], _point(start_location), day_start, day_end,
+        min(days or MAX_DAYS, MAX_DAYS), started + budget / 1000)
+    routes = problem.build()
+    routes, exhausted = problem.improve(routes)
+
+    optimized_days = []
+    anchor = problem.start
+    for number, route in enumerate(routes):
+        last = number == len(routes) - 1
+        finish, travelled = problem.simulate(anchor, route, last)
+        day_date = first_date + timedelta(days=number) if first_date else None
+        clock, position, stops = day_start, anchor, []
+        for index in route:
+            stop = problem.stops[index]
+            clock += problem.km(position, stop.point) / AVERAGE_SPEED_KMH
+            arrival = clock
+            clock += stop.visit_hours
+            position = stop.point
+            stops.append({
+                **stop.attraction,
+                'arrival': _clock(arrival),
+                'departure': _clock(clock),
+                'visit_hours': round(stop.visit_hours, 2),
+                'out_of_season': bool(day_date and stop.season and day_date.month not in stop.season),
+            })
+        hotel = None if last else problem.stops[route[-1]].hotel
+        optimized_days.append({
+            'day': number + 1,
+            'date': day_date.isoformat() if day_date else None,
+            'city': Counter(s.get('city') for s in stops).most_common(1)[0][0],
+            'attractions': stops,
+            'start_time': _clock(day_start),
+            'end_time': _clock(finish),
+            'over_time': finish > day_end,
+            'travel_km': round(travelled, 1),
+            'travel_hours': round(travelled / AVERAGE_SPEED_KMH, 2),
+            'estimated_duration': round(finish - day_start, 2),
+            'overnight': {
+                'id': hotel['id'], 'name': hotel['name'], 'city': hotel['city'],
+                'distance_km': round(problem.stops[route[-1]].hotel_km, 1),
+            } if hotel else None,
+        })
+        anchor = problem.next_anchor(route)
+
+    scheduled = {index for route in routes for index in route}
+    return {
+        'optimized_days': optimized_days,
+        'total_days': len(optimized_days),
+        'total_attractions': len(scheduled),
+        'total_travel_km': round(sum(d['travel_km'] for d in optimized_days), 1),
+        'unscheduled': [problem.stops[i].attraction.get('id') for i in range(len(problem.stops)) if i not in scheduled],
+        'solver': {
+            'cpu_ms': round((time.process_time() - started) * 1000, 1),
+            'evaluations': problem.evaluations,
+            'budget_exhausted': exhausted,
+        },
+    }
@@ -0,0 +1,108 @@
+"""Resolve vendors to coordinates and catalog attractions at registration time.
+
+A vendor's position records how it was found in ``location_precision``:
+``exact`` (given coordinates), ``spots`` (centre of its nearby attractions),
+``geocoded`` (its address) or ``city`` (centre of its city's attractions).
+City-level positions are kept for display but get no ``geo`` point, so
+radius searches don't rank them as if they were precise.
+"""
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from data.catalog_loader import get_catalog
+from utils.route_calculator import lookup_address
+
+# Words too common in attraction names to identify one on their own
+GENERIC_TOKENS = frozenset({
+    'the', 'of', 'falls', 'fall', 'waterfall', 'park', 'temple', 'mandir', 'lake', 'dam', 'hill', 'hills',
+    'fort', 'zoo', 'zoological', 'garden', 'sanctuary', 'wildlife', 'national', 'mine',
+})
+
+
+def _tokens(name: str) -> Tuple[str, ...]:
+    return tuple(re.findall(r'[a-z0-9]+', name.lower()))
+
+
+def resolve_spot_id(spot: str) -> Optional[str]:
+    """The attraction a free-text spot name means: exact name, else the only whole-token match"""
+    catalog = get_catalog()
+    tokens = _tokens(spot)
+    if not tokens:
+        return None
+    by_tokens = {_tokens(a['name']): a['id'] for a in catalog.attractions}
+    if tokens in by_tokens:
+        return by_tokens[tokens]
+    if set(tokens) <= GENERIC_TOKENS:
+        return None
+    # "Hundru" or "Hundru Falls, Ranchi" name Hundru Falls; "Zoological Park" names two places
+    wanted = set(tokens)
+    matches = {aid for name, aid in by_tokens.items() if wanted <= set(name) or set(name) <= wanted}
+    return matches.pop() if len(matches) == 1 else None
+
+
+def resolve_spot_ids(nearby_spots: List[str]) -> List[str]:
+    """Attraction ids of free-text spot names; unknown and ambiguous names are dropped"""
+    ids = []
+    for spot in nearby_spots:
+        attraction_id = resolve_spot_id(spot)
+        if attraction_id and attraction_id not in ids:
+            ids.append(attraction_id)
+    return ids
+
+
+def valid_coordinates(value) -> Optional[Dict[str, float]]:
+    """``{'lat', 'lng'}`` as floats if ``value`` holds a real position, else None"""
+    try:
+        lat, lng = float(value['lat']), float(value['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (math.isfinite(lat) and math.isfinite(lng) and -90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return {'lat': lat, 'lng': lng}
+
+
+def _centroid(points: List[Dict[str, float]]) -> Dict[str, float]:
+    return {
+        'lat': sum(p['lat'] for p in points) / len(points),
+        'lng': sum(p['lng'] for p in points) / len(points),
+    }
+
+
+def resolve_vendor_location(vendor: Dict[str, Any]) -> Tuple[Optional[Dict[str, float]], Optional[str]]:
+    """(coordinates, precision) for a vendor: explicit, then its spots, then its city, then geocoding.
+
+    (None, None) if none of these places it; such a vendor is left out of the
+    geo index rather than put somewhere it isn't. May call the geocoding API,
+    so run it off the event loop.
+    """
+    explicit = valid_coordinates(vendor.get('coordinates') or {})
+    if explicit:
+        return explicit, 'exact'
+    catalog = get_catalog()
+    spots = [catalog.attractions_by_id[i]['coordinates'] for i in vendor.get('nearby_spot_ids', [])
+             if i in catalog.attractions_by_id]
+    if spots:
+        return _centroid(spots), 'spots'
+    location = vendor.get('location', '').strip().lower()
+    for city, attractions in catalog.attractions_by_city.items():
+        if city.lower() == location:
+            return _centroid([a['coordinates'] for a in attractions]), 'city'
+    if location:
+        geocoded = lookup_address(vendor['location'])
+        if geocoded:
+            return geocoded, 'geocoded'
+    return None, None
+
+
+def enrich_vendor(vendor: Dict[str, Any]) -> Dict[str, Any]:
+    """Add nearby_spot_ids, coordinates, location_precision and a GeoJSON point to a vendor document in place"""
+    vendor['nearby_spot_ids'] = resolve_spot_ids(vendor.get('nearby_spots', []))
+    coordinates, precision = resolve_vendor_location(vendor)
+    if coordinates:
+        vendor['coordinates'] = coordinates
+        vendor['location_precision'] = precision
+        # A city centre is no position to measure distances from; null stays out of the 2dsphere index
+        vendor['geo'] = None if precision == 'city' else {
+            'type': 'Point', 'coordinates': [coordinates['lng'], coordinates['lat']]}
+    return vendor
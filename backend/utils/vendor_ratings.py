@@ -0,0 +1,80 @@
+"""Per-vendor rating aggregates maintained incrementally on feedback writes.
+
+The aggregate lives on the vendor document under ``rating`` (count, sum,
+average, a 1-5 histogram and sentiment counts), so listings carry it at no
+extra query cost and ``rating.average`` can back an indexed sort.
+"""
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from utils.metrics import track_span
+
+RATING_VALUES = ("1", "2", "3", "4", "5")
+SENTIMENTS = ("positive", "neutral", "negative")
+
+
+def empty_rating() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "sum": 0,
+        "average": None,
+        "histogram": {value: 0 for value in RATING_VALUES},
+        "sentiment": {label: 0 for label in SENTIMENTS},
+    }
+
+
+async def record_rating(vendors_collection, vendor_id: str, rating: int, sentiment: str,
+                        stamp: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Atomically add one rating to a vendor's aggregate; None if the vendor isn't stored
+
+    ``stamp`` holds extra fields to set in the same update (the change sequence).
+    """
+    update = {"$inc": {
+        "rating.count": 1,
+        "rating.sum": rating,
+        f"rating.histogram.{rating}": 1,
+        f"rating.sentiment.{sentiment}": 1,
+    }}
+    if stamp:
+        update["$set"] = stamp
+    with track_span("mongo", "vendors.find_one_and_update"):
+        vendor = await vendors_collection.find_one_and_update(
+            {"id": vendor_id},
+            update,
+            projection={"_id": 0, "rating": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+    if vendor is None:
+        return None
+    aggregate = vendor["rating"]
+    aggregate["average"] = round(aggregate["sum"] / aggregate["count"], 3)
+    # Only the writer that produced this count sets the average, so a slower
+    # concurrent writer can never overwrite a newer value with a stale one.
+    # Syncs keep re-sending the stamped document until it settles, so they
+    # pick up the average even if they read between the two updates
+    with track_span("mongo", "vendors.update_one"):
+        await vendors_collection.update_one(
+            {"id": vendor_id, "rating.count": aggregate["count"]},
+            {"$set": {"rating.average": aggregate["average"]}},
+        )
+    return aggregate
+
+
+class LocalRatingAggregates:
+    """Aggregates for vendors that only exist in process (mock vendors)"""
+
+    def __init__(self):
+        self._ratings: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, vendor_id: str, rating: int, sentiment: str) -> Dict[str, Any]:
+        aggregate = self._ratings.setdefault(vendor_id, empty_rating())
+        aggregate["count"] += 1
+        aggregate["sum"] += rating
+        aggregate["histogram"][str(rating)] += 1
+        aggregate["sentiment"][sentiment] += 1
+        aggregate["average"] = round(aggregate["sum"] / aggregate["count"], 3)
+        return aggregate
+
+    def get(self, vendor_id: str) -> Optional[Dict[str, Any]]:
+        return self._ratings.get(vendor_id)
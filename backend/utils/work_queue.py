@@ -0,0 +1,150 @@
+"""In-process priority work queue.
+
+Jobs are coroutine functions run by a fixed set of asyncio workers, lowest
+priority value first and in submission order within a priority. Some workers
+are reserved for urgent jobs (``priority <= URGENT``), so an SOS alert never
+waits behind long background jobs that occupy the general workers. On
+shutdown, queued and running urgent jobs get a bounded time to finish
+before the workers are cancelled; other queued jobs are dropped.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from utils.metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+URGENT = 0
+INTERACTIVE = 10
+BACKGROUND = 100
+
+PRIORITY_NAMES = {URGENT: 'urgent', INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+QUEUE_DEPTH = gauge('work_queue_depth', 'Jobs waiting in the work queue', ('priority',))
+QUEUE_WAIT = histogram('work_queue_wait_seconds', 'Time jobs wait before a worker starts them', ('priority',))
+JOB_DURATION = histogram('work_queue_job_seconds', 'Work queue job run time', ('priority', 'job'))
+JOB_FAILURES = counter('work_queue_job_failures_total', 'Work queue jobs that raised', ('priority', 'job'))
+
+
+def priority_name(priority: int) -> str:
+    return PRIORITY_NAMES.get(priority, str(priority))
+
+
+class _Job:
+    __slots__ = ('priority', 'name', 'func', 'args', 'future', 'submitted')
+
+    def __init__(self, priority, name, func, args, future):
+        self.priority = priority
+        self.name = name
+        self.func = func
+        self.args = args
+        self.future = future
+        self.submitted = time.perf_counter()
+
+
+class PriorityWorkQueue:
+    def __init__(self, workers: int = 4, reserved: int = 1):
+        self.workers = workers
+        self.reserved = reserved
+        self._heap: List[Tuple[int, int, _Job]] = []
+        self._order = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._urgent_running = 0
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        if self._tasks:
+            return
+        self._condition = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._work(urgent_only=i < self.reserved), name=f'work-queue-{i}')
+                       for i in range(self.reserved + self.workers)]
+
+    async def stop(self, drain_seconds: float = 10.0):
+        """Cancel the workers once urgent jobs have finished, waiting at most ``drain_seconds`` for them"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._drain_urgent(), drain_seconds)
+            except asyncio.TimeoutError:
+                logger.error("Work queue stopped with %d urgent jobs unfinished",
+                             self.depth(URGENT) + self._urgent_running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for _, _, job in self._heap:
+            job.future.cancel()
+        self._heap = []
+
+    def _urgent_idle(self) -> bool:
+        return self._urgent_running == 0 and not any(p <= URGENT for p, _, _ in self._heap)
+
+    async def _drain_urgent(self):
+        async with self._condition:
+            await self._condition.wait_for(self._urgent_idle)
+
+    def depth(self, priority: Optional[int] = None) -> int:
+        return sum(1 for p, _, _ in self._heap if priority is None or p == priority)
+
+    async def submit(self, priority: int, func: Callable[..., Awaitable[Any]], *args,
+                     name: Optional[str] = None) -> asyncio.Future:
+        """Queue ``func(*args)``; the returned future resolves to its result"""
+        if self._condition is None:
+            raise RuntimeError("Work queue is not started")
+        job = _Job(priority, name or getattr(func, '__name__', 'job'), func, args,
+                   asyncio.get_running_loop().create_future())
+        async with self._condition:
+            heapq.heappush(self._heap, (priority, next(self._order), job))
+            QUEUE_DEPTH.inc(priority=priority_name(priority))
+            self._condition.notify_all()
+        return job.future
+
+    def _ready(self, urgent_only: bool) -> bool:
+        return bool(self._heap) and (not urgent_only or self._heap[0][0] <= URGENT)
+
+    async def _work(self, urgent_only: bool):
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._ready(urgent_only))
+                _, _, job = heapq.heappop(self._heap)
+                urgent = job.priority <= URGENT
+                if urgent:
+                    self._urgent_running += 1
+            try:
+                await self._run(job)
+            finally:
+                if urgent:
+                    self._urgent_running -= 1
+                    # Wake a stop() waiting for urgent jobs to drain
+                    async with self._condition:
+                        self._condition.notify_all()
+
+    async def _run(self, job: _Job):
+        label = priority_name(job.priority)
+        QUEUE_DEPTH.dec(priority=label)
+        QUEUE_WAIT.observe(time.perf_counter() - job.submitted, priority=label)
+        if job.future.cancelled():
+            return
+        started = time.perf_counter()
+        try:
+            result = await job.func(*job.args)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            JOB_FAILURES.inc(priority=label, job=job.name)
+            logger.error("Work queue job %s failed: %s", job.name, e)
+            # The submitter may have stopped waiting and cancelled the future
+            if not job.future.done():
+                job.future.set_exception(e)
+                # Nobody may await the future; don't log "exception never retrieved"
+                job.future.exception()
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            JOB_DURATION.observe(time.perf_counter() - started, priority=label, job=job.name)